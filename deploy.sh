@@ -39,6 +39,8 @@ echo -e "${YELLOW}3. 数据库迁移...${NC}"
 set -a; source $PROJECT_ROOT/.env; set +a
 python manage.py migrate
 python manage.py collectstatic --noinput
+# 预生成 API 文档，worker 不再加载 drf_spectacular
+API_SCHEMA_ENABLED=1 python manage.py build_api_schema
 
 echo -e "${YELLOW}4. 构建前端应用...${NC}"
 cd $FRONTEND_PATH
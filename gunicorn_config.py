@@ -1,4 +1,14 @@
 # Gunicorn配置文件
+import multiprocessing
+import os
+
+# 部署模式：
+#   sync  - 默认，WSGI + 同步worker
+#   async - ASGI + uvicorn worker，博客只读接口走异步视图，
+#           单个worker可以同时挂起大量等待数据库的慢请求
+#           启动: GUNICORN_PROFILE=async gunicorn -c gunicorn_config.py
+#           （不要在命令行再传 recipe_server.wsgi:application）
+profile = os.environ.get("GUNICORN_PROFILE", "sync")
 
 # 基本配置
 bind = "127.0.0.1:8000"
@@ -8,6 +18,13 @@ worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+if profile == "async":
+    wsgi_app = "recipe_server.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    # 事件循环不会被慢查询阻塞，worker数与CPU核数相同即可
+    workers = multiprocessing.cpu_count()
+    raw_env = ["BLOG_ASYNC_READS=1"]
+
 # 应用配置
 chdir = "/var/www/personalBlog/recipeServerPython"
 pythonpath = "/var/www/personalBlog/recipeServerPython"
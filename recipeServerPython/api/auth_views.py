@@ -1,13 +1,16 @@
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from recipe_server.ratelimit import LoginRateThrottle, RefreshRateThrottle
+from recipe_server.schema import extend_schema, OpenApiExample
+from .revocation import is_revoked, revoke_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -144,6 +147,7 @@ class RegisterView(APIView):
 class LoginView(APIView):
     """用户登录"""
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginRateThrottle]
     
     def post(self, request):
         try:
@@ -219,7 +223,7 @@ class UserProfileView(APIView):
     tags=['认证'],
     operation_id='refresh_token',
     summary='刷新访问令牌',
-    description='使用refresh token获取新的access token',
+    description='使用refresh token获取新的access token；开启轮换时同时返回新的refresh token，旧的refresh token随即失效',
     examples=[
         OpenApiExample(
             name='令牌刷新示例',
@@ -231,6 +235,7 @@ class UserProfileView(APIView):
 )
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([RefreshRateThrottle])
 def refresh_token_view(request):
     """刷新JWT令牌"""
     try:
@@ -241,9 +246,25 @@ def refresh_token_view(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         refresh = RefreshToken(refresh_token)
-        return Response({
-            'access': str(refresh.access_token)
-        }, status=status.HTTP_200_OK)
+        if is_revoked(refresh['jti']):
+            return Response({
+                'error': '令牌刷新失败',
+                'details': 'refresh token已失效'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # 并发使用同一个refresh token时只有先吊销成功的请求能拿到新令牌
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revoke_token(refresh):
+                return Response({
+                    'error': '令牌刷新失败',
+                    'details': 'refresh token已失效'
+                }, status=status.HTTP_401_UNAUTHORIZED)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return Response(data, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
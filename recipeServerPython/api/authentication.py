@@ -0,0 +1,70 @@
+"""
+JWT 认证的用户缓存。
+
+simplejwt 的 JWTAuthentication 每个请求都按 token 中的 user_id 查一次 User 表。
+CachedJWTAuthentication 把用户对象缓存 AUTH_USER_CACHE_SECONDS 秒，用户保存或删除时
+（修改密码、停用账号都会经过 save）由 api.signals 立即删除缓存。is_active 和
+CHECK_REVOKE_TOKEN 的校验对缓存中的用户照常执行。
+
+缓存使用 AUTH_USER_CACHE_ALIAS 指定的缓存，必须是所有 worker 共享的缓存（Redis 等），
+否则其它进程要等缓存过期才能感知停用和改密；生产环境没有配置共享缓存时
+AUTH_USER_CACHE_SECONDS 为 0，不使用缓存（见 settings_production）。绕过 save 的批量
+update 同样要等过期。
+
+未命中时从主库读取用户再写入缓存：副本有延迟，刚停用或改密的用户可能从副本读到旧数据，
+写入缓存后在整个缓存时间内都有效。
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from recipe_server.db.routers import use_primary
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def invalidate_cached_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """先从缓存取用户，未命中时查库并写入缓存"""
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_USER_CACHE_SECONDS:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache = user_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                with use_primary():
+                    user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cache.set(key, user, settings.AUTH_USER_CACHE_SECONDS)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,23 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = '生成 OpenAPI schema 文件，供关闭 API_SCHEMA_ENABLED 的 worker 直接返回'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(settings.API_SCHEMA_FILE), help='输出文件路径')
+
+    def handle(self, *args, **options):
+        if not settings.API_SCHEMA_ENABLED:
+            raise CommandError('生成 schema 需要加载 drf_spectacular，请设置 API_SCHEMA_ENABLED=1 后运行')
+
+        path = options['file']
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 先写临时文件再替换，正在运行的 worker 不会读到写了一半的文件
+        tmp_path = f'{path}.tmp'
+        call_command('spectacular', file=tmp_path, format='openapi-json')
+        os.replace(tmp_path, path)
+        self.stdout.write(self.style.SUCCESS(f'API schema 已写入 {path}'))
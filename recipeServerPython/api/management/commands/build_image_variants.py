@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recipe_server.images import IMAGE_FIELDS, process_image
+
+
+class Command(BaseCommand):
+    help = '为已上传但还没有尺寸版本（或原图已更换）的图片补生成尺寸版本'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='全部重新生成')
+
+    def handle(self, *args, **options):
+        for model, field_name, variants_field, on_saved in IMAGE_FIELDS:
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            count = 0
+            for pk, name, variants in rows.values_list('pk', field_name, variants_field).iterator():
+                if not options['force'] and (variants or {}).get('source') == name:
+                    continue
+                if options['force'] and variants:
+                    # 让 process_image 把它当作新图片处理
+                    model.objects.filter(pk=pk).update(**{variants_field: {}})
+                process_image(model, pk, field_name, variants_field, on_saved)
+                count += 1
+            self.stdout.write(f'{model._meta.label}.{field_name}: 处理了 {count} 张图片')
+        self.stdout.write(self.style.SUCCESS('图片尺寸版本生成完成'))
@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import FileField
+
+from recipe_server.images import IMAGE_FIELDS
+from recipe_server.storage import CAS_PREFIX, TMP_DIR, ContentAddressedStorage
+
+
+def _source_model(model):
+    # simple_history 的历史模型把 FileField 存成 TextField，按原模型的字段判断
+    return getattr(model, 'instance_type', None) or model
+
+
+def referenced_names():
+    """所有记录（包括历史记录）引用的媒体文件名"""
+    names = set()
+    for model in apps.get_models():
+        source = _source_model(model)
+        for field in source._meta.concrete_fields:
+            if not isinstance(field, FileField):
+                continue
+            rows = model._default_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+            names.update(rows.values_list(field.name, flat=True).iterator())
+
+    # 尺寸版本只看当前记录；历史记录保留了原图，恢复后会重新生成尺寸版本
+    for model, _, variants_field, _ in IMAGE_FIELDS:
+        for data in model._default_manager.values_list(variants_field, flat=True).iterator():
+            for entry in (data or {}).get('variants', []):
+                names.update(value for value in entry.values() if isinstance(value, str))
+    return names
+
+
+class Command(BaseCommand):
+    help = '删除内容寻址存储中没有任何记录引用的文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='只删除修改时间早于此时长的文件，避免删掉刚上传、记录还没提交的文件')
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('默认存储不是 ContentAddressedStorage')
+
+        cutoff = time.time() - options['grace_hours'] * 3600
+        referenced = referenced_names()
+        self.stdout.write(f'被引用的文件 {len(referenced)} 个')
+
+        removed = removed_bytes = kept = 0
+        for directory in (CAS_PREFIX, TMP_DIR):
+            root_dir = default_storage.path(directory)
+            for root, _, files in os.walk(root_dir):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, default_storage.location).replace(os.sep, '/')
+                    stat = os.stat(path)
+                    if name in referenced or stat.st_mtime > cutoff:
+                        kept += 1
+                        continue
+                    removed += 1
+                    removed_bytes += stat.st_size
+                    if not options['dry_run']:
+                        os.unlink(path)
+
+        action = '可删除' if options['dry_run'] else '已删除'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {removed} 个文件（{removed_bytes / 1024 / 1024:.1f} MB），保留 {kept} 个'
+        ))
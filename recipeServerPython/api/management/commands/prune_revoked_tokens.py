@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.revocation import prune_expired
+
+
+class Command(BaseCommand):
+    help = '分批清理已过期的 refresh token 吊销记录（可由 cron 定期执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的记录数')
+
+    def handle(self, *args, **options):
+        deleted = prune_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已清理 {deleted} 条过期的吊销记录'))
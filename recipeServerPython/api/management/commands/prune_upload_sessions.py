@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.uploads import prune_expired
+
+
+class Command(BaseCommand):
+    help = '清理过期的分片上传会话和临时文件（可由 cron 定期执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批删除的会话数')
+
+    def handle(self, *args, **options):
+        deleted = prune_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已清理 {deleted} 个过期的上传会话'))
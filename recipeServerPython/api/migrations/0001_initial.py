@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True, verbose_name='令牌ID')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='过期时间')),
+                ('revoked_at', models.DateTimeField(auto_now_add=True, verbose_name='吊销时间')),
+            ],
+            options={
+                'verbose_name': '已吊销令牌',
+                'verbose_name_plural': '已吊销令牌',
+            },
+        ),
+    ]
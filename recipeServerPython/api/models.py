@@ -1,3 +1,43 @@
+import uuid
+
+from django.contrib.auth.models import User
 from django.db import models
 
-# Create your models here.
+
+class RevokedToken(models.Model):
+    """已吊销的 refresh token（按 jti 记录），过期后由 prune_revoked_tokens 命令清理"""
+    jti = models.CharField('令牌ID', max_length=255, unique=True)
+    expires_at = models.DateTimeField('过期时间', db_index=True)
+    revoked_at = models.DateTimeField('吊销时间', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = '已吊销令牌'
+        verbose_name_plural = '已吊销令牌'
+
+    def __str__(self):
+        return self.jti
+
+
+class UploadSession(models.Model):
+    """分片上传会话：分片直接追加写入 UPLOAD_SESSION_DIR 下的临时文件，完成后挂到文章或菜谱的图片字段"""
+    STATUS_CHOICES = [
+        ('uploading', '上传中'),
+        ('completed', '已完成'),
+    ]
+
+    id = models.UUIDField('会话ID', primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户', related_name='upload_sessions')
+    filename = models.CharField('文件名', max_length=255)
+    content_type = models.CharField('文件类型', max_length=100, blank=True)
+    size = models.PositiveBigIntegerField('文件大小')
+    received = models.PositiveBigIntegerField('已接收字节数', default=0)
+    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    expires_at = models.DateTimeField('过期时间', db_index=True)
+
+    class Meta:
+        verbose_name = '上传会话'
+        verbose_name_plural = '上传会话'
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size})'
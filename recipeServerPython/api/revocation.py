@@ -0,0 +1,114 @@
+"""
+refresh token 吊销存储。
+
+吊销记录保存在 RevokedToken 表中。每个 worker 进程维护一份已吊销 jti 的布隆过滤器，
+每 TOKEN_REVOCATION_SYNC_SECONDS 秒从数据库增量同步一次，每 TOKEN_REVOCATION_REBUILD_SECONDS
+秒或元素超过容量时整体重建，丢弃已清理的记录。
+
+增量同步按吊销时间读取：revoked_at 不早于上次同步开始时间减去
+TOKEN_REVOCATION_SYNC_MARGIN_SECONDS 的记录。不按自增 id 读取，因为 id 在插入时
+分配，事务较长时较小的 id 可能在较大的 id 之后才提交，按 id 推进会永久漏掉它；
+提交比吊销时间晚出余量以上的记录（以及服务器间超过余量的时钟偏差）由定期重建补上。
+绝大多数未吊销的 token 在内存中即可判定，只有布隆过滤器命中时才查库确认。
+
+轮换 refresh token 时旧 token 的吊销依赖 jti 唯一约束：同一个 token 并发刷新时只有
+第一个插入成功的请求能拿到新 token，不受各进程同步延迟影响。
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from recipe_server.bloom import BloomFilter
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {'filter': None, 'since': None, 'synced_at': 0.0, 'built_at': 0.0}
+
+
+def reset_revocation_filter():
+    """丢弃本进程的布隆过滤器，下次检查时从数据库重建（测试使用）"""
+    with _lock:
+        _state.update(filter=None, since=None, synced_at=0.0, built_at=0.0)
+
+
+def _rebuild(now):
+    bloom = BloomFilter(settings.TOKEN_REVOCATION_BLOOM_CAPACITY, settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+    started = timezone.now()
+    rows = RevokedToken.objects.filter(expires_at__gt=started).values_list('jti', flat=True)
+    for jti in rows.iterator(chunk_size=10000):
+        bloom.add(jti)
+    if bloom.is_full:
+        logger.warning(
+            f"已吊销令牌数 {bloom.count} 超过布隆过滤器容量 {bloom.capacity}，"
+            f"请调大 TOKEN_REVOCATION_BLOOM_CAPACITY"
+        )
+    _state.update(filter=bloom, since=started, synced_at=now, built_at=now)
+
+
+def _sync():
+    now = time.monotonic()
+    bloom = _state['filter']
+    if bloom is not None and now - _state['synced_at'] < settings.TOKEN_REVOCATION_SYNC_SECONDS:
+        return bloom
+    with _lock:
+        bloom = _state['filter']
+        if bloom is not None and now - _state['synced_at'] < settings.TOKEN_REVOCATION_SYNC_SECONDS:
+            return bloom
+        if bloom is None or bloom.is_full or now - _state['built_at'] > settings.TOKEN_REVOCATION_REBUILD_SECONDS:
+            _rebuild(now)
+        else:
+            started = timezone.now()
+            margin = timedelta(seconds=settings.TOKEN_REVOCATION_SYNC_MARGIN_SECONDS)
+            rows = RevokedToken.objects.filter(revoked_at__gte=_state['since'] - margin).values_list('jti', flat=True)
+            for jti in rows:
+                # 余量内的记录每次都会重新读到，已有的不重复计数
+                if jti not in bloom:
+                    bloom.add(jti)
+            _state.update(since=started, synced_at=now)
+        return _state['filter']
+
+
+def is_revoked(jti):
+    if jti not in _sync():
+        return False
+    # 布隆过滤器可能误判，命中时以数据库为准
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke_token(token):
+    """
+    吊销 token，返回是否由本次调用吊销。
+    已被吊销过（包括并发请求抢先吊销）时返回 False。
+    """
+    jti = token['jti']
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    bloom = _state['filter']
+    if bloom is not None:
+        bloom.add(jti)
+    return True
+
+
+def prune_expired(batch_size=1000):
+    """分批删除已过期的吊销记录（过期的 token 本身已无法使用），返回删除条数"""
+    total = 0
+    while True:
+        ids = list(
+            RevokedToken.objects.filter(expires_at__lte=timezone.now())
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += RevokedToken.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,17 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_on_change(sender, instance, **kwargs):
+    """修改密码、停用、删除账号后立即让认证缓存失效"""
+    invalidate_cached_user(instance.pk)
+    # 提交前其它请求仍可能从主库读到旧数据并写回缓存，提交后再删一次
+    transaction.on_commit(partial(invalidate_cached_user, instance.pk))
@@ -0,0 +1,156 @@
+import logging
+
+from django.utils import timezone
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from recipe_server.images import is_processed
+from recipe_server.schema import extend_schema, OpenApiExample, OpenApiParameter, OpenApiTypes
+from .models import UploadSession
+from .uploads import UploadError, create_session, discard, finalize, parse_content_range, write_chunk
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'filename', 'content_type', 'size', 'offset', 'status', 'created_at', 'expires_at')
+        read_only_fields = ('id', 'offset', 'status', 'created_at', 'expires_at')
+
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    target = serializers.ChoiceField(choices=['post', 'recipe'])
+    target_id = serializers.CharField(max_length=200)
+
+
+def _error(e, action):
+    data = {'error': action, 'details': str(e)}
+    if e.offset is not None:
+        data['offset'] = e.offset
+    return Response(data, status=e.status)
+
+
+def _get_session(request, pk):
+    return get_object_or_404(UploadSession, pk=pk, user=request.user, expires_at__gt=timezone.now())
+
+
+@extend_schema(
+    tags=['上传'],
+    operation_id='create_upload_session',
+    summary='创建分片上传会话',
+    description='声明文件名和总大小，返回会话ID；之后按顺序 PUT 分片，最后调用 finalize',
+    request=UploadSessionSerializer,
+    responses=UploadSessionSerializer,
+    examples=[
+        OpenApiExample(
+            name='创建会话示例',
+            value={"filename": "IMG_2024.jpg", "size": 5242880, "content_type": "image/jpeg"}
+        )
+    ]
+)
+class UploadSessionCreateView(APIView):
+    """创建分片上传会话"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': '创建上传会话失败', 'details': serializer.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = create_session(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return _error(e, '创建上传会话失败')
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """查询进度、上传分片、取消上传"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        tags=['上传'],
+        operation_id='get_upload_session',
+        summary='查询上传进度',
+        description='返回已接收的字节数 offset，断点续传时从该位置继续',
+        responses=UploadSessionSerializer
+    )
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(_get_session(request, pk)).data)
+
+    @extend_schema(
+        tags=['上传'],
+        operation_id='put_upload_chunk',
+        summary='上传分片',
+        description='请求体为分片的原始字节（application/octet-stream），'
+                    '用 Content-Range: bytes 起始-结束/总长 指明位置，起始位置必须等于当前 offset',
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        parameters=[
+            OpenApiParameter(name='Content-Range', type=str, location=OpenApiParameter.HEADER, required=True,
+                             description='例如 bytes 0-1048575/5242880'),
+        ],
+        responses=UploadSessionSerializer
+    )
+    def put(self, request, pk):
+        session = _get_session(request, pk)
+        try:
+            start, end = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), session.size)
+            # 直接从请求流读取并写入临时文件，不经过 DRF 解析器
+            write_chunk(session, request.stream, start, end)
+        except UploadError as e:
+            return _error(e, '分片上传失败')
+        return Response(UploadSessionSerializer(session).data)
+
+    @extend_schema(
+        tags=['上传'],
+        operation_id='delete_upload_session',
+        summary='取消上传',
+        description='删除上传会话和已上传的分片'
+    )
+    def delete(self, request, pk):
+        discard(_get_session(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(
+    tags=['上传'],
+    operation_id='finalize_upload',
+    summary='完成上传',
+    description='所有分片上传完后，把文件设置为文章特色图片（target=post，target_id 为文章 slug）'
+                '或菜谱图片（target=recipe，target_id 为菜谱ID）；只能修改自己的内容',
+    request=UploadFinalizeSerializer,
+    examples=[
+        OpenApiExample(
+            name='设置文章特色图片',
+            value={"target": "post", "target_id": "my-first-post"}
+        )
+    ]
+)
+class UploadFinalizeView(APIView):
+    """完成上传并挂到目标记录"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        session = _get_session(request, pk)
+        serializer = UploadFinalizeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': '完成上传失败', 'details': serializer.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            field_file, variants_field = finalize(session, request.user, **serializer.validated_data)
+        except UploadError as e:
+            return _error(e, '完成上传失败')
+
+        logger.info(f"分片上传完成: {session.pk} -> {field_file.instance._meta.label} {field_file.instance.pk} {field_file.name}")
+        return Response({
+            **UploadSessionSerializer(session).data,
+            'target': serializer.validated_data['target'],
+            'target_id': serializer.validated_data['target_id'],
+            # 后台任务去掉元数据之前不返回原图地址
+            'url': request.build_absolute_uri(field_file.url) if is_processed(field_file, variants_field) else None,
+        })
@@ -0,0 +1,212 @@
+"""
+分片（可续传）上传。
+
+客户端先创建上传会话，再按顺序 PUT 各个分片（Content-Range: bytes 起始-结束/总长），
+每个分片边读请求体边追加写入 UPLOAD_SESSION_DIR 下的临时文件，不在内存中缓存整个
+文件。连接中断后 GET 会话得到已接收的字节数，从该位置继续上传即可。全部接收后
+finalize 把文件挂到文章或菜谱的图片字段，之后的存储和尺寸版本与普通上传相同。
+
+过期未完成的会话由 prune_upload_sessions 命令清理。
+"""
+import fcntl
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+from PIL import Image
+
+from .models import UploadSession
+
+IO_CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+@dataclass
+class UploadTarget:
+    model: type
+    lookup_field: str
+    image_field: str
+    variants_field: str
+
+
+def upload_targets():
+    """finalize 时可以挂载的图片字段"""
+    from blog.models import BlogPost
+
+    targets = {'post': UploadTarget(BlogPost, 'slug', 'featured_image', 'featured_image_variants')}
+    if apps.is_installed('recipes'):
+        from recipes.models import Recipe
+        targets['recipe'] = UploadTarget(Recipe, 'id', 'image', 'image_variants')
+    return targets
+
+
+def part_path(session):
+    return os.path.join(str(settings.UPLOAD_SESSION_DIR), f'{session.pk}.part')
+
+
+def new_expiry():
+    return timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def create_session(user, filename, size, content_type=''):
+    if size > settings.UPLOAD_MAX_BYTES:
+        raise UploadError(f'文件不能超过 {settings.UPLOAD_MAX_BYTES} 字节', status=413)
+    session = UploadSession.objects.create(
+        user=user, filename=os.path.basename(filename), size=size,
+        content_type=content_type, expires_at=new_expiry(),
+    )
+    os.makedirs(str(settings.UPLOAD_SESSION_DIR), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def parse_content_range(header, size):
+    match = _CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('缺少或无法解析 Content-Range 头，格式为 bytes 起始-结束/总长')
+    start, end, total = (int(value) for value in match.groups())
+    if total != size or end < start or end >= size:
+        raise UploadError('Content-Range 与上传会话的文件大小不符')
+    if end - start + 1 > settings.UPLOAD_CHUNK_MAX_BYTES:
+        raise UploadError(f'单个分片不能超过 {settings.UPLOAD_CHUNK_MAX_BYTES} 字节', status=413)
+    return start, end
+
+
+def write_chunk(session, stream, start, end):
+    """
+    把请求体追加到临时文件，返回新的已接收字节数。
+    起始位置必须等于已接收字节数；同一会话的分片不能并发写入。
+    """
+    if session.status != 'uploading':
+        raise UploadError('上传已完成', status=409, offset=session.received)
+    try:
+        f = open(part_path(session), 'r+b')
+    except FileNotFoundError:
+        raise UploadError('上传会话的临时文件不存在', status=410)
+    with f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('该会话正在接收其他分片', status=409, offset=session.received)
+        offset = os.fstat(f.fileno()).st_size
+        if start != offset:
+            raise UploadError(f'分片起始位置应为 {offset}', status=409, offset=offset)
+
+        f.seek(offset)
+        remaining = end - start + 1
+        try:
+            while remaining:
+                data = stream.read(min(IO_CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                f.write(data)
+                remaining -= len(data)
+        finally:
+            # 连接中途断开时保留已写入的部分，客户端从新的位置续传
+            f.flush()
+            offset = f.tell()
+            UploadSession.objects.filter(pk=session.pk).update(received=offset, expires_at=new_expiry())
+            session.received = offset
+
+    if remaining:
+        raise UploadError('请求体比 Content-Range 声明的短', offset=offset)
+    return offset
+
+
+def finalize(session, user, target, target_id):
+    """
+    把上传完成的文件保存到目标记录的图片字段，返回 (图片字段的文件, 尺寸版本字段名)。
+    元数据在提交后由 recipe_server.images 的后台任务去掉，原图文件名届时会变化。
+    """
+    if session.status != 'uploading':
+        raise UploadError('上传已完成', status=409)
+    if session.received != session.size:
+        raise UploadError(f'文件尚未上传完成（{session.received}/{session.size}）', status=409, offset=session.received)
+
+    upload_target = upload_targets().get(target)
+    if upload_target is None:
+        raise UploadError(f'不支持的目标类型: {target}')
+    # 按查找字段的类型转换 target_id，菜谱ID为 "abc" 时视为不存在，而不是在查询时报错
+    lookup = upload_target.model._meta.get_field(upload_target.lookup_field)
+    try:
+        target_id = lookup.to_python(target_id)
+    except ValidationError:
+        raise UploadError('目标记录不存在', status=404)
+    obj = upload_target.model.objects.filter(**{upload_target.lookup_field: target_id}).first()
+    if obj is None:
+        raise UploadError('目标记录不存在', status=404)
+    if obj.author_id != user.pk and not user.is_staff:
+        raise UploadError('只能修改自己的内容', status=403)
+
+    path = part_path(session)
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise UploadError('上传的文件不是有效的图片')
+    if image_format not in IMAGE_EXTENSIONS:
+        raise UploadError(f'不支持的图片格式: {image_format}')
+
+    name = os.path.splitext(session.filename)[0] + IMAGE_EXTENSIONS[image_format]
+    with open(path, 'rb') as f:
+        setattr(obj, upload_target.image_field, File(f, name=name))
+        obj.save()
+
+    os.unlink(path)
+    session.status = 'completed'
+    session.save(update_fields=['status'])
+    # 同步处理（IMAGE_PIPELINE_WORKERS 为 0）时原图可能已经换成去掉元数据的文件
+    obj.refresh_from_db(fields=[upload_target.image_field, upload_target.variants_field])
+    return getattr(obj, upload_target.image_field), upload_target.variants_field
+
+
+def discard(session):
+    try:
+        os.unlink(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def prune_expired(batch_size=500):
+    """删除过期的会话及其临时文件，再清理没有会话对应的临时文件，返回删除的会话数"""
+    total = 0
+    while True:
+        sessions = list(UploadSession.objects.filter(expires_at__lte=timezone.now()).order_by('pk')[:batch_size])
+        if not sessions:
+            break
+        for session in sessions:
+            try:
+                os.unlink(part_path(session))
+            except FileNotFoundError:
+                pass
+        total += UploadSession.objects.filter(pk__in=[s.pk for s in sessions]).delete()[0]
+
+    directory = str(settings.UPLOAD_SESSION_DIR)
+    if os.path.isdir(directory):
+        known = {str(pk) for pk in UploadSession.objects.filter(status='uploading').values_list('pk', flat=True)}
+        cutoff = time.time() - 60 * 60
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            # 只删除一小时前的文件，避免误删刚创建、会话还没查到的临时文件
+            if filename.endswith('.part') and filename[:-len('.part')] not in known and os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+    return total
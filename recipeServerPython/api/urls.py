@@ -1,6 +1,7 @@
 from django.urls import path, include
 from . import views
 from . import auth_views
+from . import upload_views
 
 app_name = 'api'
 
@@ -10,7 +11,15 @@ urlpatterns = [
     path('auth/token/', auth_views.LoginView.as_view(), name='auth-token'),
     path('auth/refresh/', auth_views.refresh_token_view, name='auth-refresh'),
     path('auth/profile/', auth_views.UserProfileView.as_view(), name='auth-profile'),
+
+    # 分片上传
+    path('uploads/', upload_views.UploadSessionCreateView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', upload_views.UploadSessionView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/finalize/', upload_views.UploadFinalizeView.as_view(), name='upload-finalize'),
     
+    # 菜谱相关路由
+    path('', include('recipes.urls')),
+
     # 博客相关路由
     path('', include('blog.urls', namespace='blog')),
 ] 
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+对比同步(gunicorn sync worker)与异步(uvicorn worker)两种部署模式下
+博客只读接口的吞吐量和延迟。
+
+先分别启动两种模式的服务，例如：
+    gunicorn -c gunicorn_config.py --bind 127.0.0.1:8000 recipe_server.wsgi:application
+    GUNICORN_PROFILE=async gunicorn -c gunicorn_config.py --bind 127.0.0.1:8001
+
+然后运行：
+    python benchmarks/compare_sync_async.py \\
+        --sync-url http://127.0.0.1:8000 --async-url http://127.0.0.1:8001 \\
+        --concurrency 200 --duration 30
+
+只使用标准库，每个并发客户端顺序发送请求（Connection: close），
+统计每秒请求数和 p50/p95/p99 延迟。
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/api/v1/posts/',
+    '/api/v1/posts/?page=2',
+    '/api/v1/posts/featured/',
+    '/api/v1/posts/popular/',
+    '/api/v1/search/?q=Python',
+    '/api/v1/categories/',
+    '/api/v1/tags/',
+]
+
+
+async def fetch(host, port, path, timeout):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        request = (
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {host}\r\n'
+            'Accept: application/json\r\n'
+            'Connection: close\r\n\r\n'
+        )
+        writer.write(request.encode('ascii'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def client(host, port, paths, deadline, latencies, errors, timeout, offset):
+    i = offset
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status = await fetch(host, port, path, timeout)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            errors.append(path)
+            continue
+        if status >= 400:
+            errors.append(path)
+        else:
+            latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(pct / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+async def run(base_url, paths, concurrency, duration, timeout):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*[
+        client(host, port, paths, deadline, latencies, errors, timeout, n)
+        for n in range(concurrency)
+    ])
+    elapsed = time.monotonic() - started
+    ms = [value * 1000 for value in latencies]
+    return {
+        'url': base_url,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(statistics.mean(ms), 2) if ms else None,
+        'p50_ms': round(percentile(ms, 50), 2) if ms else None,
+        'p95_ms': round(percentile(ms, 95), 2) if ms else None,
+        'p99_ms': round(percentile(ms, 99), 2) if ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比同步/异步部署模式的只读接口性能')
+    parser.add_argument('--sync-url', required=True, help='同步模式服务地址')
+    parser.add_argument('--async-url', required=True, help='异步模式服务地址')
+    parser.add_argument('--concurrency', type=int, default=100, help='并发客户端数')
+    parser.add_argument('--duration', type=float, default=20, help='每种模式的压测时长（秒）')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时（秒）')
+    parser.add_argument('--path', action='append', dest='paths', help='压测路径，可重复指定')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    results = {}
+    for mode, url in (('sync', args.sync_url), ('async', args.async_url)):
+        results[mode] = asyncio.run(run(url, paths, args.concurrency, args.duration, args.timeout))
+
+    header = f"{'mode':<6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}"
+    print(header)
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['rps']:>8} {r['p50_ms']!s:>8} {r['p95_ms']!s:>8} {r['p99_ms']!s:>8} {r['errors']:>7}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+数据库连接管理压测：对比 settings_production 中不同 DB_CONNECTION_MODE 的吞吐量。
+
+每种模式在独立子进程中加载 Django（连接配置在导入 settings 时确定），
+多个线程直接调用 WSGI application 完整走一遍请求周期（request_started /
+request_finished 会触发连接的关闭或归还；django.test.Client 会屏蔽这一
+行为，所以不用它），统计 rps、延迟分位数和新建数据库连接的次数。
+
+用法（DB_* 环境变量指向本地 PostgreSQL）：
+    DB_NAME=blog DB_USER=postgres DB_PASSWORD=... DB_PORT=5432 \\
+    python benchmarks/db_connections.py --modes baseline persistent pool \\
+        --threads 8 --requests 500 --output results/db_connections.json
+
+baseline 表示不做任何连接复用（CONN_MAX_AGE=0），即改造前的行为；
+加上 --prepared 会同时开启服务端预处理语句。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(int(round(pct / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def run_worker(args):
+    """子进程：按当前环境变量配置加载 Django 并施压"""
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_server.settings_production')
+    import django
+    from django.conf import settings
+
+    if os.environ.get('DB_CONNECTION_MODE') == 'baseline':
+        os.environ['DB_CONNECTION_MODE'] = 'persistent'
+        os.environ['DB_CONN_MAX_AGE'] = '0'
+    django.setup()
+
+    from django.core.wsgi import get_wsgi_application
+    from django.db.backends.signals import connection_created
+    from django.test import RequestFactory
+
+    opened = []
+    connection_created.connect(lambda **kwargs: opened.append(1), weak=False)
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+
+    application = get_wsgi_application()
+    factory = RequestFactory(HTTP_HOST=host)
+    latencies = []
+    lock = threading.Lock()
+
+    def hammer():
+        local = []
+        for i in range(args.requests):
+            path = args.paths[i % len(args.paths)]
+            environ = factory.get(path).environ
+            statuses = []
+            start = time.perf_counter()
+            result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                b''.join(result)
+            finally:
+                result.close()
+            local.append(time.perf_counter() - start)
+            if statuses[0].startswith('5'):
+                raise RuntimeError(f'{path} -> {statuses[0]}')
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=hammer) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # 连接池模式下 connection_created 在每次借出时都会触发，物理连接数以池统计为准
+    from django.db import connections
+    pools = getattr(type(connections['default']), '_pools', None)
+    if pools:
+        physical = sum(pool.get_stats().get('connections_num', 0) for pool in pools.values())
+    else:
+        physical = len(opened)
+
+    ms = [value * 1000 for value in latencies]
+    print(json.dumps({
+        'requests': len(ms),
+        'connections_opened': physical,
+        'rps': round(len(ms) / elapsed, 1),
+        'mean_ms': round(statistics.mean(ms), 2),
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比数据库连接管理模式')
+    parser.add_argument('--modes', nargs='+', default=['baseline', 'persistent', 'pool'],
+                        choices=['baseline', 'persistent', 'pool', 'pgbouncer'])
+    parser.add_argument('--threads', type=int, default=4, help='并发线程数')
+    parser.add_argument('--requests', type=int, default=200, help='每个线程的请求数')
+    parser.add_argument('--path', action='append', dest='paths', help='压测路径，可重复指定')
+    parser.add_argument('--prepared', action='store_true', help='开启服务端预处理语句')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.paths = args.paths or ['/api/v1/posts/', '/api/v1/categories/', '/api/v1/tags/']
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = {}
+    for mode in args.modes:
+        env = {**os.environ, 'DB_CONNECTION_MODE': mode}
+        if args.prepared:
+            env['DB_PREPARED_STATEMENTS'] = '1'
+        command = [sys.executable, os.path.abspath(__file__), '--worker',
+                   '--threads', str(args.threads), '--requests', str(args.requests)]
+        for path in args.paths:
+            command += ['--path', path]
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'mode':<11} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'conns':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<11} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['connections_opened']:>7}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'threads': args.threads, 'prepared': args.prepared, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
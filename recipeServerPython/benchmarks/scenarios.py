@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""
+博客接口压测场景。对运行中的服务按场景施压，输出 rps 和 p50/p95/p99 延迟，
+结果保存为 JSON（带提交号），可以与之前的结果对比。
+
+先生成数据集并启动服务：
+    python manage.py generate_benchmark_data --posts 1000000 --tags 100000
+    gunicorn -c ../gunicorn_config.py --bind 127.0.0.1:8000 recipe_server.wsgi:application
+
+然后运行：
+    python benchmarks/scenarios.py --base-url http://127.0.0.1:8000 \\
+        --scenarios list deep_page search detail map write \\
+        --username bench-0 --password Bench123! \\
+        --output benchmarks/results/$(git rev-parse --short HEAD).json \\
+        --compare benchmarks/results/<上一次>.json
+
+场景：
+    list       文章列表前几页
+    deep_page  随机深分页（靠后的页码）
+    search     关键词搜索
+    detail     文章详情（slug 从列表中随机采样）
+    map        地图页加载：按顺序翻页读取带坐标的文章
+    write      登录用户创建草稿（会在库中留下 bench write 开头的草稿）
+
+只使用标准库，每个并发客户端顺序发送请求（Connection: close）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+SEARCH_WORDS = ['Python', 'Django', '缓存', '旅行', '数据库', '性能', '摄影', 'Docker']
+PAGE_SIZE = 10
+
+
+async def request(host, port, method, path, timeout, body=None, headers=None):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {host}',
+            'Accept: application/json',
+            'Connection: close',
+        ]
+        if body is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(payload)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + payload)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        raw = await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1]), raw.split(b'\r\n\r\n', 1)[-1]
+    finally:
+        writer.close()
+
+
+async def get_json(ctx, path):
+    status, body = await request(ctx['host'], ctx['port'], 'GET', path, ctx['timeout'])
+    if status != 200:
+        raise RuntimeError(f'GET {path} -> {status}')
+    return json.loads(body)
+
+
+class Scenarios:
+    """每个场景返回下一次请求的 (method, path, body)；map 场景按客户端记录翻页位置"""
+
+    def __init__(self, ctx, post_count, slugs, token):
+        self.ctx = ctx
+        self.last_page = max((post_count + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        self.slugs = slugs
+        self.token = token
+        self.map_pages = {}
+
+    def list(self, rnd, client):
+        return 'GET', f'/api/v1/posts/?page={rnd.randint(1, min(5, self.last_page))}', None
+
+    def deep_page(self, rnd, client):
+        low = max(self.last_page // 2, 1)
+        return 'GET', f'/api/v1/posts/?page={rnd.randint(low, self.last_page)}', None
+
+    def search(self, rnd, client):
+        return 'GET', f'/api/v1/search/?q={quote(rnd.choice(SEARCH_WORDS))}', None
+
+    def detail(self, rnd, client):
+        return 'GET', f'/api/v1/posts/{rnd.choice(self.slugs)}/', None
+
+    def map(self, rnd, client):
+        page = self.map_pages.get(client, 0) % min(self.ctx['map_pages'], self.last_page) + 1
+        self.map_pages[client] = page
+        return 'GET', f'/api/v1/posts/?page={page}', None
+
+    def write(self, rnd, client):
+        body = {
+            'title': f'bench write {client} {rnd.random():.8f}',
+            'content': '压测写入 ' * 50,
+            'status': 'draft',
+        }
+        return 'POST', '/api/v1/posts/', body
+
+
+async def prepare(ctx, need_token, username, password):
+    """读取文章总数、采样 slug，需要时登录获取 token"""
+    first = await get_json(ctx, '/api/v1/posts/')
+    count = first['count']
+    last_page = max((count + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    slugs = [post['slug'] for post in first['results']]
+    for page in random.Random(0).sample(range(2, last_page + 1), k=min(20, last_page - 1)):
+        slugs += [post['slug'] for post in (await get_json(ctx, f'/api/v1/posts/?page={page}'))['results']]
+
+    token = None
+    if need_token:
+        status, body = await request(
+            ctx['host'], ctx['port'], 'POST', '/api/v1/auth/token/', ctx['timeout'],
+            body={'username': username, 'password': password}
+        )
+        if status != 200:
+            raise RuntimeError(f'登录失败: {status} {body[:200]!r}')
+        token = json.loads(body)['access']
+    return count, slugs, token
+
+
+async def client(ctx, scenario, scenarios, deadline, latencies, errors, n):
+    rnd = random.Random(n)
+    headers = {'Authorization': f'Bearer {scenarios.token}'} if scenarios.token else None
+    while time.monotonic() < deadline:
+        method, path, body = getattr(scenarios, scenario)(rnd, n)
+        start = time.perf_counter()
+        try:
+            status, _ = await request(ctx['host'], ctx['port'], method, path, ctx['timeout'], body, headers)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            errors.append(path)
+            continue
+        if status >= 400:
+            errors.append(path)
+        else:
+            latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(int(round(pct / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+async def run_scenario(ctx, scenario, scenarios, concurrency, duration):
+    latencies, errors = [], []
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*[
+        client(ctx, scenario, scenarios, deadline, latencies, errors, n) for n in range(concurrency)
+    ])
+    elapsed = time.monotonic() - started
+    ms = [value * 1000 for value in latencies]
+    return {
+        'requests': len(ms),
+        'errors': len(errors),
+        'rps': round(len(ms) / elapsed, 1),
+        'mean_ms': round(statistics.mean(ms), 2) if ms else None,
+        'p50_ms': round(percentile(ms, 50), 2) if ms else None,
+        'p95_ms': round(percentile(ms, 95), 2) if ms else None,
+        'p99_ms': round(percentile(ms, 99), 2) if ms else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, baseline=None):
+    print(f"{'scenario':<10} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for scenario, r in results.items():
+        line = f"{scenario:<10} {r['rps']:>8} {r['p50_ms']!s:>8} {r['p95_ms']!s:>8} {r['p99_ms']!s:>8} {r['errors']:>7}"
+        old = (baseline or {}).get(scenario)
+        if old and old.get('rps') and r['p95_ms'] and old.get('p95_ms'):
+            line += f"   rps {(r['rps'] / old['rps'] - 1) * 100:+.1f}%  p95 {(r['p95_ms'] / old['p95_ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='博客接口压测场景')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='服务地址')
+    parser.add_argument('--scenarios', nargs='+', default=['list', 'deep_page', 'search', 'detail', 'map'],
+                        choices=['list', 'deep_page', 'search', 'detail', 'map', 'write'])
+    parser.add_argument('--concurrency', type=int, default=20, help='并发客户端数')
+    parser.add_argument('--duration', type=float, default=20, help='每个场景的压测时长（秒）')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时（秒）')
+    parser.add_argument('--map-pages', type=int, default=20, help='map 场景每个客户端循环翻阅的页数')
+    parser.add_argument('--username', help='write 场景使用的账号')
+    parser.add_argument('--password', help='write 场景使用的密码')
+    parser.add_argument('--label', help='本次结果的备注（默认使用 git 提交号）')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    parser.add_argument('--compare', help='与之前保存的JSON结果对比')
+    args = parser.parse_args()
+
+    parts = urlsplit(args.base_url)
+    ctx = {'host': parts.hostname, 'port': parts.port or 80, 'timeout': args.timeout, 'map_pages': args.map_pages}
+    if 'write' in args.scenarios and not (args.username and args.password):
+        parser.error('write 场景需要 --username 和 --password')
+
+    async def run_all():
+        count, slugs, token = await prepare(ctx, 'write' in args.scenarios, args.username, args.password)
+        scenarios = Scenarios(ctx, count, slugs, token)
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(ctx, scenario, scenarios, args.concurrency, args.duration)
+        return count, results
+
+    post_count, results = asyncio.run(run_all())
+    report = {
+        'label': args.label or git_revision(),
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'base_url': args.base_url,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'post_count': post_count,
+        'results': results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"对比基准: {baseline.get('label')} ({baseline.get('timestamp')})")
+    print_report(results, baseline and baseline['results'])
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+测量 worker 启动耗时和常驻内存：对比 API_SCHEMA_ENABLED=1（加载 drf_spectacular，
+在线生成文档）与 API_SCHEMA_ENABLED=0（使用预生成的 schema 文件）。
+
+每次在全新的子进程中完成 gunicorn worker 启动时做的事：加载 WSGI application，
+并导入 URLconf（第一个请求到来时会导入全部视图和序列化器），记录耗时、
+ru_maxrss 和已导入的模块数。
+
+用法：
+    python benchmarks/worker_boot.py --runs 10
+    python benchmarks/worker_boot.py --settings recipe_server.settings --output results/boot.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_CODE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'boot_ms': elapsed * 1000,
+    'maxrss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'spectacular_loaded': 'drf_spectacular' in sys.modules,
+}))
+"""
+
+
+def measure(settings_module, schema_enabled, runs):
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': settings_module,
+        'API_SCHEMA_ENABLED': '1' if schema_enabled else '0',
+        'PYTHONPATH': os.pathsep.join(filter(None, [BASE_DIR, os.environ.get('PYTHONPATH')])),
+    }
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', WORKER_CODE], env=env, cwd=BASE_DIR,
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'boot_ms': round(statistics.median(s['boot_ms'] for s in samples), 1),
+        'maxrss_mb': round(statistics.median(s['maxrss_mb'] for s in samples), 1),
+        'modules': samples[-1]['modules'],
+        'spectacular_loaded': samples[-1]['spectacular_loaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量 worker 启动耗时和内存')
+    parser.add_argument('--settings', default='recipe_server.settings_production', help='DJANGO_SETTINGS_MODULE')
+    parser.add_argument('--runs', type=int, default=5, help='每种模式启动的次数（取中位数）')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    args = parser.parse_args()
+
+    results = {
+        'live_schema': measure(args.settings, True, args.runs),
+        'static_schema': measure(args.settings, False, args.runs),
+    }
+
+    print(f"{'mode':<14} {'boot_ms':>8} {'rss_mb':>8} {'modules':>8} {'spectacular':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<14} {r['boot_ms']:>8} {r['maxrss_mb']:>8} {r['modules']:>8} {r['spectacular_loaded']!s:>12}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
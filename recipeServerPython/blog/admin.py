@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import Comment
+from .moderation import approve_comments, reject_comments
 
-# Register your models here.
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('author_name', 'post', 'created_at', 'is_approved')
+    list_filter = ('is_approved', 'created_at')
+    search_fields = ('author_name', 'author_email', 'content')
+    list_select_related = ('post',)
+    actions = ['approve_selected', 'reject_selected']
+
+    @admin.action(description='批量通过所选评论')
+    def approve_selected(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        count = approve_comments(ids)
+        self.message_user(request, f'已通过 {count} 条评论')
+
+    @admin.action(description='批量拒绝（删除）所选评论')
+    def reject_selected(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        count = reject_comments(ids)
+        self.message_user(request, f'已拒绝 {count} 条评论')
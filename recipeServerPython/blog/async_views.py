@@ -0,0 +1,205 @@
+"""
+博客只读接口的异步实现（ASGI + uvicorn worker 部署时启用）。
+
+匿名的 GET 请求直接在事件循环中使用异步 ORM 查询，慢查询不会占住整个
+worker；带认证信息的请求和写操作仍转交给原有的同步 DRF 视图处理，
+保证权限判断（如 `author=me`、管理员查看草稿）与同步模式完全一致。
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipe_server.compression import apply_encoding, select
+from recipe_server.db.routers import use_primary
+
+from .cache import POST_DETAIL_CACHE_TIMEOUT, post_detail_cache_key, post_detail_entry
+from .models import BlogPost, Category, Tag
+from .queries import annotate_post_count, post_list_queryset
+from .serializers import (
+    BlogPostListSerializer, BlogPostSerializer, CategorySerializer, TagSerializer
+)
+from . import views
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _encoded(request, encoded):
+    """返回缓存中预先渲染好的 JSON，按 Accept-Encoding 选择压缩版本"""
+    body, encoding = select(encoded, request)
+    response = HttpResponse(body, content_type='application/json')
+    apply_encoding(response, encoding)
+    return response
+
+
+def _is_anonymous_read(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def _int_param(request, name, default):
+    try:
+        return int(request.GET.get(name, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def _page(request, count, page_size):
+    page = _int_param(request, 'page', 1)
+    last_page = max((count + page_size - 1) // page_size, 1)
+    if page < 1 or page > last_page:
+        raise Http404('无效页面。')
+    return page, last_page
+
+
+def _page_links(request, page, last_page):
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page < last_page else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return next_url, previous_url
+
+
+async def _paginate(request, queryset, serializer_class, page_size=None):
+    """与 PageNumberPagination 输出格式一致的异步分页"""
+    page_size = page_size or api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    page, last_page = _page(request, count, page_size)
+    offset = (page - 1) * page_size
+    items = [obj async for obj in queryset[offset:offset + page_size]]
+    next_url, previous_url = _page_links(request, page, last_page)
+    return {
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': serializer_class(items, many=True, context={'request': request}).data,
+    }
+
+
+def _paginate_list(request, items, serializer_class):
+    """推荐/热门接口已截断为 limit 条，按同步版本的格式分页"""
+    page_size = api_settings.PAGE_SIZE
+    page, last_page = _page(request, len(items), page_size)
+    offset = (page - 1) * page_size
+    next_url, previous_url = _page_links(request, page, last_page)
+    return {
+        'count': len(items),
+        'next': next_url,
+        'previous': previous_url,
+        'results': serializer_class(items[offset:offset + page_size], many=True, context={'request': request}).data,
+    }
+
+
+def _with_sync_fallback(sync_view):
+    """匿名 GET 走异步实现，其余请求交给同步 DRF 视图"""
+    def decorator(async_view):
+        @csrf_exempt
+        async def view(request, *args, **kwargs):
+            if _is_anonymous_read(request):
+                try:
+                    return await async_view(request, *args, **kwargs)
+                except Http404:
+                    return _json({'detail': '未找到。'}, status=404)
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        return view
+    return decorator
+
+
+@_with_sync_fallback(views.BlogPostViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def post_list(request):
+    queryset = post_list_queryset().filter(status='published')
+
+    category = request.GET.get('category')
+    if category:
+        queryset = queryset.filter(categories__slug=category)
+    tag = request.GET.get('tag')
+    if tag:
+        queryset = queryset.filter(tags__slug=tag)
+    search = request.GET.get('search')
+    if search:
+        queryset = queryset.filter(
+            Q(title__icontains=search) |
+            Q(content__icontains=search) |
+            Q(excerpt__icontains=search)
+        )
+    author = request.GET.get('author')
+    if author:
+        queryset = queryset.filter(author__username=author)
+
+    queryset = queryset.distinct().order_by('-published_at', '-created_at')
+    return _json(await _paginate(request, queryset, BlogPostListSerializer))
+
+
+@_with_sync_fallback(views.BlogPostViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}))
+async def post_detail(request, slug):
+    key = post_detail_cache_key(slug)
+    entry = await cache.aget(key)
+    if entry is None:
+        with use_primary():
+            try:
+                post = await post_list_queryset().aget(slug=slug)
+            except BlogPost.DoesNotExist:
+                raise Http404
+            data = BlogPostSerializer(post, context={'request': request}).data
+        if post.status != 'published':
+            return _json(data)
+        entry = post_detail_entry(data)
+        await cache.aset(key, entry, POST_DETAIL_CACHE_TIMEOUT)
+    return _encoded(request, entry['encoded'])
+
+
+@_with_sync_fallback(views.FeaturedPostsView.as_view())
+async def featured_posts(request):
+    limit = _int_param(request, 'limit', 5)
+    queryset = post_list_queryset().filter(status='published', is_featured=True)[:limit]
+    posts = [post async for post in queryset]
+    return _json(_paginate_list(request, posts, BlogPostListSerializer))
+
+
+@_with_sync_fallback(views.PopularPostsView.as_view())
+async def popular_posts(request):
+    limit = _int_param(request, 'limit', 10)
+    queryset = post_list_queryset().filter(status='published').order_by('-view_count')[:limit]
+    posts = [post async for post in queryset]
+    return _json(_paginate_list(request, posts, BlogPostListSerializer))
+
+
+@_with_sync_fallback(views.search_posts)
+async def search_posts(request):
+    query = request.GET.get('q', '')
+    if not query:
+        return _json({'results': [], 'count': 0})
+    queryset = post_list_queryset().filter(
+        Q(title__icontains=query) |
+        Q(content__icontains=query) |
+        Q(excerpt__icontains=query),
+        status='published'
+    )
+    return _json(await _paginate(request, queryset, BlogPostListSerializer, page_size=10))
+
+
+@_with_sync_fallback(views.CategoryListView.as_view())
+async def category_list(request):
+    queryset = annotate_post_count(Category.objects.all())
+    return _json(await _paginate(request, queryset, CategorySerializer))
+
+
+@_with_sync_fallback(views.TagListView.as_view())
+async def tag_list(request):
+    queryset = annotate_post_count(Tag.objects.all())
+    return _json(await _paginate(request, queryset, TagSerializer))
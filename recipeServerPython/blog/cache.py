@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from recipe_server.compression import precompress
+
+# 文章详情缓存时间（秒）
+POST_DETAIL_CACHE_TIMEOUT = 60 * 5
+
+
+def post_detail_cache_key(slug):
+    """文章详情响应的缓存键"""
+    return f'blog:post:v2:{slug}'
+
+
+def post_detail_entry(data):
+    """缓存条目：序列化数据和预先渲染、压缩好的 JSON（{编码: 内容}）"""
+    return {'data': data, 'encoded': precompress(JSONRenderer().render(data))}
+
+
+def get_cached_post_detail(slug):
+    return cache.get(post_detail_cache_key(slug))
+
+
+def set_cached_post_detail(slug, data):
+    entry = post_detail_entry(data)
+    cache.set(post_detail_cache_key(slug), entry, POST_DETAIL_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_post_details(slugs):
+    """一次性删除多篇文章的详情缓存"""
+    keys = [post_detail_cache_key(slug) for slug in slugs]
+    if keys:
+        cache.delete_many(keys)
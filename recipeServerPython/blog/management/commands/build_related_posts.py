@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from blog.related import RELATED_TOP_K, rebuild_related_posts
+
+class Command(BaseCommand):
+    help = '根据标签/分类共现全量重算相关文章'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=RELATED_TOP_K, help='每篇文章保留的相关文章数量')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批参与矩阵乘法的文章数')
+
+    def handle(self, *args, **options):
+        count = rebuild_related_posts(top_k=options['top_k'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'相关文章计算完成，共写入 {count} 条记录'))
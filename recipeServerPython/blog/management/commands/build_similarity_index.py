@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blog.similarity import rebuild_index
+
+class Command(BaseCommand):
+    help = '全量重建文章内容相似度索引（TF-IDF向量）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dim', type=int, default=settings.SIMILARITY_VECTOR_DIM, help='哈希特征向量维度')
+
+    def handle(self, *args, **options):
+        count = rebuild_index(dim=options['dim'])
+        self.stdout.write(self.style.SUCCESS(f'相似度索引重建完成，共 {count} 篇文章'))
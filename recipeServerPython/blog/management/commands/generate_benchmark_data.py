@@ -0,0 +1,176 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from blog.models import BlogPost, Category, Comment, Tag
+
+WORDS = [
+    'Python', 'Django', 'React', 'Vue', 'PostgreSQL', 'Linux', '缓存', '索引', '性能', '部署',
+    '前端', '后端', '数据库', '算法', '设计模式', '旅行', '美食', '摄影', '读书', '电影',
+    '音乐', '生活', '城市', '周末', '咖啡', '清晨', '山间', '海边', '记录', '思考',
+    'async', 'API', 'Docker', 'nginx', 'gunicorn', '异步', '并发', '测试', '重构', '优化',
+]
+
+# 有地理位置的文章分布在这些城市附近（地图页面使用）
+CITIES = [
+    ('北京', 39.9042, 116.4074), ('上海', 31.2304, 121.4737), ('杭州', 30.2741, 120.1551),
+    ('成都', 30.5728, 104.0668), ('西安', 34.3416, 108.9398), ('广州', 23.1291, 113.2644),
+    ('昆明', 25.0389, 102.7183), ('拉萨', 29.6500, 91.1000),
+]
+
+
+class Command(BaseCommand):
+    help = '批量生成压测数据：文章、标签、分类、评论和历史记录（可到百万级）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000, help='文章数量')
+        parser.add_argument('--tags', type=int, default=1000, help='额外生成的标签数量')
+        parser.add_argument('--categories', type=int, default=50, help='额外生成的分类数量')
+        parser.add_argument('--users', type=int, default=50, help='作者数量')
+        parser.add_argument('--comments', type=float, default=3, help='平均每篇文章的评论数')
+        parser.add_argument('--history-edits', type=float, default=1, help='平均每篇文章的修改历史条数')
+        parser.add_argument('--no-history', action='store_true', help='不生成历史记录')
+        parser.add_argument('--content-words', type=int, default=200, help='每篇正文的词数')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批写入的文章数')
+        parser.add_argument('--seed', type=int, default=42, help='随机数种子，便于不同提交间复现同一数据集')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        # 基础分类和标签沿用 init_blog_data，再补充合成数据
+        from init_blog_data import create_initial_data
+        create_initial_data()
+
+        # 用本次运行的起始 id 区分 slug / 名称，可以在已有数据上追加
+        self.run_id = (BlogPost.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        users = self._create_users(options['users'])
+        category_ids = self._create_named(Category, 'category', '分类', options['categories'])
+        tag_ids = self._create_named(Tag, 'tag', '标签', options['tags'])
+        # 标签使用频率近似长尾分布：少数热门标签覆盖大部分文章
+        tag_cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(tag_ids))))
+
+        total, batch_size = options['posts'], options['batch_size']
+        for start in range(0, total, batch_size):
+            count = min(batch_size, total - start)
+            with transaction.atomic():
+                posts = self._create_posts(start, count, users, options)
+                self._create_links(posts, category_ids, tag_ids, tag_cum_weights)
+                self._create_comments(posts, options['comments'])
+                if not options['no_history']:
+                    self._create_history(posts, options['history_edits'])
+            self.stdout.write(f'已写入 {start + count}/{total} 篇文章')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'压测数据生成完成，用时 {elapsed:.1f} 秒。'
+            f'如需相关文章/相似文章数据，请再运行 build_related_posts 和 build_similarity_index'
+        ))
+
+    def _create_users(self, count):
+        password = make_password('Bench123!')
+        existing = set(User.objects.filter(username__startswith='bench-').values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'bench-{i}', email=f'bench-{i}@example.com', password=password)
+            for i in range(count) if f'bench-{i}' not in existing
+        ], batch_size=1000)
+        return list(User.objects.filter(username__startswith='bench-').values_list('id', flat=True))
+
+    def _create_named(self, model, slug_prefix, name_prefix, count):
+        model.objects.bulk_create([
+            model(name=f'{name_prefix}{self.run_id}-{i}', slug=f'{slug_prefix}-{self.run_id}-{i}')
+            for i in range(count)
+        ], batch_size=5000)
+        return list(model.objects.order_by('id').values_list('id', flat=True))
+
+    def _text(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words))
+
+    def _create_posts(self, start, count, users, options):
+        now = timezone.now()
+        posts = []
+        for i in range(start, start + count):
+            status = 'published' if self.random.random() < 0.9 else self.random.choice(['draft', 'pending'])
+            created_at = now - timedelta(minutes=self.random.randint(0, 5 * 365 * 24 * 60))
+            post = BlogPost(
+                title=f'{self._text(4)} {i}',
+                slug=f'bench-{self.run_id}-{i}',
+                excerpt=self._text(20),
+                content=self._text(options['content_words']),
+                author_id=self.random.choice(users),
+                status=status,
+                is_featured=self.random.random() < 0.02,
+                view_count=int(self.random.paretovariate(1.2) * 10),
+                published_at=created_at if status == 'published' else None,
+            )
+            if self.random.random() < 0.3:
+                city, lat, lng = self.random.choice(CITIES)
+                post.latitude = lat + self.random.uniform(-0.3, 0.3)
+                post.longitude = lng + self.random.uniform(-0.3, 0.3)
+                post.location_name = city
+            posts.append(post)
+        posts = BlogPost.objects.bulk_create(posts)
+        # auto_now_add 字段在 bulk_create 时被设置为当前时间，改成与发布时间一致的分布
+        for post in posts:
+            post.created_at = post.published_at or now
+        BlogPost.objects.bulk_update(posts, ['created_at'], batch_size=5000)
+        return posts
+
+    def _create_links(self, posts, category_ids, tag_ids, tag_cum_weights):
+        category_links, tag_links = [], []
+        for post in posts:
+            for category_id in set(self.random.sample(category_ids, k=min(len(category_ids), self.random.randint(1, 2)))):
+                category_links.append(BlogPost.categories.through(blogpost_id=post.id, category_id=category_id))
+            for tag_id in set(self.random.choices(tag_ids, cum_weights=tag_cum_weights, k=self.random.randint(2, 6))):
+                tag_links.append(BlogPost.tags.through(blogpost_id=post.id, tag_id=tag_id))
+        BlogPost.categories.through.objects.bulk_create(category_links, batch_size=10000)
+        BlogPost.tags.through.objects.bulk_create(tag_links, batch_size=10000)
+
+    def _create_comments(self, posts, average):
+        comments = []
+        for post in posts:
+            if not post.allow_comments:
+                continue
+            for _ in range(round(self.random.expovariate(1 / average)) if average else 0):
+                comments.append(Comment(
+                    post_id=post.id,
+                    author_name=f'读者{self.random.randint(1, 100000)}',
+                    author_email='reader@example.com',
+                    content=self._text(15),
+                    is_approved=self.random.random() < 0.9,
+                ))
+        Comment.objects.bulk_create(comments, batch_size=10000)
+        # 维护评论数冗余字段
+        approved = {}
+        for comment in comments:
+            if comment.is_approved:
+                approved[comment.post_id] = approved.get(comment.post_id, 0) + 1
+        for post in posts:
+            post.comment_count = approved.get(post.id, 0)
+        BlogPost.objects.bulk_update(posts, ['comment_count'], batch_size=5000)
+
+    def _create_history(self, posts, average):
+        """每篇文章一条创建记录，再按平均数补充若干修改记录"""
+        HistoricalBlogPost = BlogPost.history.model
+        fields = [field.attname for field in BlogPost._meta.concrete_fields]
+        records = []
+        for post in posts:
+            values = {name: getattr(post, name) for name in fields}
+            history_date = post.created_at
+            records.append(HistoricalBlogPost(
+                **values, history_date=history_date, history_type='+', history_user_id=post.author_id
+            ))
+            for _ in range(round(self.random.expovariate(1 / average)) if average else 0):
+                history_date += timedelta(hours=self.random.randint(1, 240))
+                records.append(HistoricalBlogPost(
+                    **values, history_date=history_date, history_type='~', history_user_id=post.author_id
+                ))
+        HistoricalBlogPost.objects.bulk_create(records, batch_size=10000)
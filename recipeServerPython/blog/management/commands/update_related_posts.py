@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from blog.related import process_related_changes
+
+class Command(BaseCommand):
+    help = '增量更新标签/分类或发布状态有变化的文章的相关文章，可由 cron 每分钟执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批增量更新的文章数')
+
+    def handle(self, *args, **options):
+        count = process_related_changes(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'相关文章增量更新完成，共处理 {count} 篇文章'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from blog.similarity import update_index
+
+class Command(BaseCommand):
+    help = '增量更新文章内容相似度索引（写入新发布和修改过的文章，移除已下线的文章），可由 cron 每分钟执行'
+
+    def handle(self, *args, **options):
+        result = update_index()
+        if result is None:
+            self.stdout.write('相似度索引不存在，请先执行 build_similarity_index')
+            return
+        written, removed = result
+        self.stdout.write(self.style.SUCCESS(f'相似度索引更新完成，写入 {written} 篇，移除 {removed} 篇'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_relatedpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='由 recipe_server.images 在后台生成', verbose_name='特色图片尺寸版本'),
+        ),
+        migrations.AddField(
+            model_name='historicalblogpost',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='由 recipe_server.images 在后台生成', verbose_name='特色图片尺寸版本'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-19 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_blogpost_featured_image_variants_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPostChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField(verbose_name='文章ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='记录时间')),
+            ],
+            options={
+                'verbose_name': '待更新相关文章',
+                'verbose_name_plural': '待更新相关文章',
+                'ordering': ['id'],
+            },
+        ),
+    ]
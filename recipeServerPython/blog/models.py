@@ -95,6 +95,10 @@ class BlogPost(models.Model):
     excerpt = models.TextField('摘要', max_length=500, blank=True)
     content = models.TextField('内容')
     featured_image = models.ImageField('特色图片', upload_to='blog/images/', blank=True, null=True)
+    featured_image_variants = models.JSONField(
+        '特色图片尺寸版本', default=dict, blank=True, editable=False,
+        help_text='由 recipe_server.images 在后台生成'
+    )
     
     author = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='作者', related_name='blog_posts')
     categories = models.ManyToManyField(Category, verbose_name='分类', related_name='posts', blank=True)
@@ -105,6 +109,7 @@ class BlogPost(models.Model):
     allow_comments = models.BooleanField('允许评论', default=True)
     
     view_count = models.PositiveIntegerField('浏览次数', default=0)
+    comment_count = models.PositiveIntegerField('评论数', default=0, help_text='已审核评论数，由评论审核流程批量维护')
     
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
@@ -127,6 +132,15 @@ class BlogPost(models.Model):
         verbose_name_plural = '博客文章'
         ordering = ['-created_at']
     
+    # 从数据库读出时的状态，发布/下线时据此增量更新相关文章（见 blog.signals）
+    _loaded_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             # 生成唯一的slug
@@ -147,6 +161,7 @@ class BlogPost(models.Model):
             self.published_at = timezone.now()
         
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
     
     def __str__(self):
         return self.title
@@ -171,6 +186,45 @@ class Comment(models.Model):
         verbose_name = '评论'
         verbose_name_plural = '评论'
         ordering = ['created_at']
+        indexes = [
+            # 审核队列按 (is_approved, id) 做键集分页
+            models.Index(fields=['is_approved', 'id'], name='comment_moderation_idx'),
+        ]
     
     def __str__(self):
         return f'{self.author_name} 对 {self.post.title} 的评论'
+
+class RelatedPost(models.Model):
+    """相关文章（由标签/分类共现离线计算，详情页直接读取）"""
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, verbose_name='文章', related_name='related_entries')
+    related_post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, verbose_name='相关文章', related_name='+')
+    score = models.FloatField('相似度')
+
+    class Meta:
+        verbose_name = '相关文章'
+        verbose_name_plural = '相关文章'
+        ordering = ['post', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related_post'], name='unique_related_post'),
+        ]
+        indexes = [
+            models.Index(fields=['post', '-score'], name='related_post_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_post_id} ({self.score:.3f})'
+
+
+class RelatedPostChange(models.Model):
+    """等待重算相关文章的文章：标签/分类或发布状态变化时写入，由 update_related_posts 命令处理"""
+    # 不用外键：文章删除后仍要处理把它列为相关文章的那些文章
+    post_id = models.BigIntegerField('文章ID')
+    created_at = models.DateTimeField('记录时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '待更新相关文章'
+        verbose_name_plural = '待更新相关文章'
+        ordering = ['id']
+
+    def __str__(self):
+        return str(self.post_id)
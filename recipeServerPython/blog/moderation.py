@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import logging
+import threading
+
+from .cache import invalidate_post_details
+from .models import BlogPost, Comment
+
+logger = logging.getLogger(__name__)
+
+# 单次审核请求允许提交的最大评论数量
+MAX_MODERATION_BATCH = 5000
+
+_local = threading.local()
+
+
+@contextmanager
+def _bulk_moderation():
+    """批量审核期间逐条评论的信号不重复计数，由审核函数统一刷新"""
+    _local.active = True
+    try:
+        yield
+    finally:
+        _local.active = False
+
+
+def in_bulk_moderation():
+    return getattr(_local, 'active', False)
+
+
+def pending_comments(after=None, limit=50):
+    """
+    按 id 键集分页获取待审核评论。
+
+    `after` 为上一页最后一条评论的 id，避免深分页时的 OFFSET 扫描。
+    """
+    queryset = Comment.objects.filter(is_approved=False).select_related('post').order_by('id')
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    return list(queryset[:limit])
+
+
+def refresh_comment_counts(post_ids):
+    """用一条 UPDATE 重新计算多篇文章的已审核评论数"""
+    if not post_ids:
+        return 0
+    approved = (
+        Comment.objects.filter(post=OuterRef('pk'), is_approved=True)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return BlogPost.objects.filter(id__in=post_ids).update(
+        comment_count=Coalesce(Subquery(approved), 0)
+    )
+
+
+def _affected_posts(comment_ids):
+    rows = (
+        BlogPost.objects.filter(comments__id__in=comment_ids)
+        .order_by()
+        .values_list('id', 'slug')
+        .distinct()
+    )
+    return dict(rows)
+
+
+def refresh_post_comments(post_ids):
+    """单条评论在审核流程之外被修改或删除（如后台编辑）时，刷新所属文章的评论数和详情缓存"""
+    _finish(dict(BlogPost.objects.filter(id__in=post_ids).values_list('id', 'slug')))
+
+
+def _finish(post_slugs):
+    refresh_comment_counts(list(post_slugs.keys()))
+    transaction.on_commit(lambda: invalidate_post_details(post_slugs.values()))
+
+
+@transaction.atomic
+def approve_comments(comment_ids):
+    """批量通过评论，返回实际被通过的评论数"""
+    comment_ids = list(comment_ids)
+    post_slugs = _affected_posts(comment_ids)
+    updated = Comment.objects.filter(id__in=comment_ids, is_approved=False).update(is_approved=True)
+    _finish(post_slugs)
+    logger.info(f"批量通过评论 {updated} 条，涉及文章 {len(post_slugs)} 篇")
+    return updated
+
+
+@transaction.atomic
+def reject_comments(comment_ids):
+    """批量拒绝（删除）评论及其回复，返回删除的评论数"""
+    comment_ids = list(comment_ids)
+    post_slugs = _affected_posts(comment_ids)
+    with _bulk_moderation():
+        deleted, _ = Comment.objects.filter(id__in=comment_ids).delete()
+    _finish(post_slugs)
+    logger.info(f"批量拒绝评论 {deleted} 条，涉及文章 {len(post_slugs)} 篇")
+    return deleted
@@ -0,0 +1,33 @@
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import BlogPost, Category, Tag
+
+
+def annotate_post_count(queryset):
+    """
+    为分类/标签查询集附加 `published_post_count`，
+    序列化时不再逐个调用 `post_count` 属性查询数据库。
+    """
+    relation = 'categories' if queryset.model is Category else 'tags'
+    published = (
+        BlogPost.objects.filter(**{relation: OuterRef('pk')}, status='published')
+        .order_by()
+        .values(relation)
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return queryset.annotate(published_post_count=Coalesce(Subquery(published), 0))
+
+
+def post_relation_prefetches(prefix=''):
+    """预取文章的分类/标签并带文章数；prefix 用于从关联模型出发预取，如 'related_post__'"""
+    return [
+        Prefetch(f'{prefix}categories', queryset=annotate_post_count(Category.objects.all())),
+        Prefetch(f'{prefix}tags', queryset=annotate_post_count(Tag.objects.all())),
+    ]
+
+
+def post_list_queryset():
+    """文章列表通用查询集：作者走 JOIN，分类/标签预取并带文章数"""
+    return BlogPost.objects.select_related('author').prefetch_related(*post_relation_prefetches())
@@ -0,0 +1,215 @@
+"""
+相关文章计算。
+
+把已发布文章表示为稀疏的 文章 × (标签 + 分类) 矩阵，行向量做 L2 归一化后
+相乘即得到余弦相似度，每篇文章只保留 top-k 写入 RelatedPost 表。
+
+标签/分类或发布状态变化时，请求中只向 RelatedPostChange 插入一条记录（enqueue_related_update），
+由 update_related_posts 命令（如每分钟一次 cron）批量增量更新，计算不在请求中进行。
+"""
+import logging
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+
+from .models import BlogPost, RelatedPost, RelatedPostChange
+
+logger = logging.getLogger(__name__)
+
+# 每篇文章保留的相关文章数量
+RELATED_TOP_K = 10
+# 分类比标签粒度更粗，共享分类的权重低于共享标签
+CATEGORY_WEIGHT = 0.5
+# IN 查询每批的参数个数
+QUERY_CHUNK_SIZE = 500
+
+
+def _post_features(posts):
+    """
+    读出文章的特征，返回 {文章id: {列: 权重}}。
+    标签占偶数列、分类占奇数列，列号只取决于标签/分类自身的id，增量替换行时不会错位。
+    """
+    features = {post_id: {} for post_id in posts.values_list('id', flat=True)}
+    tag_links = BlogPost.tags.through.objects.filter(blogpost__in=posts).values_list('blogpost_id', 'tag_id')
+    category_links = BlogPost.categories.through.objects.filter(blogpost__in=posts).values_list('blogpost_id', 'category_id')
+    for post_id, tag_id in tag_links.iterator():
+        features[post_id][2 * tag_id] = 1.0
+    for post_id, category_id in category_links.iterator():
+        features[post_id][2 * category_id + 1] = CATEGORY_WEIGHT
+    return features
+
+
+def _normalized_rows(rows, n_cols):
+    """把 [{列: 权重}, ...] 转成行归一化的稀疏矩阵"""
+    indptr, cols, weights = [0], [], []
+    for row in rows:
+        cols.extend(row.keys())
+        weights.extend(row.values())
+        indptr.append(len(cols))
+    matrix = sparse.csr_matrix(
+        (np.asarray(weights, dtype=np.float32), np.asarray(cols, dtype=np.int64), np.asarray(indptr)),
+        shape=(len(rows), n_cols)
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+def _n_cols(features):
+    return max((max(row) + 1 for row in features.values() if row), default=0)
+
+
+def build_feature_matrix():
+    """
+    构建行归一化的 文章 × 特征 稀疏矩阵。
+
+    返回 (matrix, post_ids)，matrix 的第 i 行对应 post_ids[i]。
+    """
+    features = _post_features(BlogPost.objects.filter(status='published'))
+    post_ids = np.asarray(sorted(features), dtype=np.int64)
+    matrix = _normalized_rows([features[post_id] for post_id in post_ids.tolist()], _n_cols(features))
+    return matrix, post_ids
+
+
+def _top_k_rows(similarity, post_ids, row_indices, top_k):
+    """从相似度矩阵的每一行中取出 top-k，生成 RelatedPost 实例"""
+    entries = []
+    for offset, i in enumerate(row_indices):
+        start, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+        cols, scores = similarity.indices[start:end], similarity.data[start:end]
+        # 去掉文章自身
+        keep = cols != i
+        cols, scores = cols[keep], scores[keep]
+        if not len(scores):
+            continue
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            cols, scores = cols[best], scores[best]
+        post_id = int(post_ids[i])
+        entries.extend(
+            RelatedPost(post_id=post_id, related_post_id=int(post_ids[col]), score=float(score))
+            for col, score in zip(cols, scores)
+        )
+    return entries
+
+
+def rebuild_related_posts(top_k=RELATED_TOP_K, batch_size=1000):
+    """全量重算所有已发布文章的相关文章，返回写入的记录数；开始前已记录的待更新文章一并清除"""
+    pending = RelatedPostChange.objects.order_by('-id').values_list('id', flat=True).first()
+    matrix, post_ids = build_feature_matrix()
+    transposed = matrix.T.tocsc()
+    entries = []
+    for start in range(0, matrix.shape[0], batch_size):
+        block = matrix[start:start + batch_size].dot(transposed).tocsr()
+        rows = range(start, min(start + batch_size, matrix.shape[0]))
+        entries.extend(_top_k_rows(block, post_ids, rows, top_k))
+
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(entries, batch_size=1000)
+        if pending is not None:
+            RelatedPostChange.objects.filter(id__lte=pending).delete()
+    logger.info(f"相关文章全量计算完成: {len(post_ids)} 篇文章, {len(entries)} 条记录")
+    return len(entries)
+
+
+def _chunks(values, size=QUERY_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def enqueue_related_update(post_ids):
+    """记录这些文章需要重算相关文章；在修改文章的同一事务中调用，只插入记录"""
+    post_ids = sorted(set(post_ids))
+    if post_ids:
+        RelatedPostChange.objects.bulk_create([RelatedPostChange(post_id=pk) for pk in post_ids])
+
+
+def update_related_posts(post_ids, top_k=RELATED_TOP_K, features=None):
+    """
+    增量更新标签/分类或发布状态发生变化的文章（post_ids）：
+
+    - 这些文章自身，以及原本把它们列入 top-k 的文章整行重算（分数变低或下线后要从
+      全部候选中补位）；
+    - 其他共享特征的文章只有在现在会把变化的文章排进 top-k 时，才把它合并进已有的
+      top-k，不整行重算。热门分类下的文章虽然都共享特征，也只算变化的那几行。
+
+    features 为 build_feature_matrix() 的结果，批量处理时可以复用。
+    """
+    matrix, all_ids = features if features is not None else build_feature_matrix()
+    row_of = {post_id: row for row, post_id in enumerate(all_ids.tolist())}
+    changed_ids = set(post_ids)
+    changed_rows = [row_of[pk] for pk in changed_ids if pk in row_of]
+
+    referencing = set()
+    for chunk in _chunks(changed_ids):
+        referencing.update(RelatedPost.objects.filter(related_post_id__in=chunk).values_list('post_id', flat=True))
+    full_rows = sorted(set(changed_rows) | {row_of[pk] for pk in referencing if pk in row_of})
+    full = set(full_rows)
+
+    # 变化的文章与所有文章的相似度，按对方文章收集：行 -> [(变化的文章id, 分数)]
+    offers = defaultdict(list)
+    if changed_rows:
+        similarity = matrix[changed_rows].dot(matrix.T).tocsr()
+        for offset, row in enumerate(changed_rows):
+            start, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+            for col, score in zip(similarity.indices[start:end].tolist(), similarity.data[start:end].tolist()):
+                if col not in full and score > 0:
+                    offers[col].append((int(all_ids[row]), score))
+
+    stored = defaultdict(list)
+    for chunk in _chunks(int(all_ids[row]) for row in offers):
+        for post_id, related_id, score in (
+            RelatedPost.objects.filter(post_id__in=chunk).values_list('post_id', 'related_post_id', 'score')
+        ):
+            stored[post_id].append((related_id, score))
+
+    merged_ids, entries = [], []
+    for row, offered in offers.items():
+        post_id = int(all_ids[row])
+        current = stored[post_id]
+        # top-k 没有排满时任何正分都能排进去，否则要超过当前最低分
+        floor = min(score for _, score in current) if len(current) >= top_k else 0
+        additions = [(related_id, score) for related_id, score in offered if score > floor]
+        if not additions:
+            continue
+        merged_ids.append(post_id)
+        best = sorted(current + additions, key=lambda entry: -entry[1])[:top_k]
+        entries.extend(
+            RelatedPost(post_id=post_id, related_post_id=related_id, score=float(score))
+            for related_id, score in best
+        )
+
+    if full_rows:
+        similarity = matrix[full_rows].dot(matrix.T).tocsr()
+        entries.extend(_top_k_rows(similarity, all_ids, full_rows, top_k))
+
+    # 已不再发布的文章直接清空
+    stale = changed_ids - set(row_of)
+    replaced = [int(all_ids[row]) for row in full_rows] + merged_ids + list(stale)
+    with transaction.atomic():
+        for chunk in _chunks(replaced):
+            RelatedPost.objects.filter(post_id__in=chunk).delete()
+        RelatedPost.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def process_related_changes(batch_size=1000):
+    """
+    处理排队的文章，返回处理的文章数。特征矩阵每次运行构建一次，按 batch_size 篇
+    一批增量更新；只删除已经读出并处理过的记录，处理期间新提交的留给下次。
+    """
+    changes = list(RelatedPostChange.objects.order_by('id').values_list('id', 'post_id'))
+    if not changes:
+        return 0
+    post_ids = sorted({post_id for _, post_id in changes})
+    features = build_feature_matrix()
+    for chunk in _chunks(post_ids, batch_size):
+        update_related_posts(chunk, features=features)
+    for chunk in _chunks(change_id for change_id, _ in changes):
+        RelatedPostChange.objects.filter(id__in=chunk).delete()
+    logger.info(f"相关文章增量更新完成: {len(post_ids)} 篇文章")
+    return len(post_ids)
@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from recipe_server.images import ProcessedImageField, variant_map
+from recipe_server.timing import TimedSerializerMixin
 from django.contrib.auth.models import User
 from .models import BlogPost, Category, Tag, Comment
+from .moderation import MAX_MODERATION_BATCH
 
 class AuthorSerializer(serializers.ModelSerializer):
     """作者序列化器"""
@@ -15,23 +18,30 @@ class AuthorSerializer(serializers.ModelSerializer):
             return f"{obj.first_name} {obj.last_name}"
         return obj.username
 
-class CategorySerializer(serializers.ModelSerializer):
+class PostCountMixin:
+    """优先使用查询时附加的 published_post_count，避免逐条查询"""
+
+    def get_post_count(self, obj):
+        count = getattr(obj, 'published_post_count', None)
+        return obj.post_count if count is None else count
+
+class CategorySerializer(PostCountMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """分类序列化器"""
-    post_count = serializers.ReadOnlyField()
+    post_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'post_count']
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(PostCountMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """标签序列化器"""
-    post_count = serializers.ReadOnlyField()
+    post_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug', 'post_count']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """评论序列化器"""
     replies = serializers.SerializerMethodField()
     
@@ -42,10 +52,29 @@ class CommentSerializer(serializers.ModelSerializer):
     
     def get_replies(self, obj):
         if hasattr(obj, 'replies'):
-            return CommentSerializer(obj.replies.filter(is_approved=True), many=True).data
+            return CommentSerializer(obj.replies.filter(is_approved=True), many=True, context=self.context).data
         return []
 
-class HistoricalBlogPostSerializer(serializers.ModelSerializer):
+class ModerationCommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """待审核评论序列化器"""
+    post_slug = serializers.CharField(source='post.slug', read_only=True)
+    post_title = serializers.CharField(source='post.title', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'post', 'post_slug', 'post_title', 'author_name', 'author_email', 'content', 'created_at', 'parent']
+        read_only_fields = fields
+
+class CommentModerationSerializer(serializers.Serializer):
+    """批量审核请求序列化器"""
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_MODERATION_BATCH
+    )
+
+class HistoricalBlogPostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     history_user = AuthorSerializer(read_only=True)
     history_type_display = serializers.SerializerMethodField()
 
@@ -66,8 +95,16 @@ class HistoricalBlogPostSerializer(serializers.ModelSerializer):
     def get_history_type_display(self, obj):
         return obj.get_history_type_display()
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class FeaturedImageVariantsMixin:
+    """特色图片的尺寸版本（srcset 和模糊占位图），后台还没生成完时为 null（原图地址同样为 null）"""
+
+    def get_featured_image_variants(self, obj):
+        return variant_map(obj.featured_image_variants, self.context.get('request'))
+
+class BlogPostSerializer(FeaturedImageVariantsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """博客文章序列化器"""
+    featured_image = ProcessedImageField('featured_image_variants', required=False, allow_null=True)
+    featured_image_variants = serializers.SerializerMethodField()
     author = AuthorSerializer(read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -85,14 +122,14 @@ class BlogPostSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'slug', 'excerpt', 'content', 'featured_image',
+            'id', 'title', 'slug', 'excerpt', 'content', 'featured_image', 'featured_image_variants',
             'author', 'categories', 'tags', 'category_ids', 'tag_names',
-            'status', 'is_featured', 'allow_comments', 'view_count',
+            'status', 'is_featured', 'allow_comments', 'view_count', 'comment_count',
             'latitude', 'longitude', 'location_name',
             'created_at', 'updated_at', 'published_at',
             'meta_title', 'meta_description', 'meta_keywords'
         ]
-        read_only_fields = ['id', 'slug', 'author', 'view_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'slug', 'author', 'view_count', 'comment_count', 'created_at', 'updated_at']
     
     def create(self, validated_data):
         # 提取分类和标签数据
@@ -142,8 +179,10 @@ class BlogPostSerializer(serializers.ModelSerializer):
         
         return instance
 
-class BlogPostListSerializer(serializers.ModelSerializer):
+class BlogPostListSerializer(FeaturedImageVariantsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """博客文章列表序列化器（简化版）"""
+    featured_image = ProcessedImageField('featured_image_variants', read_only=True)
+    featured_image_variants = serializers.SerializerMethodField()
     author = AuthorSerializer(read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -151,9 +190,9 @@ class BlogPostListSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'slug', 'excerpt', 'featured_image',
+            'id', 'title', 'slug', 'excerpt', 'featured_image', 'featured_image_variants',
             'author', 'categories', 'tags',
-            'status', 'is_featured', 'view_count',
+            'status', 'is_featured', 'view_count', 'comment_count',
             'latitude', 'longitude', 'location_name',
             'created_at', 'updated_at', 'published_at'
         ] 
\ No newline at end of file
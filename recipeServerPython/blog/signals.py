@@ -0,0 +1,69 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipe_server.images import register_image_field
+
+from .cache import invalidate_post_details
+from .moderation import in_bulk_moderation, refresh_post_comments
+from .models import BlogPost, Comment
+from .related import enqueue_related_update
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_post_on_change(sender, instance, **kwargs):
+    invalidate_post_details([instance.slug])
+
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+@receiver(m2m_changed, sender=BlogPost.tags.through)
+def invalidate_post_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # 从分类/标签一侧修改关联时，instance 是分类或标签
+        slugs = BlogPost.objects.filter(pk__in=pk_set or []).values_list('slug', flat=True)
+        invalidate_post_details(list(slugs))
+    else:
+        invalidate_post_details([instance.slug])
+
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+@receiver(m2m_changed, sender=BlogPost.tags.through)
+def update_related_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # 只记录需要更新的文章，由 update_related_posts 命令计算
+    if reverse and action == 'pre_clear':
+        # 从分类/标签一侧清空时 post_clear 拿不到文章，清空前先记下
+        enqueue_related_update(instance.posts.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') or (action == 'post_clear' and not reverse):
+        enqueue_related_update((pk_set or []) if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=BlogPost)
+def update_related_on_status_change(sender, instance, created, raw=False, **kwargs):
+    # 发布和下线会增减参与计算的文章；状态没变的保存（包括新建草稿）不需要更新
+    if raw:
+        return
+    if created:
+        changed = instance.status == 'published'
+    else:
+        # 状态没有加载时（_loaded_status 为 None）无法判断，按已变化处理
+        changed = instance._loaded_status != instance.status
+    if changed:
+        enqueue_related_update([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_comment_count(sender, instance, created=False, raw=False, **kwargs):
+    # 新提交的评论未审核，不影响已审核评论数
+    if raw or in_bulk_moderation() or (created and not instance.is_approved):
+        return
+    refresh_post_comments([instance.post_id])
+
+
+def _invalidate_post(post):
+    invalidate_post_details([post.slug])
+
+
+register_image_field(BlogPost, 'featured_image', 'featured_image_variants', on_saved=_invalidate_post)
@@ -0,0 +1,313 @@
+"""
+基于正文内容的相似文章索引（"更多类似内容"）。
+
+标题、摘要和正文经 jieba 分词后做特征哈希，得到固定维度的 TF-IDF 向量并
+L2 归一化，所有向量按行存放在一个 float32 的内存映射文件中。查询时对整个
+矩阵做一次向量化点积即可得到余弦相似度。
+
+每次全量重建写入一个新的版本目录，写完后把符号链接 current 原子地切换过去，读取端
+始终从同一个版本目录读取全部文件，不会读到新旧文件混在一起的索引；上一个版本保留到
+下次重建，正在读取它的进程不受影响。增量更新在 current 指向的目录内进行。
+
+版本目录中的文件：
+    vectors.f32  行向量（n × dim，float32）
+    ids.i64      每行对应的文章 id（int64），已移除的行为 -1
+    df.f32       各哈希特征的文档频率
+    meta.json    维度、文档总数和上次更新的时间
+
+读取时还会核对向量文件的大小不小于 ids 行数 × 维度，不一致时沿用已打开的索引。
+"""
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BlogPost
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = 'vectors.f32'
+IDS_FILE = 'ids.i64'
+DF_FILE = 'df.f32'
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+CURRENT_LINK = 'current'
+VERSION_PREFIX = 'v'
+# 重建后保留的版本数（当前版本和上一个版本）
+KEEP_VERSIONS = 2
+# 已移除文章所在行的 id
+REMOVED_ID = -1
+
+_WORD_RE = re.compile(r'\w', re.UNICODE)
+
+
+def _index_dir():
+    return str(settings.SIMILARITY_INDEX_DIR)
+
+
+def _path(name, directory=None):
+    return os.path.join(directory or _index_dir(), name)
+
+
+def _current_dir():
+    """current 指向的版本目录（绝对路径），还没有建过索引时返回 None"""
+    link = _path(CURRENT_LINK)
+    if not os.path.islink(link):
+        return None
+    return os.path.realpath(link)
+
+
+def _switch_current(version):
+    """原子地把 current 指向新版本目录，并清理更早的版本"""
+    tmp_link = _path(CURRENT_LINK) + '.tmp'
+    if os.path.lexists(tmp_link):
+        os.unlink(tmp_link)
+    os.symlink(version, tmp_link)
+    os.replace(tmp_link, _path(CURRENT_LINK))
+
+    versions = sorted(name for name in os.listdir(_index_dir()) if name.startswith(VERSION_PREFIX))
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(_path(name), ignore_errors=True)
+
+
+@contextmanager
+def _locked():
+    """多个 worker 同时追加时用文件锁串行化写操作"""
+    os.makedirs(_index_dir(), exist_ok=True)
+    with open(_path(LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def tokenize(text):
+    """中文用 jieba 分词，英文统一小写，去掉标点和单个汉字"""
+    import jieba
+
+    tokens = []
+    for token in jieba.cut(text or ''):
+        token = token.strip().lower()
+        if not token or not _WORD_RE.search(token):
+            continue
+        if len(token) == 1 and not token.isascii():
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def hashed_term_counts(post, dim):
+    """把一篇文章转成 {特征下标: 词频}，标题权重加倍"""
+    text = ' '.join([post['title'], post['title'], post['excerpt'], post['content']])
+    counts = Counter()
+    for token in tokenize(text):
+        counts[zlib.crc32(token.encode('utf-8')) % dim] += 1
+    return counts
+
+
+def _vectorize(counts, df, n_docs, dim):
+    vector = np.zeros(dim, dtype=np.float32)
+    if not counts:
+        return vector
+    idx = np.fromiter(counts.keys(), dtype=np.int64)
+    tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32))
+    idf = np.log((1.0 + n_docs) / (1.0 + df[idx])) + 1.0
+    vector[idx] = tf * idf
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+def _post_rows(queryset):
+    return queryset.values('id', 'title', 'excerpt', 'content').iterator(chunk_size=500)
+
+
+def rebuild_index(dim=None):
+    """全量重建索引，写入新的版本目录后原子切换 current，返回建索引的文章数"""
+    dim = dim or settings.SIMILARITY_VECTOR_DIM
+    started = timezone.now()
+    docs = []
+    df = np.zeros(dim, dtype=np.float32)
+    for post in _post_rows(BlogPost.objects.filter(status='published').order_by('id')):
+        counts = hashed_term_counts(post, dim)
+        docs.append((post['id'], counts))
+        if counts:
+            df[np.fromiter(counts.keys(), dtype=np.int64)] += 1
+    n_docs = len(docs)
+
+    with _locked():
+        # 版本名按时间递增，清理时按名称排序即可
+        version = f'{VERSION_PREFIX}{time.time_ns()}'
+        directory = _path(version)
+        os.makedirs(directory)
+        with open(_path(VECTORS_FILE, directory), 'wb') as f:
+            for _, counts in docs:
+                f.write(_vectorize(counts, df, n_docs, dim).tobytes())
+        np.asarray([post_id for post_id, _ in docs], dtype=np.int64).tofile(_path(IDS_FILE, directory))
+        df.tofile(_path(DF_FILE, directory))
+        with open(_path(META_FILE, directory), 'w') as f:
+            json.dump({'dim': dim, 'n_docs': n_docs, 'synced_at': started.timestamp()}, f)
+        _switch_current(version)
+
+    _reader.reset()
+    logger.info(f"相似文章索引重建完成: {n_docs} 篇文章, 维度 {dim}")
+    return n_docs
+
+
+def update_index():
+    """
+    增量更新索引，由 update_similarity_index 命令定期执行（如每分钟一次 cron），
+    分词和文件锁都不在请求中进行。
+
+    - 上次更新之后修改过、或者还不在索引中的已发布文章：已在索引中则原地覆盖该行，否则追加
+    - 索引中已经不再发布（下线或删除）的文章：该行清零，id 置为 REMOVED_ID，不再参与检索
+
+    沿用建索引时的 IDF，只把新文章计入文档频率；定期全量重建可校正权重并回收清零的行。
+    返回 (写入篇数, 移除篇数)，还没有建过索引时返回 None。
+    """
+    started = timezone.now()
+    with _locked():
+        directory = _current_dir()
+        if directory is None:
+            return None
+        with open(_path(META_FILE, directory)) as f:
+            meta = json.load(f)
+        dim = meta['dim']
+        ids = np.fromfile(_path(IDS_FILE, directory), dtype=np.int64)
+        df = np.fromfile(_path(DF_FILE, directory), dtype=np.float32)
+        row_of = {post_id: row for row, post_id in enumerate(ids.tolist()) if post_id != REMOVED_ID}
+
+        published = BlogPost.objects.filter(status='published')
+        published_ids = set(published.values_list('id', flat=True))
+        changed = Q(pk__in=published_ids - row_of.keys())
+        if meta.get('synced_at') is not None:
+            # 往前多取一段时间，覆盖上次更新时尚未提交的修改；重复写入同一行没有副作用
+            since = datetime.fromtimestamp(meta['synced_at'] - settings.SIMILARITY_UPDATE_OVERLAP_SECONDS, tz=dt_timezone.utc)
+            changed |= Q(updated_at__gte=since)
+        removed = [row_of[post_id] for post_id in row_of.keys() - published_ids]
+
+        updates, appends = {}, []
+        for post in _post_rows(published.filter(changed).order_by('id')):
+            counts = hashed_term_counts(post, dim)
+            if post['id'] in row_of:
+                updates[row_of[post['id']]] = counts
+            else:
+                if counts:
+                    df[np.fromiter(counts.keys(), dtype=np.int64)] += 1
+                meta['n_docs'] += 1
+                appends.append((post['id'], counts))
+
+        if updates or removed:
+            vectors = np.memmap(_path(VECTORS_FILE, directory), dtype=np.float32, mode='r+', shape=(len(ids), dim))
+            for row, counts in updates.items():
+                vectors[row] = _vectorize(counts, df, meta['n_docs'], dim)
+            vectors[removed] = 0
+            vectors.flush()
+            del vectors
+            ids[removed] = REMOVED_ID
+        if appends:
+            with open(_path(VECTORS_FILE, directory), 'ab') as f:
+                for _, counts in appends:
+                    f.write(_vectorize(counts, df, meta['n_docs'], dim).tobytes())
+            ids = np.concatenate([ids, np.asarray([post_id for post_id, _ in appends], dtype=np.int64)])
+
+        # ids 写临时文件后替换：各进程的读取端据此发现索引变化，向量行数以 ids 为准
+        if removed or appends:
+            ids.tofile(_path(IDS_FILE, directory) + '.tmp')
+            os.replace(_path(IDS_FILE, directory) + '.tmp', _path(IDS_FILE, directory))
+            df.tofile(_path(DF_FILE, directory))
+        meta['synced_at'] = started.timestamp()
+        with open(_path(META_FILE, directory) + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(_path(META_FILE, directory) + '.tmp', _path(META_FILE, directory))
+
+    if updates or appends or removed:
+        logger.info(f"相似文章索引已更新: 写入 {len(updates) + len(appends)} 篇, 移除 {len(removed)} 篇")
+    return len(updates) + len(appends), len(removed)
+
+
+class _IndexReader:
+    """按进程缓存内存映射，索引变化（切换版本或增量更新）后自动重新打开"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._stamp = None
+        self._vectors = None
+        self._ids = None
+        self._row_of = {}
+
+    def load(self):
+        # 解析 current 之后旧版本目录可能刚好被清理，重新解析一次
+        for _ in range(2):
+            directory = _current_dir()
+            if directory is None:
+                self.reset()
+                return None, None
+            try:
+                stat = os.stat(_path(IDS_FILE, directory))
+                stamp = (directory, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                if stamp != self._stamp:
+                    self._open(directory, stamp)
+                return self._vectors, self._ids
+            except FileNotFoundError:
+                continue
+        return self._vectors, self._ids
+
+    def _open(self, directory, stamp):
+        with open(_path(META_FILE, directory)) as f:
+            dim = json.load(f)['dim']
+        ids = np.fromfile(_path(IDS_FILE, directory), dtype=np.int64)
+        size = os.path.getsize(_path(VECTORS_FILE, directory))
+        if size < len(ids) * dim * np.dtype(np.float32).itemsize:
+            # 向量行数少于 ids：文件不完整，沿用已打开的索引，下次查询再检查
+            logger.warning(f"相似文章索引 {directory} 向量文件不完整（{size} 字节，{len(ids)} 行 × {dim} 维），暂不使用")
+            return
+        if len(ids):
+            self._vectors = np.memmap(_path(VECTORS_FILE, directory), dtype=np.float32, mode='r', shape=(len(ids), dim))
+        else:
+            self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = ids
+        self._row_of = {post_id: row for row, post_id in enumerate(ids.tolist()) if post_id != REMOVED_ID}
+        self._stamp = stamp
+
+    def row_of(self, post_id):
+        return self._row_of.get(post_id)
+
+
+_reader = _IndexReader()
+
+
+def similar_post_ids(post_id, limit=5):
+    """返回与指定文章内容最相似的文章 id 及分数，按分数降序"""
+    vectors, ids = _reader.load()
+    if vectors is None:
+        return []
+    row = _reader.row_of(post_id)
+    if row is None:
+        return []
+
+    scores = vectors @ vectors[row]
+    scores[row] = -math.inf
+    k = min(limit, len(scores) - 1)
+    if k <= 0:
+        return []
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return [(int(ids[i]), float(scores[i])) for i in best if scores[i] > 0]
@@ -1,3 +1,681 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+import shutil
+import tempfile
+
+import gzip
+import io
+import json
+import os
+
+from unittest import mock
+
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+from recipe_server import compression
+from recipe_server.nplusone import normalize_sql
+from recipe_server.testing import QueryCountMixin
+from .models import BlogPost, Category, Comment, RelatedPost, RelatedPostChange, Tag
+from . import async_views, similarity
+from .related import rebuild_related_posts, update_related_posts
+from .similarity import rebuild_index, similar_post_ids, update_index
 
 # Create your tests here.
+
+class CommentModerationAPITests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        cls.user = User.objects.create_user(username='reader', password='password')
+        cls.post1 = BlogPost.objects.create(title='Post 1', content='...', author=cls.admin, status='published')
+        cls.post2 = BlogPost.objects.create(title='Post 2', content='...', author=cls.admin, status='published')
+        cls.comments = [
+            Comment.objects.create(post=post, author_name=f'c{i}', author_email='c@example.com', content='hi')
+            for i, post in enumerate([cls.post1, cls.post1, cls.post2, cls.post2, cls.post2])
+        ]
+        cls.url = reverse('api_v1:blog:comment-moderation')
+
+    def test_requires_staff(self):
+        """ 普通用户不能访问审核队列 """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_keyset_pagination(self):
+        """ 使用 next_after 翻页可以遍历所有待审核评论 """
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url, {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        next_after = response.data['next_after']
+        self.assertEqual(next_after, self.comments[2].id)
+
+        response = self.client.get(self.url, {'limit': 3, 'after': next_after})
+        self.assertEqual([c['id'] for c in response.data['results']], [c.id for c in self.comments[3:]])
+        self.assertIsNone(response.data['next_after'])
+
+    def test_bulk_approve_updates_counters(self):
+        """ 批量通过评论后，文章评论数同步更新 """
+        self.client.force_authenticate(user=self.admin)
+        ids = [c.id for c in self.comments[1:]]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'action': 'approve', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        # 查询受影响文章 + 更新评论 + 更新评论数，各一条语句
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(response.data['count'], 4)
+
+        self.post1.refresh_from_db()
+        self.post2.refresh_from_db()
+        self.assertEqual(self.post1.comment_count, 1)
+        self.assertEqual(self.post2.comment_count, 3)
+
+    def test_bulk_reject_deletes_comments(self):
+        """ 批量拒绝会删除评论并重新计算评论数 """
+        Comment.objects.filter(id=self.comments[0].id).update(is_approved=True)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url, {'action': 'reject', 'ids': [self.comments[0].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Comment.objects.filter(id=self.comments[0].id).exists())
+        self.post1.refresh_from_db()
+        self.assertEqual(self.post1.comment_count, 0)
+
+    def test_invalid_action(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url, {'action': 'publish', 'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limit_bounds(self):
+        """ limit 小于 1 时按 1 处理，非整数返回 400 """
+        self.client.force_authenticate(user=self.admin)
+        for limit in (0, -5):
+            response = self.client.get(self.url, {'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(self.url, {'limit': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('details', response.data)
+
+    def test_single_comment_changes_update_counters(self):
+        """ 审核流程之外（如后台）修改或删除单条评论，评论数同样更新 """
+        comment = Comment.objects.get(id=self.comments[2].id)
+        comment.is_approved = True
+        comment.save()
+        self.post2.refresh_from_db()
+        self.assertEqual(self.post2.comment_count, 1)
+        comment.delete()
+        self.post2.refresh_from_db()
+        self.assertEqual(self.post2.comment_count, 0)
+
+class PostDetailCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.post = BlogPost.objects.create(title='Cached', content='...', author=cls.author, status='published')
+        cls.url = reverse('api_v1:blog:post-detail', kwargs={'slug': cls.post.slug})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['title'], 'Cached')
+
+    def test_cache_invalidated_on_save(self):
+        self.client.get(self.url)
+        self.post.title = 'Updated'
+        self.post.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['title'], 'Updated')
+
+class RelatedPostsTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.python = Tag.objects.create(name='Python')
+        cls.django = Tag.objects.create(name='Django')
+        cls.music = Tag.objects.create(name='音乐')
+        cls.tech = Category.objects.create(name='技术')
+
+        def make_post(title, tags, categories=()):
+            post = BlogPost.objects.create(title=title, content='...', author=cls.author, status='published')
+            post.tags.set(tags)
+            post.categories.set(categories)
+            return post
+
+        cls.post_a = make_post('A', [cls.python, cls.django], [cls.tech])
+        cls.post_b = make_post('B', [cls.python, cls.django])
+        cls.post_c = make_post('C', [cls.python], [cls.tech])
+        cls.post_d = make_post('D', [cls.music])
+
+    def test_rebuild_ranks_by_similarity(self):
+        """ 共享标签越多的文章排得越靠前，无共同特征的文章不出现 """
+        rebuild_related_posts()
+        url = reverse('api_v1:blog:post-related', kwargs={'slug': self.post_a.slug})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['title'] for p in response.data], ['B', 'C'])
+
+    def update(self):
+        call_command('update_related_posts', stdout=io.StringIO())
+        self.assertFalse(RelatedPostChange.objects.exists())
+
+    def test_incremental_update_on_tag_change(self):
+        """ 修改标签只记录待更新的文章，由 update_related_posts 命令增量更新 """
+        rebuild_related_posts()
+        self.assertFalse(RelatedPost.objects.filter(post=self.post_d).exists())
+        self.post_d.tags.add(self.python)
+        self.assertEqual(list(RelatedPostChange.objects.values_list('post_id', flat=True)), [self.post_d.id])
+        self.assertFalse(RelatedPost.objects.filter(post=self.post_d).exists())
+        self.update()
+        related = RelatedPost.objects.filter(post=self.post_d).values_list('related_post_id', flat=True)
+        self.assertEqual(set(related), {self.post_a.id, self.post_b.id, self.post_c.id})
+        self.assertTrue(RelatedPost.objects.filter(post=self.post_c, related_post=self.post_d).exists())
+
+    def test_incremental_update_on_publish_and_unpublish(self):
+        """ 文章下线和重新发布时相关文章表会增量更新 """
+        rebuild_related_posts()
+        self.post_b.status = 'draft'
+        self.post_b.save()
+        self.update()
+        self.assertFalse(RelatedPost.objects.filter(post=self.post_b).exists())
+        self.assertFalse(RelatedPost.objects.filter(related_post=self.post_b).exists())
+
+        self.post_b.title = 'B2'
+        self.post_b.save()
+        # 状态没有变化的保存不需要更新
+        self.assertFalse(RelatedPostChange.objects.exists())
+
+        self.post_b.status = 'published'
+        self.post_b.save()
+        self.update()
+        related = RelatedPost.objects.filter(post=self.post_a).values_list('related_post_id', flat=True)
+        self.assertEqual(set(related), {self.post_b.id, self.post_c.id})
+
+    def test_incremental_update_matches_full_rebuild(self):
+        """ 增量结果与全量计算一致 """
+        rebuild_related_posts()
+        self.post_d.tags.add(self.python, self.django)
+        self.post_c.categories.clear()
+        self.python.posts.clear()
+        self.update()
+        incremental = set(RelatedPost.objects.values_list('post_id', 'related_post_id'))
+        rebuild_related_posts()
+        self.assertEqual(incremental, set(RelatedPost.objects.values_list('post_id', 'related_post_id')))
+
+    def test_only_posts_that_rank_the_change_are_merged(self):
+        """ 共享特征的文章只有会把变化的文章排进 top-k 时才更新，其余不动 """
+        rebuild_related_posts(top_k=1)
+        before = {entry.post_id: entry.pk for entry in RelatedPost.objects.all()}
+        self.post_d.categories.add(self.tech)
+        update_related_posts([self.post_d.id], top_k=1)
+        # A、C 都与 D 共享分类，但现有 top-1 分数更高，记录没有被替换
+        self.assertEqual(RelatedPost.objects.get(post=self.post_a).pk, before[self.post_a.id])
+        self.assertEqual(RelatedPost.objects.get(post=self.post_c).pk, before[self.post_c.id])
+        self.assertTrue(RelatedPost.objects.filter(post=self.post_d).exists())
+
+    def test_negative_limit(self):
+        rebuild_related_posts()
+        url = reverse('api_v1:blog:post-related', kwargs={'slug': self.post_a.slug})
+        response = self.client.get(url, {'limit': -1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['title'] for p in response.data], ['B'])
+
+    def test_unknown_post_returns_404(self):
+        url = reverse('api_v1:blog:post-related', kwargs={'slug': 'missing'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+class SimilarPostsTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.asyncio = BlogPost.objects.create(
+            title='Python异步编程入门', content='使用asyncio编写异步代码，事件循环和协程是核心概念。',
+            author=cls.author, status='published'
+        )
+        cls.coroutine = BlogPost.objects.create(
+            title='深入理解协程', content='协程与事件循环：asyncio的异步编程模型。',
+            author=cls.author, status='published'
+        )
+        cls.travel = BlogPost.objects.create(
+            title='云南旅行日记', content='大理的洱海和丽江古城风景优美。',
+            author=cls.author, status='published'
+        )
+
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        override = override_settings(
+            SIMILARITY_INDEX_DIR=self.index_dir, SIMILARITY_VECTOR_DIM=512, SIMILARITY_UPDATE_OVERLAP_SECONDS=0
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.index_dir)
+        rebuild_index()
+
+    def test_similar_endpoint_ranks_by_content(self):
+        """ 内容相近的文章排在最前，无共同词汇的文章不返回 """
+        url = reverse('api_v1:blog:post-similar', kwargs={'slug': self.asyncio.slug})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [self.coroutine.id])
+
+    def test_negative_limit(self):
+        url = reverse('api_v1:blog:post-similar', kwargs={'slug': self.asyncio.slug})
+        response = self.client.get(url, {'limit': -1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [self.coroutine.id])
+
+    def test_incremental_append(self):
+        """ 新发布的文章由增量更新追加进索引后即可被检索到，保存文章本身不写索引 """
+        post = BlogPost.objects.create(
+            title='asyncio协程实战', content='事件循环调度协程，实现异步编程。',
+            author=self.author, status='published'
+        )
+        self.assertEqual(similar_post_ids(post.id), [])
+        self.assertEqual(update_index(), (1, 0))
+        ranked = [post_id for post_id, _ in similar_post_ids(post.id)]
+        self.assertEqual(set(ranked), {self.asyncio.id, self.coroutine.id})
+        # 没有新的变化时不再写入
+        self.assertEqual(update_index(), (0, 0))
+
+    def test_unpublished_post_removed(self):
+        """ 下线的文章从索引中移除，不再出现在其他文章的结果中 """
+        self.coroutine.status = 'draft'
+        self.coroutine.save()
+        self.assertEqual(update_index(), (0, 1))
+        self.assertEqual(similar_post_ids(self.asyncio.id), [])
+        self.assertEqual(similar_post_ids(self.coroutine.id), [])
+
+        self.coroutine.status = 'published'
+        self.coroutine.save()
+        self.assertEqual(update_index(), (1, 0))
+        self.assertEqual([post_id for post_id, _ in similar_post_ids(self.asyncio.id)], [self.coroutine.id])
+
+    def test_rebuild_switches_version(self):
+        """ 重建写入新的版本目录后切换 current，只保留两个版本 """
+        first = os.path.realpath(os.path.join(self.index_dir, 'current'))
+        self.assertEqual(similar_post_ids(self.asyncio.id)[0][0], self.coroutine.id)
+        rebuild_index()
+        rebuild_index()
+        current = os.path.realpath(os.path.join(self.index_dir, 'current'))
+        self.assertNotEqual(current, first)
+        self.assertFalse(os.path.exists(first))
+        self.assertEqual(len([name for name in os.listdir(self.index_dir) if name.startswith('v')]), 2)
+        self.assertEqual(similar_post_ids(self.asyncio.id)[0][0], self.coroutine.id)
+
+    def test_incomplete_vectors_not_loaded(self):
+        """ 向量文件比 ids 行数短的版本不加载，继续使用已打开的索引 """
+        self.assertEqual(similar_post_ids(self.asyncio.id)[0][0], self.coroutine.id)
+        current = os.path.realpath(os.path.join(self.index_dir, 'current'))
+        broken = os.path.join(self.index_dir, 'v9999999999999999999')
+        shutil.copytree(current, broken)
+        with open(os.path.join(broken, 'vectors.f32'), 'r+b') as f:
+            f.truncate(4)
+        similarity._switch_current(os.path.basename(broken))
+        with self.assertLogs('blog.similarity', 'WARNING'):
+            self.assertEqual(similar_post_ids(self.asyncio.id)[0][0], self.coroutine.id)
+
+class AsyncReadViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.tag = Tag.objects.create(name='Python')
+        cls.category = Category.objects.create(name='技术')
+        for i in range(12):
+            post = BlogPost.objects.create(
+                title=f'Post {i}', content='...', author=cls.author,
+                status='published' if i < 11 else 'draft', is_featured=i % 2 == 0
+            )
+            post.tags.add(cls.tag)
+            post.categories.add(cls.category)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def _get(self, view, path, data=None, **kwargs):
+        response = await view(self.factory.get(path, data or {}), **kwargs)
+        return response, json.loads(response.content)
+
+    async def test_list_matches_sync_view(self):
+        """ 异步列表与同步 DRF 列表返回相同的数据 """
+        response, data = await self._get(async_views.post_list, '/api/v1/posts/', {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        sync_response = await self.async_client.get('/api/v1/posts/', {'page': 2})
+        self.assertEqual(data, sync_response.json())
+        self.assertEqual(data['count'], 11)
+        self.assertEqual(data['results'][0]['tags'][0]['post_count'], 11)
+
+    async def test_detail_and_missing(self):
+        post = await BlogPost.objects.aget(title='Post 3')
+        response, data = await self._get(async_views.post_detail, f'/api/v1/posts/{post.slug}/', slug=post.slug)
+        self.assertEqual(data['title'], 'Post 3')
+        response, data = await self._get(async_views.post_detail, '/api/v1/posts/missing/', slug='missing')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_featured_categories_and_search(self):
+        response, data = await self._get(async_views.featured_posts, '/api/v1/posts/featured/', {'limit': 3})
+        self.assertEqual(len(data['results']), 3)
+        response, data = await self._get(async_views.category_list, '/api/v1/categories/')
+        self.assertEqual(data['results'][0]['post_count'], 11)
+        response, data = await self._get(async_views.search_posts, '/api/v1/search/', {'q': 'Post 1'})
+        self.assertEqual(data['count'], 2)
+
+    async def test_authenticated_request_uses_sync_view(self):
+        """ 带认证头的请求交给同步视图处理 """
+        request = self.factory.get('/api/v1/posts/', headers={'Authorization': 'Bearer invalid'})
+        response = await async_views.post_list(request)
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncRoutingTests(APITestCase):
+    """ 开启 BLOG_ASYNC_READS 时，固定路径不能被异步的 posts/<slug>/ 抢先匹配 """
+
+    def _reload_urls(self):
+        import importlib
+        from django.urls import clear_url_caches
+        import api.urls
+        import blog.urls
+        import recipe_server.urls
+        for module in (blog.urls, api.urls, recipe_server.urls):
+            importlib.reload(module)
+        clear_url_caches()
+
+    def setUp(self):
+        cache.clear()
+        override = override_settings(BLOG_ASYNC_READS=True)
+        override.enable()
+        self._reload_urls()
+        self.addCleanup(self._reload_urls)
+        self.addCleanup(override.disable)
+        self.author = User.objects.create_user(username='author', password='password')
+        self.post = BlogPost.objects.create(title='Mine', content='...', author=self.author, status='draft')
+
+    def test_literal_routes_before_async_detail(self):
+        from django.urls import resolve
+        self.assertIs(resolve(f'/api/v1/posts/{self.post.slug}/').func, async_views.post_detail)
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get('/api/v1/posts/my/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Mine'])
+
+
+class QueryBudgetTests(QueryCountMixin, APITestCase):
+    """ 固定各接口的查询次数，数据量变化时次数不变 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        categories = [Category.objects.create(name=f'分类{i}') for i in range(3)]
+        tags = [Tag.objects.create(name=f'标签{i}') for i in range(4)]
+        for i in range(8):
+            post = BlogPost.objects.create(
+                title=f'Post {i}', content='Python', author=cls.author,
+                status='published', is_featured=True
+            )
+            post.categories.set(categories[:2])
+            post.tags.set(tags)
+        cls.post = post
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post=cls.post, related_post=other, score=1.0)
+            for other in BlogPost.objects.exclude(pk=cls.post.pk)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_read_endpoints(self):
+        endpoints = {
+            # count + 文章 + 分类 + 标签
+            '/api/v1/posts/': 4,
+            f'/api/v1/posts/{self.post.slug}/': 3,
+            f'/api/v1/posts/{self.post.slug}/related/': 4,
+            '/api/v1/search/?q=Python': 4,
+            '/api/v1/categories/': 2,
+            '/api/v1/tags/': 2,
+        }
+        for url, expected in endpoints.items():
+            with self.subTest(url=url):
+                with self.assertEndpointQueries(expected):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_read_endpoints(self):
+        self.client.force_authenticate(user=self.author)
+        endpoints = {
+            '/api/v1/posts/my/': 4,
+            '/api/v1/posts/featured/': 4,
+            '/api/v1/posts/popular/': 4,
+        }
+        for url, expected in endpoints.items():
+            with self.subTest(url=url):
+                with self.assertEndpointQueries(expected):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 5"),
+        )
+
+
+class ImageVariantTests(APITestCase):
+    """ 特色图片上传后生成尺寸版本：去掉 EXIF、摆正方向、序列化输出 srcset """
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(
+            MEDIA_ROOT=self.media_root, IMAGE_PIPELINE_WORKERS=0, IMAGE_VARIANT_WIDTHS=[320, 640, 4000]
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.author = User.objects.create_user(username='author', password='password')
+        self.client.force_authenticate(user=self.author)
+
+    def upload(self, name='photo.jpg'):
+        from PIL import Image
+        image = Image.new('RGB', (1200, 800), (200, 80, 40))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # 需要顺时针旋转 90 度
+        exif[0x010F] = 'PhoneMaker'
+        exif.get_ifd(0x8825)[2] = (31.0, 14.0, 0.0)  # GPS 纬度
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        buffer.name = name
+        buffer.seek(0)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('api_v1:blog:post-list'), {
+                'title': 'Photo', 'content': 'c', 'status': 'published', 'featured_image': buffer,
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return BlogPost.objects.get(slug=response.data['slug'])
+
+    def test_variants_generated_without_exif(self):
+        from PIL import Image
+        post = self.upload()
+        data = post.featured_image_variants
+        self.assertEqual(data['source'], post.featured_image.name)
+        # 按 EXIF 方向摆正后宽 800 高 1200；4000 比原图宽，不生成
+        self.assertEqual((data['width'], data['height']), (800, 1200))
+        self.assertEqual([v['width'] for v in data['variants']], [320, 640])
+        self.assertTrue(data['placeholder'].startswith('data:image/jpeg;base64,'))
+        for entry in data['variants']:
+            for fmt in ('webp', 'jpeg'):
+                with Image.open(os.path.join(self.media_root, entry[fmt])) as variant:
+                    self.assertEqual(variant.size, (entry['width'], entry['height']))
+                    self.assertEqual(len(variant.getexif()), 0)
+
+    def test_original_stripped_by_variant_job(self):
+        """ 后台任务去掉原图 EXIF（包括 GPS）并摆正方向，记录和历史记录改指向新文件 """
+        from PIL import Image
+        post = self.upload()
+        with Image.open(os.path.join(self.media_root, post.featured_image.name)) as original:
+            self.assertEqual(original.format, 'JPEG')
+            self.assertEqual(original.size, (800, 1200))
+            self.assertEqual(len(original.getexif()), 0)
+        self.assertEqual(set(post.history.values_list('featured_image', flat=True)), {post.featured_image.name})
+
+    def test_original_hidden_until_processed(self):
+        """ 保存请求不重新编码原图，后台任务处理完成前不返回原图地址 """
+        from PIL import Image
+        image = Image.new('RGB', (400, 300))
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        buffer.name = 'photo.jpg'
+        buffer.seek(0)
+        with mock.patch('recipe_server.images.Image.Image.save') as save:
+            response = self.client.post(reverse('api_v1:blog:post-list'), {
+                'title': 'Photo', 'content': 'c', 'status': 'published', 'featured_image': buffer,
+            }, format='multipart')
+        save.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['featured_image'])
+        self.assertIsNone(response.data['featured_image_variants'])
+
+    def test_serializers_expose_srcset(self):
+        post = self.upload()
+        response = self.client.get(reverse('api_v1:blog:post-detail', kwargs={'slug': post.slug}))
+        variants = response.data['featured_image_variants']
+        self.assertIn('320w', variants['srcset']['webp'])
+        self.assertIn('640w', variants['srcset']['jpeg'])
+        listed = self.client.get(reverse('api_v1:blog:post-list')).data['results'][0]
+        self.assertEqual(listed['featured_image_variants']['srcset'], variants['srcset'])
+
+    def test_cleared_image_variants_collected(self):
+        post = self.upload()
+        old_files = [os.path.join(self.media_root, v['webp']) for v in post.featured_image_variants['variants']]
+        post.featured_image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_variants, {})
+        # 内容寻址的文件可能被其他记录共用，由 gc_media_blobs 统一清理（历史记录仍引用原图）
+        call_command('gc_media_blobs', grace_hours=0, stdout=io.StringIO())
+        self.assertFalse(any(os.path.exists(path) for path in old_files))
+
+
+class ContentAddressedStorageTests(APITestCase):
+    """ 上传文件按内容哈希命名，重复内容只存一份，未引用的文件由 gc_media_blobs 清理 """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_PIPELINE_WORKERS=0, IMAGE_VARIANT_FORMATS=[])
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.author = User.objects.create_user(username='author', password='password')
+
+    def test_identical_uploads_deduplicated(self):
+        first = default_storage.save('blog/images/a.JPG', ContentFile(b'same bytes'))
+        second = default_storage.save('recipe_images/b.jpg', ContentFile(b'same bytes'))
+        other = default_storage.save('blog/images/a.jpg', ContentFile(b'other bytes'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(default_storage.open(first).read(), b'same bytes')
+        self.assertEqual(os.listdir(os.path.join(self.media_root, '.tmp')), [])
+
+    def test_delete_keeps_shared_blob(self):
+        name = default_storage.save('a.jpg', ContentFile(b'shared'))
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_gc_removes_only_unreferenced(self):
+        referenced = default_storage.save('blog/images/a.jpg', ContentFile(b'used'))
+        BlogPost.objects.create(title='P', content='c', author=self.author, featured_image=referenced)
+        orphan = default_storage.save('blog/images/b.jpg', ContentFile(b'orphan'))
+
+        call_command('gc_media_blobs', stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(orphan))  # 宽限期内保留
+        call_command('gc_media_blobs', grace_hours=0, stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(referenced))
+        self.assertFalse(default_storage.exists(orphan))
+
+
+class ResponseCompressionTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.post = BlogPost.objects.create(
+            title='Long', content='压缩测试内容 ' * 500, author=cls.author, status='published'
+        )
+        cls.detail_url = reverse('api_v1:blog:post-detail', kwargs={'slug': cls.post.slug})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_negotiate(self):
+        self.assertEqual(compression.negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.negotiate('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(compression.negotiate('identity'), None)
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.negotiate('br, gzip'), 'gzip')
+
+    def test_detail_gzip_from_cache(self):
+        plain = self.client.get(self.detail_url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+    def test_brotli_preferred(self):
+        if compression.brotli is None:
+            self.skipTest('brotli 未安装')
+        response = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression.brotli.decompress(response.content))['title'], 'Long')
+
+    def test_middleware_skips_small_responses(self):
+        list_url = reverse('api_v1:blog:category-list')
+        for i in range(3):
+            Category.objects.create(name=f'分类 {i}')
+        response = self.client.get(list_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        with override_settings(COMPRESSION_MIN_BYTES=64):
+            response = self.client.get(list_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertIn('results', json.loads(gzip.decompress(response.content)))
+
+    @override_settings(COMPRESSION_MIN_BYTES=64)
+    def test_token_responses_not_compressed(self):
+        """ 返回令牌的认证接口不压缩（BREACH） """
+        response = self.client.post(
+            reverse('api_v1:auth-token'), {'username': 'author', 'password': 'password'},
+            format='json', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', json.dumps(response.json()))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    async def test_async_detail_precompressed(self):
+        response = await async_views.post_detail(
+            AsyncRequestFactory().get(self.detail_url, headers={'Accept-Encoding': 'gzip'}), slug=self.post.slug
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['title'], 'Long')
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -7,6 +8,7 @@ from .views import (
     TagListView,
     FeaturedPostsView,
     PopularPostsView,
+    CommentModerationView,
     search_posts
 )
 
@@ -15,12 +17,32 @@ app_name = 'blog'
 router = DefaultRouter()
 router.register(r'posts', BlogPostViewSet, basename='post')
 
+# 只有同步实现的固定路径排在最前面，否则会被异步的 posts/<slug>/ 或路由器的详情路由抢先匹配
 urlpatterns = [
-    path('', include(router.urls)),
     path('posts/my/', MyPostsView.as_view(), name='my-posts'),
+    path('comments/moderation/', CommentModerationView.as_view(), name='comment-moderation'),
+]
+
+if settings.BLOG_ASYNC_READS:
+    # ASGI 部署时，只读接口优先匹配异步实现（写操作在视图内部转交同步视图）
+    from . import async_views
+
+    urlpatterns += [
+        path('posts/', async_views.post_list, name='async-post-list'),
+        path('posts/featured/', async_views.featured_posts, name='async-featured-posts'),
+        path('posts/popular/', async_views.popular_posts, name='async-popular-posts'),
+        path('posts/<str:slug>/', async_views.post_detail, name='async-post-detail'),
+        path('categories/', async_views.category_list, name='async-category-list'),
+        path('tags/', async_views.tag_list, name='async-tag-list'),
+        path('search/', async_views.search_posts, name='async-search-posts'),
+    ]
+
+# 固定路径需排在路由器之前，否则会被 posts/<slug>/ 详情路由抢先匹配
+urlpatterns += [
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('tags/', TagListView.as_view(), name='tag-list'),
     path('posts/featured/', FeaturedPostsView.as_view(), name='featured-posts'),
     path('posts/popular/', PopularPostsView.as_view(), name='popular-posts'),
     path('search/', search_posts, name='search-posts'),
+    path('', include(router.urls)),
 ] 
\ No newline at end of file
@@ -2,17 +2,25 @@ from django.shortcuts import render
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
-from drf_spectacular.types import OpenApiTypes
-from .models import BlogPost, Category, Tag, Comment
+from recipe_server.schema import extend_schema, OpenApiParameter, OpenApiExample, OpenApiTypes
+from recipe_server.compression import PrecompressedResponse
+from recipe_server.db.routers import use_primary
+from recipe_server.ratelimit import WriteRateThrottle
+from .models import BlogPost, Category, Tag, Comment, RelatedPost
 from .serializers import (
     BlogPostSerializer, BlogPostListSerializer, 
     CategorySerializer, TagSerializer, CommentSerializer,
-    HistoricalBlogPostSerializer
+    HistoricalBlogPostSerializer, ModerationCommentSerializer,
+    CommentModerationSerializer
 )
+from .cache import get_cached_post_detail, set_cached_post_detail
+from .queries import annotate_post_count, post_list_queryset, post_relation_prefetches
+from .moderation import approve_comments, pending_comments, reject_comments
+from .similarity import similar_post_ids
 
 # Create your views here.
 
@@ -22,16 +30,17 @@ class BlogPostViewSet(viewsets.ModelViewSet):
     `partial_update`, `destroy` 和 `history` 动作。
     """
     lookup_field = 'slug'
+    throttle_classes = [WriteRateThrottle]
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ['list', 'related', 'similar']:
             return BlogPostListSerializer
         if self.action == 'history':
             return HistoricalBlogPostSerializer
         return BlogPostSerializer
 
     def get_queryset(self):
-        queryset = BlogPost.objects.select_related('author').prefetch_related('categories', 'tags')
+        queryset = post_list_queryset()
         
         # for list view, filter based on user
         if self.action == 'list':
@@ -134,7 +143,21 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         description='根据slug获取单篇文章的详细信息'
     )
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        slug = kwargs.get(self.lookup_field)
+        entry = get_cached_post_detail(slug)
+        if entry is not None:
+            return PrecompressedResponse(entry['data'], entry['encoded'])
+
+        # 要写入缓存的数据从主库读取，避免把副本上的旧数据缓存下来
+        with use_primary():
+            instance = self.get_object()
+            serializer = self.get_serializer(instance)
+            data = serializer.data
+        # 只缓存已发布文章，草稿等内容仍按实时数据返回
+        if instance.status == 'published':
+            entry = set_cached_post_detail(instance.slug, data)
+            return PrecompressedResponse(entry['data'], entry['encoded'])
+        return Response(data)
 
     @extend_schema(
         tags=['文章'],
@@ -202,13 +225,149 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(history, many=True)
         return Response(serializer.data)
 
+    @extend_schema(
+        tags=['文章'],
+        operation_id='related_posts',
+        summary='获取相关文章',
+        description='返回与该文章标签/分类最相近的已发布文章，结果来自预先计算的相关文章表',
+        parameters=[
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='返回的文章数量限制，默认为5',
+                default=5
+            ),
+        ]
+    )
+    @action(detail=True, methods=['get'], url_path='related')
+    def related(self, request, slug=None):
+        """获取相关文章"""
+        limit = request.query_params.get('limit', 5)
+        try:
+            limit = int(limit)
+        except (ValueError, TypeError):
+            limit = 5
+        limit = max(1, limit)
+
+        post = get_object_or_404(BlogPost.objects.only('id'), slug=slug)
+        entries = (
+            RelatedPost.objects.filter(post=post, related_post__status='published')
+            .select_related('related_post__author')
+            .prefetch_related(*post_relation_prefetches('related_post__'))
+            .order_by('-score')[:limit]
+        )
+        serializer = self.get_serializer([entry.related_post for entry in entries], many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        tags=['文章'],
+        operation_id='similar_posts',
+        summary='获取内容相似文章',
+        description='基于标题、摘要和正文的TF-IDF向量返回内容最相似的已发布文章，没有标签的文章同样适用',
+        parameters=[
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='返回的文章数量限制，默认为5',
+                default=5
+            ),
+        ]
+    )
+    @action(detail=True, methods=['get'], url_path='similar')
+    def similar(self, request, slug=None):
+        """获取内容相似文章"""
+        limit = request.query_params.get('limit', 5)
+        try:
+            limit = int(limit)
+        except (ValueError, TypeError):
+            limit = 5
+        limit = max(1, limit)
+
+        post = get_object_or_404(BlogPost.objects.only('id'), slug=slug)
+        # 索引中可能包含已下线的文章，多取一些候选再按状态过滤
+        ranked = [post_id for post_id, _ in similar_post_ids(post.id, limit=limit * 2)]
+        posts = post_list_queryset().filter(id__in=ranked, status='published').in_bulk()
+        results = [posts[post_id] for post_id in ranked if post_id in posts][:limit]
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data)
+
+@extend_schema(tags=['评论'])
+class CommentModerationView(APIView):
+    """评论审核队列：键集分页查看待审核评论，批量通过或拒绝"""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        operation_id='list_pending_comments',
+        summary='获取待审核评论',
+        description='按评论id升序返回待审核评论，使用`after`参数传入上一页的`next_after`继续翻页',
+        parameters=[
+            OpenApiParameter(
+                name='after',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='上一页最后一条评论的id'
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='每页数量，默认为50，最大为500',
+                default=50
+            ),
+        ],
+        responses=ModerationCommentSerializer(many=True)
+    )
+    def get(self, request):
+        try:
+            after = request.query_params.get('after')
+            after = int(after) if after else None
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 500))
+        except (ValueError, TypeError):
+            return Response({
+                'error': '分页参数无效',
+                'details': 'after 和 limit 必须是整数'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        comments = pending_comments(after=after, limit=limit)
+        next_after = comments[-1].id if len(comments) == limit else None
+        return Response({
+            'results': ModerationCommentSerializer(comments, many=True).data,
+            'next_after': next_after,
+        })
+
+    @extend_schema(
+        operation_id='moderate_comments',
+        summary='批量审核评论',
+        description='批量通过(approve)或拒绝(reject)评论，拒绝的评论会连同回复一起删除',
+        request=CommentModerationSerializer
+    )
+    def post(self, request):
+        serializer = CommentModerationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': '审核请求无效',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = serializer.validated_data['ids']
+        if serializer.validated_data['action'] == 'approve':
+            count = approve_comments(ids)
+        else:
+            count = reject_comments(ids)
+        return Response({
+            'action': serializer.validated_data['action'],
+            'count': count,
+        }, status=status.HTTP_200_OK)
+
 class MyPostsView(generics.ListAPIView):
     """我的文章列表"""
     serializer_class = BlogPostListSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return BlogPost.objects.filter(author=self.request.user).select_related('author').prefetch_related('categories', 'tags')
+        return post_list_queryset().filter(author=self.request.user)
 
 @extend_schema(
     tags=['分类'],
@@ -218,7 +377,7 @@ class MyPostsView(generics.ListAPIView):
 )
 class CategoryListView(generics.ListCreateAPIView):
     """分类列表和创建"""
-    queryset = Category.objects.all()
+    queryset = annotate_post_count(Category.objects.all())
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -230,7 +389,7 @@ class CategoryListView(generics.ListCreateAPIView):
 )
 class TagListView(generics.ListCreateAPIView):
     """标签列表和创建"""
-    queryset = Tag.objects.all()
+    queryset = annotate_post_count(Tag.objects.all())
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -260,10 +419,7 @@ class FeaturedPostsView(generics.ListAPIView):
         except (ValueError, TypeError):
             limit = 5
         
-        return BlogPost.objects.filter(
-            status='published', 
-            is_featured=True
-        ).select_related('author').prefetch_related('categories', 'tags')[:limit]
+        return post_list_queryset().filter(status='published', is_featured=True)[:limit]
 
 @extend_schema(
     tags=['文章'],
@@ -291,9 +447,7 @@ class PopularPostsView(generics.ListAPIView):
         except (ValueError, TypeError):
             limit = 10
         
-        return BlogPost.objects.filter(
-            status='published'
-        ).select_related('author').prefetch_related('categories', 'tags').order_by('-view_count')[:limit]
+        return post_list_queryset().filter(status='published').order_by('-view_count')[:limit]
 
 @extend_schema(
     tags=['文章'],
@@ -322,18 +476,19 @@ class PopularPostsView(generics.ListAPIView):
     responses=BlogPostListSerializer(many=True)
 )
 @api_view(['GET'])
+@permission_classes([permissions.AllowAny])
 def search_posts(request):
     """搜索文章"""
     query = request.query_params.get('q', '')
     if not query:
         return Response({'results': [], 'count': 0})
     
-    posts = BlogPost.objects.filter(
+    posts = post_list_queryset().filter(
         Q(title__icontains=query) | 
         Q(content__icontains=query) |
         Q(excerpt__icontains=query),
         status='published'
-    ).select_related('author').prefetch_related('categories', 'tags')
+    )
     
     # 分页
     from rest_framework.pagination import PageNumberPagination
@@ -3,14 +3,9 @@ import os
 import sys
 import django
 
-# 设置Django环境
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_server.settings')
-django.setup()
-
-from blog.models import Category, Tag
-
 def create_initial_data():
     """创建初始分类和标签数据"""
+    from blog.models import Category, Tag
     
     # 创建分类
     categories = [
@@ -48,4 +43,7 @@ def create_initial_data():
     print("初始数据创建完成！")
 
 if __name__ == '__main__':
+    # 设置Django环境（作为脚本运行时；generate_benchmark_data 命令会直接导入本模块）
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_server.settings')
+    django.setup()
     create_initial_data() 
\ No newline at end of file
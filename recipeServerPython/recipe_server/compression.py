@@ -0,0 +1,152 @@
+"""
+响应压缩（Brotli / gzip）。
+
+CompressionMiddleware 按 Accept-Encoding 协商编码，压缩超过 COMPRESSION_MIN_BYTES 的
+JSON / 文本响应。缓存的响应（文章详情、API schema）在写入缓存时用 precompress 一次性
+生成各编码的内容，命中缓存时直接返回对应的字节，不再逐个请求压缩；已设置
+Content-Encoding 的响应中间件不会再处理。
+
+brotli 是可选依赖，没有安装时只使用 gzip。
+
+BREACH：压缩后的长度会泄露响应中秘密与请求中可控内容的相似程度。
+COMPRESSION_EXCLUDE_PATHS 下的响应不压缩，默认是认证接口（/api/v1/auth/），只有它们
+在响应体中返回 access / refresh token。其余接口不做处理，原因是：
+- 响应体里没有凭据。文章、评论、菜谱等内容是用户可见的数据，本身不是攻击目标。
+- JWT 放在 Authorization 头里，跨站请求不会自动带上，攻击者无法让受害者的浏览器
+  反复请求带 JWT 的响应。
+- 后台和可浏览 API 页面里的 CSRF token 由 Django 按响应随机掩码，每次的字节都不同。
+新增在响应体中返回令牌、密钥等秘密的接口时，应把它的路径加入 COMPRESSION_EXCLUDE_PATHS。
+"""
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.response import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/vnd.oai.openapi+json', 'application/javascript',
+    'application/xml', 'image/svg+xml', 'text/',
+)
+# 缓存内容只压缩一次，可以使用更高的压缩级别
+PRECOMPRESS_BROTLI_QUALITY = 9
+PRECOMPRESS_GZIP_LEVEL = 9
+
+_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """返回客户端可接受、权重最高的编码；同权重时优先 br。不压缩时返回 None"""
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        match = _ENCODING_RE.fullmatch(part)
+        if not match:
+            continue
+        try:
+            weights[match.group(1).lower()] = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body, encoding, precompress=False):
+    if encoding == 'br':
+        quality = PRECOMPRESS_BROTLI_QUALITY if precompress else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = PRECOMPRESS_GZIP_LEVEL if precompress else settings.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def precompress(body):
+    """生成 {编码: 内容}，'identity' 为原文；内容太短或压缩后不变小的编码不保存"""
+    encoded = {'identity': body}
+    if len(body) >= settings.COMPRESSION_MIN_BYTES:
+        for encoding in supported_encodings():
+            compressed = compress(body, encoding, precompress=True)
+            if len(compressed) < len(body):
+                encoded[encoding] = compressed
+    return encoded
+
+
+def select(encoded, request):
+    """从预压缩的内容中选出适合该请求的 (内容, 编码)"""
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+    if encoding in encoded:
+        return encoded[encoding], encoding
+    return encoded['identity'], None
+
+
+def apply_encoding(response, encoding):
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if encoding:
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # 压缩后的字节与原文不同，强 ETag 改为弱 ETag
+            response['ETag'] = 'W/' + etag
+
+
+class PrecompressedResponse(Response):
+    """
+    使用缓存中预先渲染和压缩好的内容的 DRF 响应。
+    data 仍然保留，协商到非 JSON 的渲染器时按常规方式渲染。
+    """
+
+    def __init__(self, data, encoded, **kwargs):
+        super().__init__(data, **kwargs)
+        self.encoded = encoded
+
+    @property
+    def rendered_content(self):
+        if getattr(self.accepted_renderer, 'format', None) != 'json':
+            return super().rendered_content
+        body, encoding = select(self.encoded, self.renderer_context['request'])
+        self['Content-Type'] = self.accepted_media_type or 'application/json'
+        apply_encoding(self, encoding)
+        return body
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    压缩超过 COMPRESSION_MIN_BYTES 的文本类响应，已压缩或流式响应不处理，
+    COMPRESSION_EXCLUDE_PATHS 下返回秘密的响应不处理。
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if request.path.startswith(tuple(settings.COMPRESSION_EXCLUDE_PATHS)):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        apply_encoding(response, encoding)
+        return response
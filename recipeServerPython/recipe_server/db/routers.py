@@ -0,0 +1,112 @@
+"""
+读写分离数据库路由。
+
+只有经过 ReplicaRoutingMiddleware 标记的安全方法请求（GET/HEAD/OPTIONS）
+才会把读查询发往 settings.DATABASE_REPLICAS 中的只读副本，写操作、管理命令、
+后台任务等其余场景一律使用 default 主库。
+
+- 一次请求内固定使用同一个副本，分页的 count 和数据来自同一快照；
+- 副本不可用时回退到主库，并在 REPLICA_HEALTH_CHECK_INTERVAL 秒内不再尝试；
+- 写请求成功后，同一客户端在 REPLICA_PIN_SECONDS 秒内的读请求都走主库
+  （read-your-writes），钉住状态记录在缓存中，见 middleware.py。
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# 当前请求是否允许读副本；None 表示不在请求中或必须走主库
+_read_from_replica = ContextVar('read_from_replica', default=False)
+# 当前请求已选定的副本别名
+_current_replica = ContextVar('current_replica', default=None)
+
+# 各副本的健康检查结果：{alias: (是否可用, 检查时间)}，按进程缓存
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS
+
+
+def replica_is_healthy(alias):
+    """检查副本能否连接，结果缓存 REPLICA_HEALTH_CHECK_INTERVAL 秒"""
+    now = time.monotonic()
+    cached = _health.get(alias)
+    if cached is not None and now - cached[1] < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return cached[0]
+
+    try:
+        connection = connections[alias]
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+        connection.ensure_connection()
+        healthy = True
+    except Exception as e:
+        logger.warning(f"只读副本 {alias} 不可用，回退到主库: {e}")
+        healthy = False
+    with _health_lock:
+        _health[alias] = (healthy, now)
+    return healthy
+
+
+def reset_replica_health():
+    with _health_lock:
+        _health.clear()
+
+
+def begin_replica_reads(enabled=True):
+    """标记当前请求的读查询可以使用副本，返回用于恢复的 token"""
+    return _read_from_replica.set(enabled), _current_replica.set(None)
+
+
+def end_replica_reads(tokens):
+    read_token, replica_token = tokens
+    _current_replica.reset(replica_token)
+    _read_from_replica.reset(read_token)
+
+
+@contextmanager
+def use_primary():
+    """在代码块内强制读主库，例如要写入缓存的数据不能来自有延迟的副本"""
+    tokens = begin_replica_reads(False)
+    try:
+        yield
+    finally:
+        end_replica_reads(tokens)
+
+
+def current_read_alias():
+    """当前上下文中读查询应使用的数据库别名"""
+    if not _read_from_replica.get():
+        return DEFAULT_DB_ALIAS
+    alias = _current_replica.get()
+    if alias is None:
+        healthy = [a for a in replica_aliases() if replica_is_healthy(a)]
+        alias = random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+        _current_replica.set(alias)
+    return alias
+
+
+class ReplicaRouter:
+    """读查询按请求上下文分发到副本，写操作和迁移只针对主库"""
+
+    def db_for_read(self, model, **hints):
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本和主库是同一份数据
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
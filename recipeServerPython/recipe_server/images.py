@@ -0,0 +1,289 @@
+"""
+上传图片的尺寸版本（响应式图片）。
+
+图片字段保存后，在事务提交后交给后台线程处理：按 EXIF 方向摆正，按
+IMAGE_VARIANT_WIDTHS 生成若干宽度的 WebP 和 JPEG（不带 EXIF 等元数据），
+再生成一张十几像素宽的模糊占位图（base64 内联）。结果以存储中的文件名记录在
+模型的 JSON 字段中，序列化时由 variant_map 转成 URL 和可直接用于 srcset 的字符串。
+
+原图的元数据也在这个后台任务中去掉（strip_metadata）：手机照片的 EXIF 中常带有
+GPS 坐标。去掉后的原图按内容寻址存成新文件，记录和历史记录都改指向它；带元数据
+的文件不再被引用，由 gc_media_blobs 清理。处理完成前序列化器不返回原图地址
+（ProcessedImageField），保存请求本身不做整图重新编码。替换下来的旧尺寸版本同样
+交给 gc_media_blobs 清理。
+
+需要生成尺寸版本的字段用 register_image_field 注册，批量补生成见 build_image_variants 命令。
+"""
+import base64
+import io
+import logging
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageFilter, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+# 去掉元数据时重新编码原图的参数；JPEG 方向不需要摆正时沿用原来的量化表
+STRIP_FORMATS = {
+    'JPEG': {'quality': 90},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+ORIENTATION_TAG = 0x0112
+
+# (模型, 图片字段, 尺寸版本字段, 保存后的回调)
+IMAGE_FIELDS = []
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def register_image_field(model, field_name, variants_field, on_saved=None):
+    """图片字段保存后自动生成尺寸版本；on_saved(instance) 在结果写回后调用（如清理缓存）"""
+    IMAGE_FIELDS.append((model, field_name, variants_field, on_saved))
+
+    def receiver(sender, instance, **kwargs):
+        schedule_variants(instance, field_name, variants_field, on_saved)
+
+    post_save.connect(
+        receiver, sender=model, weak=False,
+        dispatch_uid=f'image_variants:{model._meta.label}.{field_name}'
+    )
+
+
+def strip_metadata(content):
+    """
+    去掉图片中的 EXIF / XMP 等元数据，返回重新编码后的字节；没有元数据、不是支持的格式
+    或无法解码时返回 None（保持原文件）。EXIF 方向先应用到像素上，ICC 色彩配置保留。
+    """
+    try:
+        content.seek(0)
+        image = Image.open(content)
+        image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        logger.warning(f"读取上传图片失败，未去除元数据: {e}")
+        return None
+    finally:
+        content.seek(0)
+
+    fmt = image.format
+    if fmt not in STRIP_FORMATS or getattr(image, 'n_frames', 1) > 1:
+        return None
+    exif = image.getexif()
+    if not exif and not any(key in image.info for key in METADATA_KEYS):
+        return None
+
+    options = dict(STRIP_FORMATS[fmt])
+    if exif.get(ORIENTATION_TAG, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    elif fmt == 'JPEG':
+        options.update(quality='keep', subsampling='keep')
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, exif=b'', xmp=b'', **options)
+    return buffer.getvalue()
+
+
+def _flatten(image, mode):
+    """JPEG 不支持透明通道，铺白底"""
+    if image.mode in ('RGBA', 'LA', 'P') and mode == 'RGB':
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert(mode)
+
+
+def _encode(image, fmt):
+    name, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    # 不传 exif 参数，重新编码后的文件不带元数据
+    _flatten(image, 'RGBA' if fmt == 'webp' and image.mode in ('RGBA', 'LA', 'P') else 'RGB').save(
+        buffer, name, **options
+    )
+    return buffer.getvalue()
+
+
+def placeholder(image):
+    width = settings.IMAGE_PLACEHOLDER_WIDTH
+    height = max(round(image.height * width / image.width), 1)
+    small = _flatten(image, 'RGB').resize((width, height), Image.Resampling.BILINEAR)
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    small.save(buffer, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def build_variants(storage, name):
+    """生成尺寸版本并写入存储，返回记录在模型上的描述"""
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    stem = os.path.splitext(posixpath.basename(name))[0]
+    directory = posixpath.join(posixpath.dirname(name), 'variants', stem)
+    # 比原图窄的宽度都生成；原图本身很小时至少保留一个原尺寸版本
+    widths = [w for w in sorted(settings.IMAGE_VARIANT_WIDTHS) if w < image.width] or [image.width]
+
+    variants = []
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        entry = {'width': width, 'height': height}
+        for fmt in settings.IMAGE_VARIANT_FORMATS:
+            variant_name = posixpath.join(directory, f'{width}.{EXTENSIONS[fmt]}')
+            entry[fmt] = storage.save(variant_name, ContentFile(_encode(resized, fmt)))
+        variants.append(entry)
+
+    return {
+        'source': name,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': placeholder(image),
+        'variants': variants,
+    }
+
+
+def strip_stored_original(storage, name):
+    """去掉已存储原图的元数据，返回去掉后的文件名；不需要处理时返回原文件名"""
+    with storage.open(name, 'rb') as f:
+        data = strip_metadata(f)
+    if data is None:
+        return name
+    return storage.save(name, ContentFile(data))
+
+
+def process_image(model, pk, field_name, variants_field, on_saved=None):
+    """
+    在后台线程中执行：去掉原图元数据，生成尺寸版本并写回；图片在此期间又被替换时
+    放弃本次结果。原图文件名有变化时，历史记录中的旧文件名一并替换。
+    """
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None:
+            return
+        field_file = getattr(instance, field_name)
+        if not field_file:
+            return
+        source = field_file.name
+        try:
+            name = strip_stored_original(field_file.storage, source)
+            data = build_variants(field_file.storage, name)
+        except (OSError, Image.DecompressionBombError) as e:
+            logger.warning(f"生成图片尺寸版本失败 {model.__name__} {pk} {source}: {e}")
+            return
+
+        updated = model.objects.filter(pk=pk, **{field_name: source}).update(**{field_name: name, variants_field: data})
+        if not updated:
+            return
+        history = getattr(model, 'history', None)
+        if name != source and history is not None:
+            history.filter(**{field_name: source}).update(**{field_name: name})
+        if on_saved:
+            setattr(instance, field_name, name)
+            setattr(instance, variants_field, data)
+            on_saved(instance)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE_WORKERS, thread_name_prefix='image-variants'
+                )
+    return _executor
+
+
+def schedule_variants(instance, field_name, variants_field, on_saved=None):
+    """
+    图片字段保存后调用。提交后在后台线程生成尺寸版本；
+    IMAGE_PIPELINE_WORKERS 为 0 时在提交后同步执行（测试和命令行使用）。
+    """
+    field_file = getattr(instance, field_name)
+    current = getattr(instance, variants_field) or {}
+    if not field_file:
+        if current:
+            # 图片被清空：不再引用旧的尺寸版本，文件由 gc_media_blobs 清理
+            type(instance).objects.filter(pk=instance.pk).update(**{variants_field: {}})
+        return
+    if current.get('source') == field_file.name:
+        return
+
+    task = partial(process_image, type(instance), instance.pk, field_name, variants_field, on_saved)
+    if settings.IMAGE_PIPELINE_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(task))
+    else:
+        transaction.on_commit(task)
+
+
+def is_processed(field_file, variants_field):
+    """原图是否已经由后台任务去掉元数据并生成尺寸版本"""
+    return (getattr(field_file.instance, variants_field, None) or {}).get('source') == field_file.name
+
+
+def variant_map(data, request=None):
+    """把记录的文件名转成 URL，并拼好 srcset；还没生成时返回 None"""
+    if not data or not data.get('variants'):
+        return None
+
+    def url(name):
+        value = default_storage.url(name)
+        return request.build_absolute_uri(value) if request is not None else value
+
+    result = {
+        'width': data['width'],
+        'height': data['height'],
+        'placeholder': data['placeholder'],
+        'srcset': {},
+        'variants': [],
+    }
+    for entry in data['variants']:
+        item = {'width': entry['width'], 'height': entry['height']}
+        for fmt in EXTENSIONS:
+            if entry.get(fmt):
+                item[fmt] = url(entry[fmt])
+        result['variants'].append(item)
+    for fmt in EXTENSIONS:
+        sources = [f"{item[fmt]} {item['width']}w" for item in result['variants'] if fmt in item]
+        if sources:
+            result['srcset'][fmt] = ', '.join(sources)
+    return result
+
+
+class ProcessedImageField(serializers.ImageField):
+    """
+    图片字段的序列化：后台任务还没去掉元数据的原图（尺寸版本的 source 与当前文件名
+    不一致）返回 null，避免把带 GPS 等信息的文件地址发给客户端。
+    """
+
+    def __init__(self, variants_field, **kwargs):
+        self.variants_field = variants_field
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if value and not is_processed(value, self.variants_field):
+            return None
+        return super().to_representation(value)
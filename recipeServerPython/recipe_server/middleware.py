@@ -0,0 +1,205 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import nplusone, timing
+from .db import routers
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+class ReplicaRoutingMiddleware:
+    """
+    安全方法请求的读查询使用只读副本（见 recipe_server.db.routers）。
+
+    写请求成功后给客户端发一个签名的钉住标记（REPLICA_PIN_COOKIE cookie，同时放在
+    REPLICA_PIN_HEADER 响应头里），REPLICA_PIN_SECONDS 秒内带着它的读请求走主库，
+    保证刚写入的内容马上能读到。标记由客户端保存并带回，签名里带有时间戳，过期即
+    失效，不依赖进程内缓存，多个 worker 进程或多台服务器之间同样有效；不保存
+    cookie 的客户端（移动端、脚本）可以把响应头里的值放进同名请求头。
+    """
+    sync_capable = True
+    async_capable = True
+    signer = signing.TimestampSigner(salt='recipe_server.middleware.replica-pin')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = routers.begin_replica_reads(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_replica_reads(tokens)
+        self.process_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        tokens = routers.begin_replica_reads(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_replica_reads(tokens)
+        self.process_response(request, response)
+        return response
+
+    def is_pinned(self, request):
+        header = 'HTTP_' + settings.REPLICA_PIN_HEADER.upper().replace('-', '_')
+        for value in (request.META.get(header), request.COOKIES.get(settings.REPLICA_PIN_COOKIE)):
+            if not value:
+                continue
+            try:
+                self.signer.unsign(value, max_age=settings.REPLICA_PIN_SECONDS)
+            except signing.BadSignature:
+                continue
+            return True
+        return False
+
+    def use_replica(self, request):
+        if not routers.replica_aliases() or request.method not in SAFE_METHODS:
+            return False
+        return not self.is_pinned(request)
+
+    def process_response(self, request, response):
+        if not routers.replica_aliases() or request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        value = self.signer.sign('1')
+        response[settings.REPLICA_PIN_HEADER] = value
+        response.set_cookie(
+            settings.REPLICA_PIN_COOKIE, value,
+            max_age=settings.REPLICA_PIN_SECONDS,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+
+
+class RequestTimingMiddleware:
+    """
+    统计每个请求的 SQL 次数和耗时、序列化耗时、渲染耗时和总耗时。
+
+    按 REQUEST_TIMING_SAMPLE_RATE 抽样记一行 JSON 日志，REQUEST_TIMING_HEADER 开启时
+    同时输出 Server-Timing 响应头（会暴露给客户端，生产环境默认关闭）；
+    查询次数超过 REQUEST_QUERY_LIMIT 或耗时超过 SLOW_REQUEST_MS 的请求不受抽样
+    限制，总会记一条 WARNING，便于在生产环境及时发现 N+1 查询。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        timing.install_query_timing()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = timing.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.end_request(token)
+        self.report(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        timings, token = timing.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.end_request(token)
+        self.report(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def report(self, request, response, timings, elapsed):
+        total_ms = elapsed * 1000
+        flags = []
+        if timings.queries > settings.REQUEST_QUERY_LIMIT:
+            flags.append('too_many_queries')
+        if total_ms > settings.SLOW_REQUEST_MS:
+            flags.append('slow')
+        sampled = random.random() < settings.REQUEST_TIMING_SAMPLE_RATE
+        if not (sampled or flags):
+            return
+
+        if sampled and settings.REQUEST_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.sql * 1000:.1f};desc="{timings.queries} queries"',
+                f'serialize;dur={timings.serialize * 1000:.1f}',
+                f'render;dur={timings.render * 1000:.1f}',
+                f'view;dur={total_ms:.1f}',
+            ])
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'db_ms': round(timings.sql * 1000, 1),
+            'serialize_ms': round(timings.serialize * 1000, 1),
+            'render_ms': round(timings.render * 1000, 1),
+            'total_ms': round(total_ms, 1),
+        }
+        if flags:
+            record['flags'] = flags
+            logger.warning(f"request_timing {json.dumps(record, ensure_ascii=False)}")
+        else:
+            logger.info(f"request_timing {json.dumps(record, ensure_ascii=False)}")
+
+
+class NPlusOneMiddleware:
+    """
+    开发环境（DEBUG）下检测 N+1 查询：同一条归一化语句在一个请求中执行超过
+    NPLUSONE_THRESHOLD 次时记录警告，NPLUSONE_RAISE 为 True 时直接抛出异常。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with nplusone.count_queries() as counter:
+            response = self.get_response(request)
+        self.check(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        with nplusone.count_queries() as counter:
+            response = await self.get_response(request)
+        self.check(request, counter)
+        return response
+
+    def check(self, request, counter):
+        repeated = counter.repeated(settings.NPLUSONE_THRESHOLD)
+        if not repeated:
+            return
+        message = (
+            f"疑似 N+1 查询: {request.method} {request.path}，共 {counter.count} 条 SQL，"
+            f"以下语句重复执行:\n{nplusone.describe(repeated)}"
+        )
+        if settings.NPLUSONE_RAISE:
+            raise nplusone.NPlusOneDetected(message)
+        logger.warning(message)
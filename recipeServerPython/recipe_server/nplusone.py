@@ -0,0 +1,69 @@
+"""
+N+1 查询检测。
+
+把请求中执行的 SQL 归一化（去掉字面量、合并 IN 列表）后按语句分组计数，
+同一条语句执行超过 NPLUSONE_THRESHOLD 次通常意味着在循环里逐条查询。
+开发环境由 NPlusOneMiddleware 记录警告或直接报错，测试中使用
+recipe_server.testing.QueryCountMixin 固定各接口的查询次数。
+"""
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+# 测试用例的事务保存点不算业务查询
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class NPlusOneDetected(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """execute_wrapper：记录执行的语句，按归一化后的 SQL 分组"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+            self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def groups(self):
+        return Counter(normalize_sql(sql) for sql in self.statements)
+
+    def repeated(self, threshold):
+        """执行次数超过 threshold 的语句，按次数降序"""
+        return [(sql, n) for sql, n in self.groups().most_common() if n > threshold]
+
+
+@contextmanager
+def count_queries():
+    """在代码块内统计所有数据库连接上执行的语句"""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def describe(repeated, limit=200):
+    return '\n'.join(f'  {n} 次: {sql[:limit]}' for sql, n in repeated)
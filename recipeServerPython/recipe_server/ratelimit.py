@@ -0,0 +1,177 @@
+"""
+多个 worker 进程共享的令牌桶限流。
+
+所有令牌桶存放在一个内存映射文件（RATE_LIMIT_FILE）里，同一台机器上的 gunicorn
+worker 看到的是同一份数据，不需要额外的 Redis。文件由 RATE_LIMIT_SLOTS 个定长槽位
+组成，每个槽位记录 (键哈希, 剩余令牌, 更新时间)。键哈希后取模定位槽位，最多向后
+探测 PROBES 个位置，每次检查是常数次内存读写，在一把文件锁内完成。
+
+已经回满的令牌桶与新建的桶等价，所以探测不到空位时直接复用其中最久未更新的槽位，
+不会放过本应拒绝的请求（除非同时活跃的键多到挤占同一组槽位）。
+
+DRF 的限流检查在认证和权限检查之后、视图执行之前，登录接口的密码哈希和数据库查询
+都在限流之后。速率配置沿用 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] 的写法，
+'20/min' 表示桶容量 20、每分钟回满。
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_SLOT = struct.Struct('<Qdd')
+PROBES = 4
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60)"""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class SharedTokenBuckets:
+
+    def __init__(self, path, slots):
+        self.path = str(path)
+        self.slots = slots
+        self._thread_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * _SLOT.size
+        if os.fstat(self._fd).st_size != size:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    @staticmethod
+    def _hash(key):
+        # 0 表示空槽位
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+    def consume(self, key, capacity, period, now=None):
+        """
+        从 key 的令牌桶中取一个令牌。
+        返回 (是否允许, 需要等待的秒数)。
+        """
+        key_hash = self._hash(key)
+        refill = capacity / period
+        now = time.time() if now is None else now
+        start = key_hash % self.slots
+
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                target, tokens, updated = None, capacity, now
+                oldest = None
+                for i in range(PROBES):
+                    offset = (start + i) % self.slots * _SLOT.size
+                    slot_hash, slot_tokens, slot_updated = _SLOT.unpack_from(self._map, offset)
+                    if slot_hash == key_hash:
+                        target, tokens, updated = offset, slot_tokens, slot_updated
+                        break
+                    if slot_hash == 0 and target is None:
+                        target = offset
+                    if oldest is None or slot_updated < oldest[1]:
+                        oldest = (offset, slot_updated)
+                if target is None:
+                    target = oldest[0]
+
+                tokens = min(capacity, tokens + max(now - updated, 0) * refill)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                _SLOT.pack_into(self._map, target, key_hash, tokens, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        return allowed, 0 if allowed else (1 - tokens) / refill
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_buckets():
+    """每个进程打开一次共享文件；文件路径变化（测试中 override_settings）时重新打开"""
+    key = (os.getpid(), str(settings.RATE_LIMIT_FILE), settings.RATE_LIMIT_SLOTS)
+    buckets = _buckets.get(key)
+    if buckets is None:
+        with _buckets_lock:
+            buckets = _buckets.get(key)
+            if buckets is None:
+                buckets = _buckets[key] = SharedTokenBuckets(settings.RATE_LIMIT_FILE, settings.RATE_LIMIT_SLOTS)
+    return buckets
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    按 IP 和按用户两个令牌桶限流，任一桶耗尽即拒绝。
+    速率取 DEFAULT_THROTTLE_RATES 中的 '<scope>_ip' 和 '<scope>_user'，未配置的桶不检查。
+    """
+    scope = None
+
+    def get_user_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'id:{request.user.pk}'
+        return None
+
+    def allow_request(self, request, view):
+        if not settings.RATE_LIMIT_ENABLED:
+            return True
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        idents = [('ip', self.get_ident(request)), ('user', self.get_user_ident(request, view))]
+        self.wait_seconds = 0
+        for kind, ident in idents:
+            rate = rates.get(f'{self.scope}_{kind}')
+            if not rate or not ident:
+                continue
+            capacity, period = parse_rate(rate)
+            allowed, wait = get_buckets().consume(f'{self.scope}:{kind}:{ident}', capacity, period)
+            if not allowed:
+                self.wait_seconds = wait
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """登录：按 IP 和按尝试登录的用户名限流，防止暴力破解占满 worker"""
+    scope = 'login'
+
+    def get_user_ident(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        return f'name:{username.strip().lower()}' if isinstance(username, str) and username.strip() else None
+
+
+class RefreshRateThrottle(TokenBucketThrottle):
+    scope = 'refresh'
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    """只限制写请求，读请求不受影响"""
+    scope = 'write'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
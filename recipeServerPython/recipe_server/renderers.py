@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from .timing import measure
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """渲染耗时计入请求统计（Server-Timing 的 render 项）"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return super().render(data, accepted_media_type, renderer_context)
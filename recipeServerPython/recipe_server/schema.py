@@ -0,0 +1,92 @@
+"""
+OpenAPI 文档。
+
+视图从这里导入 extend_schema、OpenApiParameter 等注解，而不是直接导入
+drf_spectacular。settings.API_SCHEMA_ENABLED 为 False 时（生产 worker 的默认值）
+不导入 drf_spectacular，注解全部是空操作，/api/schema/ 改为返回部署时用
+build_api_schema 命令预先生成的 schema 文件。
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views import View
+from django.views.generic import TemplateView
+
+from .compression import apply_encoding, precompress, select
+
+logger = logging.getLogger(__name__)
+
+if settings.API_SCHEMA_ENABLED:
+    from drf_spectacular.types import OpenApiTypes
+    from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+else:
+    def extend_schema(*args, **kwargs):
+        def decorator(f):
+            return f
+        return decorator
+
+    class OpenApiParameter:
+        QUERY = 'query'
+        PATH = 'path'
+        HEADER = 'header'
+        COOKIE = 'cookie'
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+    class OpenApiExample:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    class _OpenApiTypes:
+        def __getattr__(self, name):
+            return name
+
+    OpenApiTypes = _OpenApiTypes()
+
+
+class StaticSchemaView(View):
+    """返回预生成的 schema 文件，按进程缓存内容和压缩版本，支持 ETag 条件请求"""
+    _cache = {}
+
+    @classmethod
+    def load(cls):
+        path = str(settings.API_SCHEMA_FILE)
+        if path not in cls._cache:
+            with open(path, 'rb') as f:
+                content = f.read()
+            cls._cache[path] = (precompress(content), '"%s"' % hashlib.sha1(content).hexdigest())
+        return cls._cache[path]
+
+    def get(self, request):
+        try:
+            encoded, etag = self.load()
+        except FileNotFoundError:
+            logger.error(f"API schema 文件不存在: {settings.API_SCHEMA_FILE}，请先运行 build_api_schema")
+            return JsonResponse({'error': 'API 文档尚未生成'}, status=503, json_dumps_params={'ensure_ascii': False})
+
+        content, encoding = select(encoded, request)
+        if request.headers.get('If-None-Match') in (etag, 'W/' + etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/vnd.oai.openapi+json')
+        response['ETag'] = etag
+        apply_encoding(response, encoding)
+        response['Cache-Control'] = f'public, max-age={settings.API_SCHEMA_CACHE_SECONDS}'
+        return response
+
+
+class SchemaDocsView(TemplateView):
+    """不依赖 drf_spectacular 的 Swagger UI / ReDoc 页面"""
+    template_name = 'api_docs/swagger_ui.html'
+    schema_url_name = 'schema'
+
+    def get_context_data(self, **kwargs):
+        from django.urls import reverse
+
+        context = super().get_context_data(**kwargs)
+        context['title'] = settings.SPECTACULAR_SETTINGS.get('TITLE', 'API')
+        context['schema_url'] = reverse(self.schema_url_name)
+        return context
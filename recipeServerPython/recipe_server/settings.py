@@ -23,8 +23,12 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'blog.apps.BlogConfig',
     'users.apps.UsersConfig',
+    'recipes.apps.RecipesConfig',
+    'recipe_site.apps.RecipeSiteConfig',
 ]
 MIDDLEWARE = [
+    'recipe_server.middleware.RequestTimingMiddleware',
+    'recipe_server.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -33,6 +37,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'recipe_server.middleware.ReplicaRoutingMiddleware',
+    'recipe_server.middleware.NPlusOneMiddleware',
 ]
 ROOT_URLCONF = 'recipe_server.urls'
 TEMPLATES = [
@@ -63,6 +69,18 @@ DATABASES = {
         'PORT': '54321',
     }
 }
+
+# 读写分离：DATABASE_REPLICAS 中的别名作为只读副本，安全方法请求的读查询会分发到副本
+DATABASE_ROUTERS = ['recipe_server.db.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+# 写请求成功后该客户端在主库上读取的时长（秒），应大于副本的复制延迟
+REPLICA_PIN_SECONDS = 10
+# 钉住标记由客户端带回：cookie 名和请求/响应头名（不保存 cookie 的客户端使用请求头）
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_PIN_HEADER = 'X-DB-Pin'
+# 副本不可用时回退主库，隔多久（秒）重新检查
+REPLICA_HEALTH_CHECK_INTERVAL = 30
+
 LANGUAGE_CODE = 'zh-hans'
 TIME_ZONE = 'Asia/Shanghai'
 USE_I18N = True
@@ -71,9 +89,90 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# 上传文件按内容哈希存放在 MEDIA_ROOT/cas/ 下，相同文件只存一份（见 recipe_server.storage）
+STORAGES = {
+    'default': {'BACKEND': 'recipe_server.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
 
 # 认证设置
 LOGIN_URL = '/login/'
+# JWT 认证的用户对象缓存时间（秒），0 表示每个请求都查库，见 api.authentication
+AUTH_USER_CACHE_SECONDS = 30
+AUTH_USER_CACHE_ALIAS = 'default'
+# refresh token 吊销：各进程的布隆过滤器从数据库同步的间隔和整体重建间隔（秒），见 api.revocation
+TOKEN_REVOCATION_SYNC_SECONDS = 5
+TOKEN_REVOCATION_REBUILD_SECONDS = 60 * 10
+# 增量同步时往前多读的时长（秒），应大于写入吊销记录的事务耗时
+TOKEN_REVOCATION_SYNC_MARGIN_SECONDS = 60
+TOKEN_REVOCATION_BLOOM_CAPACITY = 200000
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+
+# 博客只读接口使用异步视图（需以 ASGI 方式部署，见 gunicorn_config.py 的 async 模式）
+BLOG_ASYNC_READS = os.environ.get('BLOG_ASYNC_READS', '0') == '1'
+
+# 上传图片的尺寸版本（见 recipe_server.images）；IMAGE_PIPELINE_WORKERS 为 0 时在事务提交后同步生成
+IMAGE_VARIANT_WIDTHS = [320, 640, 1024, 1600]
+IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+IMAGE_PLACEHOLDER_WIDTH = 16
+IMAGE_PIPELINE_WORKERS = 2
+
+# 分片上传：未完成的文件存放目录、文件和单个分片的大小上限、会话有效期（秒，每收到一个分片顺延）
+UPLOAD_SESSION_DIR = BASE_DIR / 'var' / 'uploads'
+UPLOAD_MAX_BYTES = 50 * 1024 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 4 * 1024 * 1024
+UPLOAD_SESSION_TTL = 60 * 60 * 24
+
+# 菜谱分面检索（见 recipes.facets）：各进程到数据库检查索引版本的间隔（秒，版本取自菜谱变更日志，
+# 不依赖共享缓存）、缓存的筛选状态数、标签分面最多列出的标签数
+RECIPE_FACET_CHECK_SECONDS = 5
+RECIPE_FACET_CACHE_SIZE = 256
+RECIPE_FACET_TAG_LIMIT = 30
+
+# 菜谱增量同步（见 recipes.sync）：每页最多的变更记录/菜谱数、变更记录的下发延迟（秒，
+# 避免游标越过尚未提交的事务）、变更记录保留天数（prune_recipe_changes 命令定期清理）
+RECIPE_SYNC_PAGE_SIZE = 200
+RECIPE_SYNC_SETTLE_SECONDS = 5
+RECIPE_SYNC_RETENTION_DAYS = 30
+
+# 响应压缩（见 recipe_server.compression）：超过该字节数的 JSON / 文本响应按 Accept-Encoding
+# 使用 Brotli（安装了 brotli 包时）或 gzip 压缩；缓存的响应在写入缓存时预先压缩
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSION_GZIP_LEVEL = 6
+# 响应体中带有令牌等秘密的接口不压缩（BREACH）
+COMPRESSION_EXCLUDE_PATHS = ['/api/v1/auth/']
+
+# 文章内容相似度索引（内存映射文件，使用 build_similarity_index 命令重建，update_similarity_index 增量更新）
+SIMILARITY_INDEX_DIR = BASE_DIR / 'var' / 'similarity_index'
+SIMILARITY_VECTOR_DIM = 2048
+# update_similarity_index 增量更新时，从上次更新时间再往前多处理的秒数（覆盖当时未提交的事务）
+SIMILARITY_UPDATE_OVERLAP_SECONDS = 60
+
+# 登录、刷新令牌和文章写接口的限流；令牌桶保存在所有 worker 共享的内存映射文件中
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_FILE = BASE_DIR / 'var' / 'ratelimit.buckets'
+RATE_LIMIT_SLOTS = 65536
+
+# 请求性能统计（Server-Timing 响应头 + 日志），见 recipe_server.middleware.RequestTimingMiddleware
+REQUEST_TIMING_SAMPLE_RATE = 1.0
+# Server-Timing 响应头会暴露给所有客户端，只在开发环境默认开启
+REQUEST_TIMING_HEADER = DEBUG
+# 超过以下阈值的请求总会记一条 WARNING
+REQUEST_QUERY_LIMIT = 30
+SLOW_REQUEST_MS = 500
+
+# 测试运行器：关闭限流，测试写入的文件放在临时目录
+TEST_RUNNER = 'recipe_server.testing.TestRunner'
+
+# N+1 查询检测（仅 DEBUG 下启用）：同一语句在一个请求中执行超过阈值次数时警告或报错
+NPLUSONE_THRESHOLD = 5
+NPLUSONE_RAISE = False
+
+# API文档：开启时加载 drf_spectacular 在线生成 schema；关闭时返回 build_api_schema 预生成的文件
+API_SCHEMA_ENABLED = os.environ.get('API_SCHEMA_ENABLED', '1') == '1'
+API_SCHEMA_FILE = BASE_DIR / 'var' / 'openapi.json'
+API_SCHEMA_CACHE_SECONDS = 60 * 60 * 24
 
 # 日志配置
 LOGS_DIR = BASE_DIR / 'logs'
@@ -130,6 +229,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'recipe_server': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -157,6 +261,12 @@ CORS_ALLOWED_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-db-pin',
+]
+
+# 允许前端读取的响应头：写请求后的主库钉住标记
+CORS_EXPOSE_HEADERS = [
+    'x-db-pin',
 ]
 
 CORS_ALLOW_METHODS = [
@@ -171,15 +281,23 @@ CORS_ALLOW_METHODS = [
 # Django REST Framework 配置
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'recipe_server.renderers.TimedJSONRenderer',
     ],
+    # 令牌桶限流速率，见 recipe_server.ratelimit
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '20/min',
+        'login_user': '5/min',
+        'refresh_ip': '30/min',
+        'write_ip': '60/min',
+        'write_user': '30/min',
+    },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -242,6 +360,14 @@ SPECTACULAR_SETTINGS = {
             'name': '评论',
             'description': '文章评论系统',
         },
+        {
+            'name': '菜谱',
+            'description': '菜谱浏览和筛选',
+        },
+        {
+            'name': '上传',
+            'description': '大文件分片上传和断点续传',
+        },
     ],
     'COMPONENT_SPLIT_REQUEST': True,
     'SORT_OPERATIONS': False,
@@ -20,9 +20,65 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'your_secure_password'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'OPTIONS': {},
     }
 }
 
+# 数据库连接管理，DB_CONNECTION_MODE 可选：
+#   persistent - 默认。每个worker线程保持长连接，复用前做健康检查
+#   pool       - 每个worker进程一个 psycopg3 连接池，请求结束时归还连接
+#   pgbouncer  - 连接 pgbouncer（transaction 池模式），禁用服务端游标和预处理语句
+DB_CONNECTION_MODE = os.environ.get('DB_CONNECTION_MODE', 'persistent')
+
+if DB_CONNECTION_MODE == 'pool':
+    DATABASES['default'].update({
+        'ENGINE': 'recipe_server.db.postgresql_pool',
+        'CONN_MAX_AGE': 0,  # “关闭”即归还到连接池
+    })
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),  # 每个worker进程
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+    }
+elif DB_CONNECTION_MODE == 'pgbouncer':
+    DATABASES['default'].update({
+        # 到 pgbouncer 的连接很便宜，保持长连接即可
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        # transaction 池模式下同一会话的语句可能落在不同的服务端连接上
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+    })
+else:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# 服务端预处理语句：同一连接上执行超过阈值次数的查询（即热点查询）会被
+# psycopg 自动 PREPARE，之后只传参数。需要服务端参数绑定；
+# pgbouncer 1.21 以下不支持预处理语句，该模式下不要开启。
+if os.environ.get('DB_PREPARED_STATEMENTS') == '1' and DB_CONNECTION_MODE != 'pgbouncer':
+    DATABASES['default']['OPTIONS'].update({
+        'server_side_binding': True,
+        'prepare_threshold': int(os.environ.get('DB_PREPARE_THRESHOLD', 5)),
+    })
+
+# 只读副本：DB_REPLICA_HOSTS=host1:5432,host2:5432，其余连接参数与主库相同
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+
 # 安全设置
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-production-secret-key-here')
 
@@ -34,6 +90,44 @@ STATIC_ROOT = '/var/www/personalBlog/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/var/www/personalBlog/media/'
 
+# 文章相似度索引
+SIMILARITY_INDEX_DIR = '/var/www/personalBlog/var/similarity_index/'
+
+# 分片上传的临时文件
+UPLOAD_SESSION_DIR = '/var/www/personalBlog/var/uploads/'
+
+# API文档：worker 默认不加载 drf_spectacular，/api/schema/ 返回部署时生成的文件
+# （API_SCHEMA_ENABLED=1 python manage.py build_api_schema）
+API_SCHEMA_ENABLED = os.environ.get('API_SCHEMA_ENABLED', '0') == '1'
+API_SCHEMA_FILE = '/var/www/personalBlog/var/openapi.json'
+if not API_SCHEMA_ENABLED:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'drf_spectacular']
+    REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.openapi.AutoSchema'}
+
+# 共享缓存：JWT 认证的用户缓存等需要所有 worker 看到同一份数据。REDIS_URL 形如
+# redis://127.0.0.1:6379/1；没有配置时只有每个 worker 进程内的缓存，停用和改密不能及时
+# 同步到其它 worker，因此关闭认证用户缓存，每个请求查库
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'personalBlog',
+        }
+    }
+    AUTH_USER_CACHE_ALIAS = 'default'
+else:
+    AUTH_USER_CACHE_SECONDS = 0
+
+# 限流：令牌桶文件放在 tmpfs 上，重启后清空；nginx 反向代理一层，按 X-Forwarded-For 的最后一跳识别客户端
+RATE_LIMIT_FILE = '/dev/shm/personalBlog-ratelimit.buckets'
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'NUM_PROXIES': 1}
+
+# 请求性能统计：默认抽样 5%，超过阈值的请求总会记录
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0.05))
+REQUEST_TIMING_HEADER = os.environ.get('REQUEST_TIMING_HEADER', '0') == '1'
+
 # CORS设置 - 生产环境
 CORS_ALLOWED_ORIGINS = [
     "https://your-domain.com",  # 替换为您的域名
@@ -79,5 +173,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'recipe_server': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 } 
\ No newline at end of file
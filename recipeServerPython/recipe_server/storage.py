@@ -0,0 +1,76 @@
+"""
+按内容寻址的媒体文件存储。
+
+上传的文件边读边计算 SHA-256，写入临时文件后以内容哈希命名：
+    cas/ab/cd/abcd...ef.jpg
+同样内容的文件只保存一份，重复上传直接复用已有文件。文件名由内容决定，内容不变
+URL 就不变，nginx 可以对 /media/cas/ 返回 Cache-Control: immutable。
+
+一个文件可能被多条记录引用，所以 delete() 不删除 cas/ 下的文件，由 gc_media_blobs
+命令统一清理没有任何记录引用的文件。不在 cas/ 下的旧文件按原来的方式读写和删除。
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = 'cas'
+TMP_DIR = '.tmp'
+
+
+def is_blob(name):
+    return name.replace('\\', '/').startswith(CAS_PREFIX + '/')
+
+
+def blob_name(digest, extension):
+    return posixpath.join(CAS_PREFIX, digest[:2], digest[2:4], digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # 真正的文件名在 _save 中按内容确定，不需要为重名追加后缀
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        tmp_dir = os.path.join(self.location, TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            final_name = blob_name(digest.hexdigest(), extension)
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                # 相同内容已存在：复用，同时刷新修改时间，避免被正在运行的垃圾回收误删
+                os.utime(final_path)
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return final_name
+
+    def delete(self, name):
+        if not is_blob(name):
+            super().delete(name)
+
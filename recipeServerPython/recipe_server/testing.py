@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from .nplusone import count_queries, describe
+
+
+class QueryCountMixin:
+    """
+    测试用例混入：固定接口的查询次数。
+
+        with self.assertEndpointQueries(3):
+            self.client.get('/api/v1/posts/')
+
+    查询次数与预期不符，或同一语句重复超过 NPLUSONE_THRESHOLD 次时测试失败。
+    预期次数应与数据量无关，数据变多查询次数也随之增加就是 N+1。
+    """
+
+    @contextmanager
+    def assertEndpointQueries(self, expected, threshold=None):
+        threshold = settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+        with count_queries() as counter:
+            yield counter
+
+        repeated = counter.repeated(threshold)
+        if repeated:
+            self.fail(f'检测到 N+1 查询（阈值 {threshold}）:\n{describe(repeated)}')
+        if counter.count != expected:
+            statements = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(counter.statements, 1))
+            self.fail(f'预期 {expected} 条 SQL，实际执行 {counter.count} 条:\n{statements}')
+
+
+class TestRunner(DiscoverRunner):
+    """
+    测试运行器（settings.TEST_RUNNER）：测试期间关闭限流，需要写文件的设置指向临时目录，
+    测试不会写入仓库的 var/ 目录。测试限流本身的用例自行用 override_settings 打开。
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tmpdir = tempfile.mkdtemp(prefix='recipe_server-test-')
+        self._override = override_settings(
+            RATE_LIMIT_ENABLED=False,
+            RATE_LIMIT_FILE=os.path.join(self._tmpdir, 'ratelimit.buckets'),
+            SIMILARITY_INDEX_DIR=os.path.join(self._tmpdir, 'similarity_index'),
+        )
+        self._override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._override.disable()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,146 @@
+import contextvars
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from blog.models import BlogPost
+from . import timing
+from .db import routers
+from .middleware import ReplicaRoutingMiddleware
+
+
+def worker_cache(name):
+    """ 每个 worker 进程各自的本地内存缓存 """
+    return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': name}}
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        routers.reset_replica_health()
+        self.factory = RequestFactory()
+        self.aliases = []
+
+        def get_response(request):
+            self.aliases.append(routers.current_read_alias())
+            return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+        self.get_response = get_response
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def _request(self, method, middleware=None, cookies=None, **extra):
+        request = getattr(self.factory, method)('/api/v1/posts/', **extra)
+        request.COOKIES.update(cookies or {})
+        response = (middleware or self.middleware)(request)
+        return self.aliases[-1], response
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_reads_use_replica_until_client_writes(self, healthy):
+        """ 读请求走副本，写入后带着钉住标记的客户端暂时读主库 """
+        self.assertEqual(self._request('get')[0], 'replica')
+        alias, response = self._request('post')
+        self.assertEqual(alias, 'default')
+        pin = response.cookies['db_pin']
+        self.assertEqual(pin['max-age'], 10)
+        self.assertTrue(pin['httponly'])
+
+        self.assertEqual(self._request('get', cookies={'db_pin': pin.value})[0], 'default')
+        # 不保存 cookie 的客户端用响应头里的值
+        self.assertEqual(self._request('get', HTTP_X_DB_PIN=response['X-DB-Pin'])[0], 'default')
+        # 其他客户端不受影响
+        self.assertEqual(self._request('get')[0], 'replica')
+        # 不在请求中（管理命令、后台任务）一律读主库
+        self.assertEqual(routers.current_read_alias(), 'default')
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_pin_shared_between_workers_with_separate_caches(self, healthy):
+        """ 写请求和随后的读请求落在缓存互不共享的两个 worker 上，读请求仍走主库 """
+        with override_settings(CACHES=worker_cache('worker-a')):
+            _, response = self._request('post', middleware=ReplicaRoutingMiddleware(self.get_response))
+        with override_settings(CACHES=worker_cache('worker-b')):
+            worker_b = ReplicaRoutingMiddleware(self.get_response)
+            self.assertEqual(self._request('get', middleware=worker_b, cookies={'db_pin': response.cookies['db_pin'].value})[0], 'default')
+            self.assertEqual(self._request('get', middleware=worker_b)[0], 'replica')
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_expired_or_forged_pin_ignored(self, healthy):
+        """ 过期或伪造的钉住标记不生效 """
+        with mock.patch('time.time', return_value=1_000_000):
+            stale = ReplicaRoutingMiddleware.signer.sign('1')
+        self.assertEqual(self._request('get', cookies={'db_pin': stale})[0], 'replica')
+        self.assertEqual(self._request('get', cookies={'db_pin': '1'})[0], 'replica')
+        forged = signing.TimestampSigner(key='not-the-secret', salt='recipe_server.middleware.replica-pin').sign('1')
+        self.assertEqual(self._request('get', HTTP_X_DB_PIN=forged)[0], 'replica')
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_failed_write_not_pinned(self, healthy):
+        """ 写请求失败时不发钉住标记 """
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(status=400))
+        response = middleware(self.factory.post('/api/v1/posts/'))
+        self.assertNotIn('db_pin', response.cookies)
+        self.assertNotIn('X-DB-Pin', response)
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        """ 副本无法连接时回退到主库 """
+        self.assertEqual(self._request('get')[0], 'default')
+
+
+class RequestTimingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author', password='password')
+        BlogPost.objects.create(title='Post', content='...', author=author, status='published')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0, REQUEST_TIMING_HEADER=True)
+    def test_server_timing_header(self):
+        """ 抽样到的请求带 Server-Timing 头，包含查询次数 """
+        with self.assertLogs('recipe_server.middleware', 'INFO'):
+            response = self.client.get('/api/v1/posts/')
+        header = response['Server-Timing']
+        for name in ('db;', 'serialize;', 'render;', 'view;'):
+            self.assertIn(name, header)
+        self.assertRegex(header, r'desc="[1-9]\d* queries"')
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0, REQUEST_QUERY_LIMIT=0)
+    def test_query_limit_flagged_without_sampling(self):
+        """ 超过查询次数阈值的请求即使未被抽样也会记 WARNING """
+        with self.assertLogs('recipe_server.middleware', 'WARNING') as logs:
+            response = self.client.get('/api/v1/posts/')
+        self.assertNotIn('Server-Timing', response)
+        record = json.loads(logs.records[0].getMessage().split(' ', 1)[1])
+        self.assertEqual(record['view'], 'api_v1:blog:post-list')
+        self.assertIn('too_many_queries', record['flags'])
+
+    def test_queries_in_other_threads_counted(self):
+        """ 异步视图经 sync_to_async 在其他线程的连接上执行的查询也计入当前请求 """
+        timing.install_query_timing()
+
+        def query():
+            try:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connections.close_all()
+
+        timings, token = timing.start_request()
+        try:
+            # 和 sync_to_async 一样把当前上下文带到执行线程
+            thread = threading.Thread(target=contextvars.copy_context().run, args=(query,))
+            thread.start()
+            thread.join()
+        finally:
+            timing.end_request(token)
+        self.assertEqual(timings.queries, 1)
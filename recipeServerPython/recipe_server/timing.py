@@ -0,0 +1,108 @@
+"""
+请求级性能统计，由 RequestTimingMiddleware 开启。
+
+- SQL：每个数据库连接上常驻一个 execute_wrapper，统计查询次数和耗时
+- serialize：使用 TimedSerializerMixin 的序列化器 .data 的耗时（包括其中触发的查询）
+- render：DRF 渲染器把数据编码成 JSON 的耗时
+
+数据库连接按线程区分，异步视图的查询经 sync_to_async 在其他线程的连接上执行，
+所以 execute_wrapper 不能只装在处理请求的线程的连接上：install_query_timing 在每个
+连接建立时（connection_created）装上同一个包装函数，包装函数再从 ContextVar 取出
+当前请求的统计对象。sync_to_async 会把 ContextVar 带到执行线程，查询就能记到
+同一个请求上；不在请求中的查询直接执行。
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self._measuring = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql += time.perf_counter() - start
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """把代码块耗时累加到当前请求的 name 项；嵌套调用只计最外层"""
+    timings = _current.get()
+    if timings is None or name in timings._measuring:
+        yield
+        return
+    timings._measuring.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, name, getattr(timings, name) + time.perf_counter() - start)
+        timings._measuring.discard(name)
+
+
+def _execute(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def _install_wrapper(connection, **kwargs):
+    if _execute not in connection.execute_wrappers:
+        # 放在最前面：execute_wrapper() 上下文管理器退出时 pop 的是最后一个
+        connection.execute_wrappers.insert(0, _execute)
+
+
+def install_query_timing():
+    """给当前线程已有的连接和之后在任何线程建立的连接装上查询计时，可重复调用"""
+    connection_created.connect(_install_wrapper, dispatch_uid='recipe_server.timing')
+    for connection in connections.all():
+        _install_wrapper(connection)
+
+
+class TimedSerializerMixin:
+    """
+    把序列化器 .data 的耗时计入当前请求的 serialize 项。many=True 时 DRF 创建的是
+    ListSerializer，.data 在列表上调用，所以列表类也要带上计时。
+    """
+
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if not isinstance(serializer, TimedSerializerMixin):
+            serializer.__class__ = _timed_list_class(type(serializer))
+        return serializer
+
+
+@functools.cache
+def _timed_list_class(list_class):
+    return type(f'Timed{list_class.__name__}', (TimedSerializerMixin, list_class), {})
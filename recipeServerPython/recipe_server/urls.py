@@ -4,20 +4,32 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
 urlpatterns = [
     # Django admin
     path('admin/', admin.site.urls),
     
-    # API文档
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-    
     # API接口
     path('api/v1/', include('api.urls', namespace='api_v1')),
 ]
 
+# API文档：开启 API_SCHEMA_ENABLED 时在线生成，否则返回预生成的 schema 文件
+if settings.API_SCHEMA_ENABLED:
+    from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+
+    urlpatterns += [
+        path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+        path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+        path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    ]
+else:
+    from .schema import SchemaDocsView, StaticSchemaView
+
+    urlpatterns += [
+        path('api/schema/', StaticSchemaView.as_view(), name='schema'),
+        path('api/docs/', SchemaDocsView.as_view(), name='swagger-ui'),
+        path('api/redoc/', SchemaDocsView.as_view(template_name='api_docs/redoc.html'), name='redoc'),
+    ]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) 
\ No newline at end of file
@@ -1,18 +1,76 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
 from recipe_site.models import Recipe
 
+STATUSES = [value for value, _ in Recipe.STATUS_CHOICES]
+
+
 class Command(BaseCommand):
-    help = 'Updates all recipes to published status'
+    help = (
+        '批量修改菜谱状态（默认把全部草稿改为已发布）。只修改按 Recipe.STATUS_TRANSITIONS '
+        '可以转换到目标状态的菜谱；按主键区间分批执行 UPDATE，每批单独提交，不加载记录，也不会长时间持有锁'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', default='published', choices=STATUSES, help='目标状态')
+        parser.add_argument('--from-status', action='append', choices=STATUSES, dest='from_statuses',
+                            help='只修改处于该状态的菜谱，可以多次指定；必须是可以转换到目标状态的状态')
+        parser.add_argument('--min-id', type=int, help='只修改 id 不小于该值的菜谱')
+        parser.add_argument('--max-id', type=int, help='只修改 id 不大于该值的菜谱')
+        parser.add_argument('--title-contains', help='只修改标题包含该文本的菜谱')
+        parser.add_argument('--batch-size', type=int, default=10000, help='每批覆盖的主键区间大小')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，降低对线上库的压力')
+        parser.add_argument('--dry-run', action='store_true', help='只统计会被修改的数量，不写入')
 
     def handle(self, *args, **options):
-        recipes = Recipe.objects.all()
-        count = 0
-        
-        for recipe in recipes:
-            recipe.status = 'published'
-            recipe.save()
-            count += 1
-            
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully updated {count} recipes to published status')
-        ) 
\ No newline at end of file
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size 必须大于 0')
+        target = options['status']
+
+        # 只修改允许转换到目标状态的菜谱，已经是目标状态的不再更新
+        sources = Recipe.allowed_sources(target)
+        if options['from_statuses']:
+            invalid = sorted(set(options['from_statuses']) - set(sources))
+            if invalid:
+                raise CommandError(
+                    f"不能从 {', '.join(invalid)} 转换到 {target}，允许的原状态: {', '.join(sources) or '无'}"
+                )
+            sources = options['from_statuses']
+        queryset = Recipe.objects.filter(status__in=sources)
+        if options['min_id'] is not None:
+            queryset = queryset.filter(pk__gte=options['min_id'])
+        if options['max_id'] is not None:
+            queryset = queryset.filter(pk__lte=options['max_id'])
+        if options['title_contains']:
+            queryset = queryset.filter(title__contains=options['title_contains'])
+
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('没有需要修改的菜谱')
+            return
+        low, high = bounds['low'], bounds['high']
+        verb = '将修改' if options['dry_run'] else '已修改'
+
+        started = time.perf_counter()
+        total = 0
+        for start in range(low, high + 1, batch_size):
+            end = min(start + batch_size - 1, high)
+            # 主键区间走主键索引，每批是一条独立提交的 UPDATE，只锁住本区间内命中的行
+            chunk = queryset.filter(pk__gte=start, pk__lte=end)
+            count = chunk.count() if options['dry_run'] else chunk.update(status=target)
+            total += count
+            progress = (end - low + 1) / (high - low + 1) * 100
+            self.stdout.write(f'[{progress:5.1f}%] id {start}-{end}: {verb} {count} 个，累计 {total} 个')
+            if options['sleep'] and end < high:
+                time.sleep(options['sleep'])
+
+        elapsed = time.perf_counter() - started
+        message = f'{verb} {total} 个菜谱 -> {target}，耗时 {elapsed:.1f}s'
+        if options['dry_run']:
+            self.stdout.write(message + '（试运行，未写入）')
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
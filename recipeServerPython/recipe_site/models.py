@@ -7,7 +7,17 @@ class Recipe(models.Model):
     ]
     
     title = models.CharField(max_length=200)
+    # 允许的状态转换：原状态 -> 可以转换到的状态（update_recipe_status 命令据此限制批量修改）
+    STATUS_TRANSITIONS = {
+        'draft': ('published',),
+        'published': ('draft',),
+    }
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
+
+    @classmethod
+    def allowed_sources(cls, target):
+        """可以转换到 target 的状态"""
+        return [source for source, targets in cls.STATUS_TRANSITIONS.items() if target in targets]
     
     def __str__(self):
         return self.title 
\ No newline at end of file
@@ -0,0 +1,38 @@
+import io
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .models import Recipe
+
+
+class UpdateRecipeStatusCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Recipe.objects.bulk_create([Recipe(title=f'菜谱{i}', status='draft') for i in range(25)])
+        cls.published = Recipe.objects.create(title='已发布', status='published')
+
+    def call(self, *args):
+        out = io.StringIO()
+        call_command('update_recipe_status', *args, stdout=out)
+        return out.getvalue()
+
+    def test_batched_update_with_filters(self):
+        """ 按主键区间分批更新，只修改符合过滤条件的菜谱 """
+        low = Recipe.objects.order_by('pk').values_list('pk', flat=True)[5]
+        output = self.call('--batch-size', '7', '--min-id', str(low))
+        self.assertIn('已修改 20 个菜谱 -> published', output)
+        self.assertEqual(Recipe.objects.filter(status='draft').count(), 5)
+
+    def test_dry_run_does_not_write(self):
+        output = self.call('--dry-run')
+        self.assertIn('将修改 25 个菜谱', output)
+        self.assertEqual(Recipe.objects.filter(status='draft').count(), 25)
+
+    def test_from_status_restricted_to_allowed_transitions(self):
+        """ --from-status 只能是可以转换到目标状态的状态 """
+        with self.assertRaises(CommandError):
+            self.call('--status', 'draft', '--from-status', 'draft')
+        self.call('--status', 'draft')
+        self.assertEqual(Recipe.objects.filter(status='published').count(), 0)
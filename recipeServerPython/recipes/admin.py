@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Recipe, DeviceModel
+from .models import Recipe, DeviceModel, Ingredient, IngredientSynonym, RecipeTag, WorkMode
 
 @admin.register(DeviceModel)
 class DeviceModelAdmin(admin.ModelAdmin):
@@ -10,7 +10,7 @@ class DeviceModelAdmin(admin.ModelAdmin):
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'created_at', 'updated_at')
     list_filter = ('author', 'created_at', 'compatible_models')
-    search_fields = ('title', 'description', 'ingredients', 'instructions')
+    search_fields = ('title', 'description', 'tags')
     filter_horizontal = ('compatible_models',) # Easier selection for ManyToMany
     readonly_fields = ('created_at', 'updated_at')
     fieldsets = (
@@ -18,7 +18,8 @@ class RecipeAdmin(admin.ModelAdmin):
             'fields': ('title', 'description', 'author', 'image')
         }),
         ('详细信息', {
-            'fields': ('ingredients', 'instructions', 'prep_time_minutes', 'cook_time_minutes', 'servings')
+            'fields': ('tags', 'work_modes', 'staple_food', 'ingredients', 'steps',
+                       'prep_time_hours', 'prep_time_minutes', 'cook_time_hours', 'cook_time_minutes', 'servings')
         }),
         ('设备兼容性', {
             'fields': ('compatible_models',)
@@ -28,3 +29,21 @@ class RecipeAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(RecipeTag, WorkMode)
+class RecipeLabelAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+class IngredientSynonymInline(admin.TabularInline):
+    model = IngredientSynonym
+    extra = 1
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name', 'synonyms__name')
+    inlines = [IngredientSynonymInline]
@@ -0,0 +1,158 @@
+"""
+按设备型号打包的离线菜谱包。
+
+每个 DeviceModel 一个文件，包含兼容该型号的全部已发布菜谱中设备需要的字段（步骤、
+主辅料、指令码、烤盘位置、温度等）。内容是
+    {"version": 1, "model": 型号标识, "fields": [字段名...], "recipes": [[字段值...], ...]}
+每个菜谱是按 fields 顺序排列的数组，不重复字段名。编码优先用 MessagePack + zstd，
+msgpack / zstandard 是可选依赖，没有安装时分别退回 JSON / gzip，实际格式记录在
+RecipeBundle.format 中（如 "msgpack+zstd"、"json+gzip"）。
+
+文件保存在内容寻址存储（recipe_server.storage）中，文件名即内容的 SHA-256，
+nginx 对 /media/cas/ 按不可变文件缓存；设备先请求清单接口（ETag 为同一哈希）再下载。
+编码结果只取决于菜谱内容，内容没变时重新生成得到同一个文件。
+
+增量生成复用同步用的变更日志（recipes.sync）：每个包记录处理到的变更ID和包含的菜谱，
+只有此后变化的菜谱在包中、或现在兼容该型号时才重新生成这个型号的包。
+build_recipe_bundles 命令执行一次增量生成，可由 cron 每分钟执行。
+"""
+import gzip
+import hashlib
+import json
+import logging
+from collections import defaultdict
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from .models import DeviceModel, Recipe, RecipeBundle
+from .sync import is_pruned, settled_changes, settled_head
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 1
+BUNDLE_FIELDS = (
+    'id', 'title', 'updated_at', 'difficulty', 'suitable_person', 'servings',
+    'prep_time_hours', 'prep_time_minutes', 'cook_time_hours', 'cook_time_minutes', 'total_minutes',
+    'temperature_value', 'temperature_unit', 'work_modes',
+    'staple_food', 'ingredients', 'steps', 'tips', 'order', 'comal_position',
+)
+# 菜谱包只生成一次、下载很多次，使用较高的压缩级别
+ZSTD_LEVEL = 19
+GZIP_LEVEL = 9
+EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+
+
+def bundle_format():
+    return f"{'msgpack' if msgpack is not None else 'json'}+{'zstd' if zstandard is not None else 'gzip'}"
+
+
+def encode(payload, fmt):
+    serialization, compression = fmt.split('+')
+    if serialization == 'msgpack':
+        data = msgpack.packb(payload, use_bin_type=True)
+    else:
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    # mtime 固定为 0，相同内容得到相同的字节
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decode(data, fmt):
+    """encode 的逆过程（测试和排查问题使用）"""
+    serialization, compression = fmt.split('+')
+    if compression == 'zstd':
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    if serialization == 'msgpack':
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def _row(values):
+    row = list(values)
+    # 时间用 Unix 时间戳，msgpack 不支持 datetime
+    row[BUNDLE_FIELDS.index('updated_at')] = int(row[BUNDLE_FIELDS.index('updated_at')].timestamp())
+    return row
+
+
+def build_bundle(device_model, cursor=0, bundle=None):
+    """重新生成一个型号的菜谱包；内容没有变化时不写新文件，只更新游标"""
+    rows = [
+        _row(values) for values in
+        Recipe.objects.filter(status='published', compatible_models=device_model)
+        .order_by('pk').values_list(*BUNDLE_FIELDS)
+    ]
+    fmt = bundle_format()
+    data = encode({
+        'version': BUNDLE_VERSION,
+        'model': device_model.model_identifier,
+        'fields': list(BUNDLE_FIELDS),
+        'recipes': rows,
+    }, fmt)
+    digest = hashlib.sha256(data).hexdigest()
+
+    if bundle is None:
+        bundle = RecipeBundle(device_model=device_model)
+    if bundle.digest != digest or bundle.format != fmt or not bundle.file:
+        name = f'{device_model.model_identifier}{EXTENSIONS[fmt.split("+")[1]]}'
+        bundle.file.save(name, ContentFile(data), save=False)
+        bundle.digest, bundle.format, bundle.size = digest, fmt, len(data)
+        bundle.generated_at = timezone.now()
+        logger.info(f"菜谱包已生成: {device_model.model_identifier}，{len(rows)} 个菜谱，{len(data)} 字节 ({fmt})")
+    bundle.recipe_ids = [row[0] for row in rows]
+    bundle.cursor = cursor
+    bundle.save()
+    return bundle
+
+
+def build_bundles(full=False):
+    """
+    增量生成各型号的菜谱包，返回重新生成的型号标识。没有包、编码格式变了、
+    变更记录已被清理，或上次生成后有变化的菜谱在包中或兼容该型号时重新生成。
+    """
+    head = settled_head()
+    fmt = bundle_format()
+    bundles = {bundle.device_model_id: bundle for bundle in RecipeBundle.objects.all()}
+
+    rebuild, stale = [], []
+    for device_model in DeviceModel.objects.all():
+        bundle = bundles.get(device_model.pk)
+        if full or bundle is None or bundle.format != fmt:
+            rebuild.append((device_model, bundle))
+        elif bundle.cursor < head:
+            stale.append((device_model, bundle))
+
+    if stale:
+        since = min(bundle.cursor for _, bundle in stale)
+        changes = settled_changes().filter(id__gt=since, id__lte=head)
+        change_list = list(changes.values_list('id', 'recipe_id'))
+        linked = defaultdict(set)
+        links = Recipe.compatible_models.through.objects.filter(recipe_id__in=changes.values('recipe_id'))
+        for model_id, recipe_id in links.values_list('devicemodel_id', 'recipe_id'):
+            linked[model_id].add(recipe_id)
+
+        unchanged = []
+        for device_model, bundle in stale:
+            changed = {recipe_id for change_id, recipe_id in change_list if change_id > bundle.cursor}
+            if is_pruned(bundle.cursor) or changed & (set(bundle.recipe_ids) | linked[device_model.pk]):
+                rebuild.append((device_model, bundle))
+            else:
+                unchanged.append(bundle.pk)
+        RecipeBundle.objects.filter(pk__in=unchanged).update(cursor=head)
+
+    for device_model, bundle in rebuild:
+        build_bundle(device_model, head, bundle)
+    return [device_model.model_identifier for device_model, _ in rebuild]
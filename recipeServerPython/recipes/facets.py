@@ -0,0 +1,215 @@
+"""
+菜谱分面检索。
+
+每个 worker 进程在内存中维护一份已发布菜谱的列式索引（numpy 数组）：
+难度、适合人群、总时长区间是每个菜谱一个取值的列，兼容型号和标签是
+(菜谱位置, 取值) 的关联对。筛选条件转成布尔掩码，各分面的计数用一次
+bincount 算出，不需要对每个分面做一次 GROUP BY。某个分面自身的计数不受该分面
+选中值的限制（选了"简单"仍能看到"适中"有多少个），即常见的多选分面语义。
+
+索引版本取自数据库：菜谱变更日志（recipes.sync，菜谱保存、删除、兼容型号变化和批量
+状态转换都会写入）中可以读取的最新ID，加上设备型号的数量和最后修改时间。各进程每隔
+RECIPE_FACET_CHECK_SECONDS 秒查询一次版本，变化时重建索引；不依赖进程间共享的缓存，
+修改最多 RECIPE_SYNC_SETTLE_SECONDS + RECIPE_FACET_CHECK_SECONDS 秒后反映到所有进程。
+同一版本内各筛选状态的分面计数按 LRU 缓存，无筛选的计数在建索引时预先算好。
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .labels import split_labels
+from .models import DeviceModel, Recipe, RecipeTag
+from .sync import settled_head
+
+logger = logging.getLogger(__name__)
+
+# 总时长（分钟）区间：上界（含）和取值
+TIME_BUCKETS = [(15, '0-15'), (30, '15-30'), (60, '30-60'), (120, '60-120'), (None, '120+')]
+TIME_LABELS = {'0-15': '15分钟以内', '15-30': '15-30分钟', '30-60': '30-60分钟',
+               '60-120': '1-2小时', '120+': '2小时以上'}
+
+# 查询参数名，也是响应中 facets 的键
+SINGLE_FACETS = ('difficulty', 'suitable_person', 'time')
+MULTI_FACETS = ('model', 'tag')
+FACETS = SINGLE_FACETS + MULTI_FACETS
+
+_lock = threading.Lock()
+_state = {'index': None, 'checked_at': 0.0}
+
+
+def time_bucket(minutes):
+    for upper, key in TIME_BUCKETS:
+        if upper is None or minutes <= upper:
+            return key
+
+
+def parse_facet_filters(params):
+    """从查询参数中取出分面筛选条件：{分面: 选中值集合}，多个值用逗号分隔"""
+    return {facet: frozenset(split_labels(params[facet])) for facet in FACETS if params.get(facet)}
+
+
+@dataclass
+class FacetResult:
+    ids: np.ndarray
+    facets: dict
+
+
+class FacetIndex:
+    """一个版本的已发布菜谱列式索引，建好后只读，可在线程间共享"""
+
+    def __init__(self, version):
+        self.version = version
+        rows = list(
+            Recipe.objects.filter(status='published')
+            .order_by(*Recipe._meta.ordering, 'pk')
+            .values_list('pk', 'difficulty', 'suitable_person', 'total_minutes')
+        )
+        # 位置顺序即列表接口的默认排序，结果按位置取出就是排好序的
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        position = {pk: i for i, pk in enumerate(self.ids.tolist())}
+
+        self.keys, self.labels, self.columns, self.pairs = {}, {}, {}, {}
+        self._add_column('difficulty', Recipe.DIFFICULTY_CHOICES, [row[1] for row in rows])
+        self._add_column('suitable_person', Recipe.SUITABLE_PERSON_CHOICES, [row[2] for row in rows])
+        self._add_column(
+            'time', [(key, TIME_LABELS[key]) for _, key in TIME_BUCKETS],
+            [time_bucket(row[3]) for row in rows]
+        )
+
+        device_models = list(DeviceModel.objects.values_list('pk', 'model_identifier', 'name'))
+        models = {pk: identifier for pk, identifier, _ in device_models}
+        names = {identifier: name for _, identifier, name in device_models}
+        links = Recipe.compatible_models.through.objects.filter(recipe__status='published')
+        self._add_pairs('model', position, links.values_list('recipe_id', 'devicemodel_id'), models, names)
+
+        tags = dict(RecipeTag.objects.values_list('pk', 'name'))
+        links = Recipe.tag_set.through.objects.filter(recipe__status='published')
+        self._add_pairs('tag', position, links.values_list('recipe_id', 'recipetag_id'), tags)
+
+        self._counts_lock = threading.Lock()
+        self._counts = OrderedDict()
+        self._counts[()] = self._compute_counts({})
+
+    def _add_column(self, facet, choices, values):
+        keys = [str(value) for value, _ in choices]
+        # 不在选项中的取值（旧数据）单独列出
+        keys += sorted({str(v) for v in values} - set(keys))
+        codes = {key: i for i, key in enumerate(keys)}
+        self.keys[facet] = keys
+        self.labels[facet] = {str(value): str(label) for value, label in choices}
+        self.columns[facet] = np.array([codes[str(v)] for v in values], dtype=np.int32)
+
+    def _add_pairs(self, facet, position, links, value_keys, labels=None):
+        keys = sorted(set(value_keys.values()))
+        codes = {key: i for i, key in enumerate(keys)}
+        pairs = [(position[r], codes[value_keys[v]]) for r, v in links if r in position and v in value_keys]
+        self.keys[facet] = keys
+        self.labels[facet] = labels or {key: key for key in keys}
+        array = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        self.pairs[facet] = (array[:, 0], array[:, 1].astype(np.int32))
+
+    def _mask(self, facet, selected):
+        codes = [i for i, key in enumerate(self.keys[facet]) if key in selected]
+        if facet in self.columns:
+            return np.isin(self.columns[facet], codes)
+        positions, values = self.pairs[facet]
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[positions[np.isin(values, codes)]] = True
+        return mask
+
+    def _combine(self, masks, exclude=None):
+        combined = None
+        for facet, mask in masks.items():
+            if facet != exclude:
+                combined = mask if combined is None else combined & mask
+        return combined
+
+    def _compute_counts(self, masks):
+        counts = {}
+        for facet in FACETS:
+            other = self._combine(masks, exclude=facet)
+            size = len(self.keys[facet])
+            if facet in self.columns:
+                column = self.columns[facet]
+                values = column if other is None else column[other]
+            else:
+                positions, values = self.pairs[facet]
+                if other is not None:
+                    values = values[other[positions]]
+            counts[facet] = np.bincount(values, minlength=size).tolist()
+        return counts
+
+    def counts(self, filters, masks):
+        state = tuple(sorted(filters.items()))
+        with self._counts_lock:
+            cached = self._counts.get(state)
+            if cached is not None:
+                self._counts.move_to_end(state)
+                return cached
+        counts = self._compute_counts(masks)
+        with self._counts_lock:
+            self._counts[state] = counts
+            if len(self._counts) > settings.RECIPE_FACET_CACHE_SIZE:
+                # 保留无筛选状态，淘汰最久未用的
+                oldest = next(key for key in self._counts if key != ())
+                del self._counts[oldest]
+        return counts
+
+    def search(self, filters):
+        masks = {facet: self._mask(facet, selected) for facet, selected in filters.items()}
+        matched = self._combine(masks)
+        ids = self.ids if matched is None else self.ids[matched]
+        counts = self.counts(filters, masks)
+
+        facets = {}
+        for facet in FACETS:
+            selected = filters.get(facet, frozenset())
+            options = [
+                {'value': key, 'label': self.labels[facet].get(key, key), 'count': count, 'selected': key in selected}
+                for key, count in zip(self.keys[facet], counts[facet])
+            ]
+            if facet in MULTI_FACETS:
+                # 型号和标签数量不固定：只列出有结果的和已选中的，按数量排序
+                options = [o for o in options if o['count'] or o['selected']]
+                options.sort(key=lambda o: (not o['selected'], -o['count'], o['value']))
+                if facet == 'tag':
+                    options = options[:max(settings.RECIPE_FACET_TAG_LIMIT, len(selected))]
+            facets[facet] = options
+        return FacetResult(ids, facets)
+
+
+def index_version():
+    """当前数据对应的索引版本，两次相同说明索引不需要重建"""
+    device_models = DeviceModel.objects.aggregate(count=Count('pk'), updated=Max('updated_at'))
+    return settled_head(), device_models['count'], device_models['updated']
+
+
+def get_facet_index():
+    now = time.monotonic()
+    index = _state['index']
+    if index is not None and now - _state['checked_at'] < settings.RECIPE_FACET_CHECK_SECONDS:
+        return index
+    with _lock:
+        index = _state['index']
+        if index is not None and now - _state['checked_at'] < settings.RECIPE_FACET_CHECK_SECONDS:
+            return index
+        version = index_version()
+        if index is None or index.version != version:
+            started = time.monotonic()
+            index = FacetIndex(version)
+            logger.info(f"菜谱分面索引已重建: {len(index.ids)} 个菜谱，耗时 {(time.monotonic() - started) * 1000:.1f}ms")
+            _state['index'] = index
+        _state['checked_at'] = now
+        return index
+
+
+def reset_facet_index():
+    """丢弃本进程的分面索引（测试使用）"""
+    with _lock:
+        _state.update(index=None, checked_at=0.0)
@@ -0,0 +1,173 @@
+"""
+食材倒排索引和"用现有食材做菜"查询。
+
+Recipe.staple_food / Recipe.ingredients 是 [{name, value, unit}] 形式的 JSON 列表，
+无法直接检索。菜谱保存时把其中的名称规范化（去空白、括号备注，经 IngredientSynonym
+归并别名）后写入 RecipeIngredient，即 食材 -> 菜谱 的倒排表。
+
+查询时先把用户现有的食材解析成食材ID，按倒排表取出包含其中任一食材的候选菜谱，
+再取这些候选菜谱的全部食材，按覆盖率打分排序，不需要扫描任何 JSON。
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .models import Ingredient, IngredientSynonym, RecipeIngredient
+
+# 计算覆盖率时主料的权重（缺主料比缺辅料更难凑合）
+STAPLE_WEIGHT = 2
+
+_NOTE_RE = re.compile(r'[（(【\[].*?[）)】\]]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_name(name):
+    """统一全半角和大小写，去掉括号中的备注和空白，如 "猪瘦肉（切片）" -> "猪瘦肉" """
+    if not isinstance(name, str):
+        return ''
+    name = unicodedata.normalize('NFKC', name).lower()
+    name = _NOTE_RE.sub('', name)
+    return _SPACE_RE.sub('', name)[:50]
+
+
+def recipe_ingredient_names(recipe):
+    """返回 {规范化名称: 是否主料}；同一食材同时出现在主料和辅料中时按主料计"""
+    names = {}
+    for source, is_staple in ((recipe.staple_food, True), (recipe.ingredients, False)):
+        for item in source if isinstance(source, list) else []:
+            name = normalize_name(item.get('name') if isinstance(item, dict) else item)
+            if name:
+                names[name] = names.get(name, False) or is_staple
+    return names
+
+
+def resolve_ingredients(names, create=False):
+    """规范化名称 -> 食材ID；别名指向对应食材，create 为 True 时创建不认识的名称"""
+    names = {normalize_name(name) for name in names} - {''}
+    if not names:
+        return {}
+    resolved = dict(IngredientSynonym.objects.filter(name__in=names).values_list('name', 'ingredient_id'))
+    unknown = names - resolved.keys()
+    if unknown and create:
+        Ingredient.objects.bulk_create([Ingredient(name=name) for name in unknown], ignore_conflicts=True)
+    if unknown:
+        resolved.update(Ingredient.objects.filter(name__in=unknown).values_list('name', 'pk'))
+    return resolved
+
+
+def index_recipe(recipe, created=False, force=False):
+    """
+    重建一个菜谱的倒排记录。主料和辅料自加载以来没有变化、或新建的菜谱没有食材时
+    不做任何查询；force 为 True 时无条件重建。
+    """
+    fields = ('staple_food', 'ingredients')
+    loaded = getattr(recipe, '_loaded_ingredients', None) or {}
+    deferred = recipe.get_deferred_fields()
+    unchanged = all(f in deferred or (f in loaded and loaded[f] == getattr(recipe, f)) for f in fields)
+    empty = created and not any(getattr(recipe, f) for f in fields)
+    if not force and (unchanged or empty):
+        return
+
+    names = recipe_ingredient_names(recipe)
+    ids = resolve_ingredients(names, create=True)
+    postings = {}
+    for name, is_staple in names.items():
+        ingredient_id = ids[name]
+        # 两个名称归并到同一食材时，任一为主料即为主料
+        postings[ingredient_id] = postings.get(ingredient_id, False) or is_staple
+
+    with transaction.atomic():
+        RecipeIngredient.objects.filter(recipe=recipe).delete()
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id, is_staple=is_staple)
+            for ingredient_id, is_staple in postings.items()
+        ])
+    recipe._loaded_ingredients = {f: getattr(recipe, f) for f in fields}
+
+
+def merge_into(synonym):
+    """
+    新增别名时，把之前以别名为名单独建立的食材并入目标食材，
+    已有的倒排记录随之指向目标食材。
+    """
+    alias = Ingredient.objects.filter(name=synonym.name).exclude(pk=synonym.ingredient_id).first()
+    if alias is None:
+        return
+    with transaction.atomic():
+        # 同一菜谱已经有目标食材时，别名的记录合并（保留主料标记）后删除
+        existing = set(
+            RecipeIngredient.objects.filter(
+                ingredient_id=synonym.ingredient_id,
+                recipe_id__in=RecipeIngredient.objects.filter(ingredient=alias).values('recipe_id'),
+            ).values_list('recipe_id', flat=True)
+        )
+        if existing:
+            staple = RecipeIngredient.objects.filter(ingredient=alias, recipe_id__in=existing, is_staple=True)
+            RecipeIngredient.objects.filter(
+                ingredient_id=synonym.ingredient_id, recipe_id__in=staple.values('recipe_id')
+            ).update(is_staple=True)
+        RecipeIngredient.objects.filter(ingredient=alias).exclude(recipe_id__in=existing).update(
+            ingredient_id=synonym.ingredient_id
+        )
+        alias.delete()
+
+
+@dataclass
+class Match:
+    recipe_id: int
+    score: float
+    matched: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+
+
+def rank_by_coverage(available, recipe_ids=None, max_missing=None):
+    """
+    按现有食材对菜谱排序，返回 (Match 列表, 无法识别的食材名称)。
+
+    覆盖率 = 已有食材权重 / 全部食材权重（主料权重 STAPLE_WEIGHT），
+    覆盖率相同时缺得少的在前。recipe_ids 为候选菜谱的查询集（如已发布、按型号筛选后），
+    max_missing 限制最多缺几种食材。
+    """
+    have = resolve_ingredients(available)
+    unknown = sorted({normalize_name(name) for name in available} - have.keys() - {''})
+    have_ids = set(have.values())
+    if not have_ids:
+        return [], unknown
+
+    # 倒排表：包含任一现有食材的菜谱
+    candidates = RecipeIngredient.objects.filter(ingredient_id__in=have_ids)
+    if recipe_ids is not None:
+        candidates = candidates.filter(recipe_id__in=recipe_ids)
+    postings = RecipeIngredient.objects.filter(
+        recipe_id__in=candidates.values('recipe_id')
+    ).values_list('recipe_id', 'ingredient_id', 'is_staple')
+
+    by_recipe = defaultdict(list)
+    for recipe_id, ingredient_id, is_staple in postings:
+        by_recipe[recipe_id].append((ingredient_id, is_staple))
+
+    matches = []
+    for recipe_id, items in by_recipe.items():
+        total = got = 0
+        matched, missing = [], []
+        for ingredient_id, is_staple in items:
+            weight = STAPLE_WEIGHT if is_staple else 1
+            total += weight
+            if ingredient_id in have_ids:
+                got += weight
+                matched.append(ingredient_id)
+            else:
+                missing.append(ingredient_id)
+        if max_missing is not None and len(missing) > max_missing:
+            continue
+        matches.append(Match(recipe_id, round(got / total, 4), matched, missing))
+
+    matches.sort(key=lambda m: (-m.score, len(m.missing), -len(m.matched), m.recipe_id))
+    return matches, unknown
+
+
+def ingredient_names(ids):
+    return dict(Ingredient.objects.filter(pk__in=ids).values_list('pk', 'name'))
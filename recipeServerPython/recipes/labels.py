@@ -0,0 +1,89 @@
+"""
+菜谱标签和工作模式的规范化存储。
+
+Recipe.tags / Recipe.work_modes 仍是逗号分隔的字符串（接口和后台按原样读写），
+保存时拆分成 RecipeTag / WorkMode 记录并同步到 tag_set / work_mode_set 关联表。
+筛选走关联表上的标签ID索引做精确匹配，不再对字符串做 icontains 扫描
+（"粥" 不会再匹配到 "粥汤"）。
+"""
+import re
+
+from django.db.models import Count
+
+from .models import Recipe, RecipeTag, WorkMode
+
+# 字符串字段 -> (关联字段, 标签模型)
+LABEL_FIELDS = {
+    'tags': ('tag_set', RecipeTag),
+    'work_modes': ('work_mode_set', WorkMode),
+}
+
+_SEPARATOR_RE = re.compile(r'[,，、;；]')
+
+
+def split_labels(value):
+    """拆分逗号分隔的字符串，去掉空白和重复项，保持原有顺序"""
+    names = []
+    for part in _SEPARATOR_RE.split(value or ''):
+        name = part.strip()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_labels(label_model, names, create=False):
+    """返回 {名称: ID}；create 为 True 时先创建不存在的标签"""
+    if not names:
+        return {}
+    if create:
+        label_model.objects.bulk_create([label_model(name=name) for name in names], ignore_conflicts=True)
+    return dict(label_model.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def sync_labels(recipe, created=False, force=False):
+    """
+    把字符串字段同步到规范化关联。字段自加载以来没有变化、或新建的菜谱字段为空时
+    不做任何查询；force 为 True 时无条件重新同步。
+    """
+    loaded = getattr(recipe, '_loaded_labels', None) or {}
+    deferred = recipe.get_deferred_fields()
+    for field, (set_field, label_model) in LABEL_FIELDS.items():
+        if field in deferred:
+            # 未加载的字段不可能被修改
+            continue
+        value = getattr(recipe, field)
+        unchanged = field in loaded and loaded[field] == value
+        if not force and (unchanged or (created and not value)):
+            loaded[field] = value
+            continue
+        ids = resolve_labels(label_model, split_labels(value), create=True)
+        getattr(recipe, set_field).set(ids.values())
+        loaded[field] = value
+    recipe._loaded_labels = loaded
+
+
+def filter_by_labels(queryset, field, names, match_all=False):
+    """
+    按标签精确筛选菜谱。match_all 为 False 时包含任一标签即可，
+    为 True 时必须包含全部标签。names 可以是列表或逗号分隔的字符串。
+    """
+    if isinstance(names, str):
+        names = split_labels(names)
+    names = list(dict.fromkeys(names))
+    if not names:
+        return queryset
+
+    set_field, label_model = LABEL_FIELDS[field]
+    ids = list(resolve_labels(label_model, names).values())
+    if not ids or (match_all and len(ids) < len(names)):
+        return queryset.none()
+
+    m2m = Recipe._meta.get_field(set_field)
+    recipe_column, label_column = m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+    postings = m2m.remote_field.through.objects.filter(**{f'{label_column}__in': ids})
+    if match_all and len(ids) > 1:
+        postings = (
+            postings.order_by().values(recipe_column)
+            .annotate(matched=Count(label_column)).filter(matched=len(ids))
+        )
+    return queryset.filter(pk__in=postings.values(recipe_column))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ingredients import index_recipe
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = '为所有菜谱重建食材倒排索引（新增别名、调整规范化规则后运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批读取的菜谱数')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only('pk', 'staple_food', 'ingredients').order_by('pk')
+        count = 0
+        for recipe in recipes.iterator(chunk_size=options['batch_size']):
+            index_recipe(recipe, force=True)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'食材倒排索引重建完成，共 {count} 个菜谱'))
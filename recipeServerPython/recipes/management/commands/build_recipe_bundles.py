@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.bundles import build_bundles, bundle_format
+
+
+class Command(BaseCommand):
+    help = '增量生成各设备型号的离线菜谱包，只重新生成有变化的型号（可由 cron 每分钟执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='重新生成所有型号的菜谱包')
+
+    def handle(self, *args, **options):
+        rebuilt = build_bundles(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'已重新生成 {len(rebuilt)} 个型号的菜谱包（{bundle_format()}）' + (f': {", ".join(rebuilt)}' if rebuilt else '')
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.sync import prune_changes
+
+
+class Command(BaseCommand):
+    help = '分批清理超过保留期的菜谱变更记录（可由 cron 定期执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='保留天数，默认为 RECIPE_SYNC_RETENTION_DAYS')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的记录数')
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已清理 {deleted} 条菜谱变更记录'))
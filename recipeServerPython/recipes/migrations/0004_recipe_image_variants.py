@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_remove_recipe_instructions_recipe_collection_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='由 recipe_server.images 在后台生成', verbose_name='图片尺寸版本'),
+        ),
+    ]
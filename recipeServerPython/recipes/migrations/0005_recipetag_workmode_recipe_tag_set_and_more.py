@@ -0,0 +1,93 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:45
+
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def _split(value):
+    names = []
+    for part in re.split(r'[,，、;；]', value or ''):
+        name = part.strip()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def split_existing_labels(apps, schema_editor):
+    """把已有菜谱的逗号分隔字符串批量拆分写入规范化关联表"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for field, set_field, model_name in (('tags', 'tag_set', 'RecipeTag'), ('work_modes', 'work_mode_set', 'WorkMode')):
+        label_model = apps.get_model('recipes', model_name)
+        m2m = Recipe._meta.get_field(set_field)
+        through = m2m.remote_field.through
+        recipe_column, label_column = m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+
+        rows = Recipe.objects.exclude(**{field: ''}).values_list('pk', field).order_by('pk')
+        pending = []
+        for pk, value in rows.iterator(chunk_size=BATCH_SIZE):
+            pending.append((pk, _split(value)))
+            if len(pending) >= BATCH_SIZE:
+                _write(label_model, through, recipe_column, label_column, pending)
+                pending = []
+        if pending:
+            _write(label_model, through, recipe_column, label_column, pending)
+
+
+def _write(label_model, through, recipe_column, label_column, rows):
+    names = {name for _, labels in rows for name in labels}
+    label_model.objects.bulk_create([label_model(name=name) for name in names], ignore_conflicts=True)
+    ids = dict(label_model.objects.filter(name__in=names).values_list('name', 'pk'))
+    through.objects.bulk_create(
+        [through(**{f'{recipe_column}_id': pk, f'{label_column}_id': ids[name]}) for pk, labels in rows for name in labels],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='名称')),
+            ],
+            options={
+                'verbose_name': '菜谱标签',
+                'verbose_name_plural': '菜谱标签',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkMode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='名称')),
+            ],
+            options={
+                'verbose_name': '工作模式',
+                'verbose_name_plural': '工作模式',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='recipes', to='recipes.recipetag', verbose_name='标签（规范化）'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='work_mode_set',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='recipes', to='recipes.workmode', verbose_name='工作模式（规范化）'),
+        ),
+        migrations.RunPython(split_existing_labels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:51
+
+from django.db import migrations, models
+from django.db.models import F, Max, Min
+
+BATCH_SIZE = 5000
+
+
+def backfill_total_minutes(apps, schema_editor):
+    """按主键区间分批计算，每批单独提交，不长时间锁住整张表"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    bounds = Recipe.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    total = (F('prep_time_hours') + F('cook_time_hours')) * 60 + F('prep_time_minutes') + F('cook_time_minutes')
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        Recipe.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(total_minutes=total)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0006_ingredient_ingredientsynonym_recipeingredient_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='total_minutes',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, help_text='准备时间与烹饪时间之和，保存时自动计算', verbose_name='总时长(分钟)'),
+        ),
+        migrations.RunPython(backfill_total_minutes, migrations.RunPython.noop),
+    ]
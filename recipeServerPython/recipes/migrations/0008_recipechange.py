@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_total_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='菜谱ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='记录时间')),
+            ],
+            options={
+                'verbose_name': '菜谱变更记录',
+                'verbose_name_plural': '菜谱变更记录',
+                'ordering': ['id'],
+            },
+        ),
+    ]
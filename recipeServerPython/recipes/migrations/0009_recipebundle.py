@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 19:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='recipe_bundles/', verbose_name='文件')),
+                ('digest', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('format', models.CharField(max_length=20, verbose_name='格式')),
+                ('size', models.PositiveIntegerField(verbose_name='大小(字节)')),
+                ('recipe_ids', models.JSONField(default=list, verbose_name='包含的菜谱ID')),
+                ('cursor', models.BigIntegerField(default=0, verbose_name='变更游标')),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='生成时间')),
+                ('device_model', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bundle', to='recipes.devicemodel', verbose_name='设备型号')),
+            ],
+            options={
+                'verbose_name': '菜谱包',
+                'verbose_name_plural': '菜谱包',
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 import logging
@@ -48,6 +49,65 @@ class DeviceModel(models.Model):
     def __str__(self):
         return self.name
 
+class RecipeLabel(models.Model):
+    """由 Recipe 的逗号分隔字段拆分出的规范化标签，按名称精确匹配"""
+    name = models.CharField(_("名称"), max_length=50, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeTag(RecipeLabel):
+
+    class Meta(RecipeLabel.Meta):
+        verbose_name = _("菜谱标签")
+        verbose_name_plural = _("菜谱标签")
+
+
+class WorkMode(RecipeLabel):
+
+    class Meta(RecipeLabel.Meta):
+        verbose_name = _("工作模式")
+        verbose_name_plural = _("工作模式")
+
+
+class Ingredient(models.Model):
+    """规范化的食材名称，菜谱主料/辅料中的名称经同义词归并后指向这里"""
+    name = models.CharField(_("名称"), max_length=50, unique=True)
+
+    class Meta:
+        verbose_name = _("食材")
+        verbose_name_plural = _("食材")
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class IngredientSynonym(models.Model):
+    """食材别名，如 瘦肉 -> 猪瘦肉"""
+    name = models.CharField(_("别名"), max_length=50, unique=True)
+    ingredient = models.ForeignKey(
+        Ingredient, verbose_name=_("食材"), on_delete=models.CASCADE, related_name='synonyms'
+    )
+
+    class Meta:
+        verbose_name = _("食材别名")
+        verbose_name_plural = _("食材别名")
+        ordering = ['name']
+
+    def __str__(self):
+        return f'{self.name} -> {self.ingredient.name}'
+
+
+# 决定 Recipe.total_minutes 的字段
+TIME_FIELDS = frozenset({'prep_time_hours', 'prep_time_minutes', 'cook_time_hours', 'cook_time_minutes'})
+
+
 class Recipe(models.Model):
     STATUS_CHOICES = [
         ('draft', '草稿'),
@@ -76,6 +136,13 @@ class Recipe(models.Model):
         blank=True,
         null=True
     )
+    image_variants = models.JSONField(
+        _("图片尺寸版本"),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("由 recipe_server.images 在后台生成")
+    )
     
     # 评分和统计
     score = models.IntegerField(_("评分"), default=0, blank=True)
@@ -88,12 +155,26 @@ class Recipe(models.Model):
     tips = models.TextField(_("小贴士"), blank=True)
     tags = models.CharField(_("标签"), max_length=200, blank=True, help_text=_("用逗号分隔，如：早餐,猪肉,粥汤"))
     work_modes = models.CharField(_("工作模式"), max_length=200, blank=True, help_text=_("用逗号分隔，如：微波,烧烤"))
+    # 上面两个字段拆分后的规范化关联，保存时由 recipes.labels 同步，供精确筛选使用
+    tag_set = models.ManyToManyField(
+        RecipeTag, verbose_name=_("标签（规范化）"), blank=True, editable=False, related_name='recipes'
+    )
+    work_mode_set = models.ManyToManyField(
+        WorkMode, verbose_name=_("工作模式（规范化）"), blank=True, editable=False, related_name='recipes'
+    )
     
     # 烹饪时间
     prep_time_hours = models.PositiveIntegerField(_("准备时间(小时)"), default=0)
     prep_time_minutes = models.PositiveIntegerField(_("准备时间(分钟)"), default=0)
     cook_time_hours = models.PositiveIntegerField(_("烹饪时间(小时)"), default=0)
     cook_time_minutes = models.PositiveIntegerField(_("烹饪时间(分钟)"), default=0)
+    total_minutes = models.PositiveIntegerField(
+        _("总时长(分钟)"),
+        default=0,
+        db_index=True,
+        editable=False,
+        help_text=_("准备时间与烹饪时间之和，保存时自动计算")
+    )
     
     # 温度设置
     temperature_value = models.PositiveIntegerField(_("温度值"), blank=True, null=True)
@@ -156,6 +237,16 @@ class Recipe(models.Model):
         null=True
     )
 
+    # 状态机：当前状态 -> 允许转换到的状态
+    STATUS_TRANSITIONS = {
+        'draft': ('pending',),
+        'pending': ('published', 'rejected'),
+        'published': ('rejected',),
+        'rejected': ('pending',),
+    }
+    # 新建或未从数据库加载的实例没有原状态，不做转换校验
+    _loaded_status = None
+
     class Meta:
         verbose_name = _("菜谱")
         verbose_name_plural = _("菜谱")
@@ -164,29 +255,110 @@ class Recipe(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录从数据库读出时的状态，clean() 据此判断状态转换，不必重新查询
+        instance._loaded_status = instance.__dict__.get('status')
+        # 标签字符串没有变化时保存不必重新同步规范化关联
+        instance._loaded_labels = {f: instance.__dict__.get(f) for f in ('tags', 'work_modes')}
+        instance._loaded_ingredients = {f: instance.__dict__.get(f) for f in ('staple_food', 'ingredients')}
+        return instance
+
+    @classmethod
+    def allowed_sources(cls, target):
+        """可以转换到 target 的状态"""
+        return [source for source, targets in cls.STATUS_TRANSITIONS.items() if target in targets]
+
+    def can_transition(self, target):
+        current = self.status if self._loaded_status is None else self._loaded_status
+        return target in self.STATUS_TRANSITIONS.get(current, ())
+
+    def transition_to(self, target, review_comment=None):
+        """校验后修改状态（不保存）；非法转换抛出 ValidationError"""
+        self.status = target
+        if review_comment is not None:
+            self.review_comment = review_comment
+        self.clean()
+
     def clean(self):
-        """验证状态转换是否合法"""
-        if self.pk:  # 只在更新时检查
-            try:
-                old_instance = Recipe.objects.get(pk=self.pk)
-                if old_instance.status != self.status:
-                    logger.info(f"Recipe {self.pk} status transition: {old_instance.status} -> {self.status}")
-                    
-                    # 检查状态转换是否合法
-                    valid_transitions = {
-                        'draft': ['pending'],
-                        'pending': ['published', 'rejected'],
-                        'published': ['rejected'],
-                        'rejected': ['pending']
-                    }
-                    
-                    if self.status not in valid_transitions.get(old_instance.status, []):
-                        raise ValidationError({
-                            'status': f'不能从 {old_instance.get_status_display()} 转换为 {self.get_status_display()}'
-                        })
-            except Recipe.DoesNotExist:
-                pass
-    
+        """验证状态转换是否合法，原状态取自加载时记录的 _loaded_status，不回表查询"""
+        old_status = self._loaded_status
+        # 新建的实例，或 status 没有加载（也就不可能被修改）的实例不需要校验
+        if old_status is None or old_status == self.status:
+            return
+        if self.status not in self.STATUS_TRANSITIONS.get(old_status, ()):
+            raise ValidationError({
+                'status': f'不能从 {dict(self.STATUS_CHOICES).get(old_status, old_status)} 转换为 {self.get_status_display()}'
+            })
+        logger.info(f"Recipe {self.pk} status transition: {old_status} -> {self.status}")
+
+    def compute_total_minutes(self):
+        return (self.prep_time_hours + self.cook_time_hours) * 60 + self.prep_time_minutes + self.cook_time_minutes
+
     def save(self, *args, **kwargs):
         self.clean()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.total_minutes = self.compute_total_minutes()
+        elif TIME_FIELDS.intersection(update_fields):
+            self.total_minutes = self.compute_total_minutes()
+            kwargs['update_fields'] = {*update_fields, 'total_minutes'}
         super().save(*args, **kwargs)
+        # status 被延迟加载时不为它回表，下次保存同样跳过校验
+        self._loaded_status = self.__dict__.get('status')
+
+
+class RecipeIngredient(models.Model):
+    """食材倒排索引：食材 -> 使用它的菜谱，由 recipes.ingredients 在菜谱保存时维护"""
+    ingredient = models.ForeignKey(Ingredient, verbose_name=_("食材"), on_delete=models.CASCADE, related_name='postings')
+    recipe = models.ForeignKey(Recipe, verbose_name=_("菜谱"), on_delete=models.CASCADE, related_name='ingredient_postings')
+    is_staple = models.BooleanField(_("主料"), default=False)
+
+    class Meta:
+        verbose_name = _("菜谱食材索引")
+        verbose_name_plural = _("菜谱食材索引")
+        # (ingredient, recipe) 唯一索引即按食材查菜谱的倒排表；recipe 外键索引用于按菜谱重建
+        constraints = [
+            models.UniqueConstraint(fields=['ingredient', 'recipe'], name='unique_recipe_ingredient'),
+        ]
+
+
+class RecipeChange(models.Model):
+    """
+    菜谱变更日志，供设备增量同步（recipes.sync）。只记录哪个菜谱变了，
+    同步时再按菜谱的当前状态决定下发还是删除；自增 id 即同步游标。
+    """
+    # 不用外键：菜谱删除后仍要保留记录
+    recipe_id = models.BigIntegerField(_("菜谱ID"))
+    created_at = models.DateTimeField(_("记录时间"), default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("菜谱变更记录")
+        verbose_name_plural = _("菜谱变更记录")
+        ordering = ['id']
+
+
+class RecipeBundle(models.Model):
+    """
+    某个型号的离线菜谱包（见 recipes.bundles）。文件存放在内容寻址存储中，
+    内容不变文件名就不变，可按不可变的静态文件缓存。
+    """
+    device_model = models.OneToOneField(
+        DeviceModel, verbose_name=_("设备型号"), on_delete=models.CASCADE, related_name='bundle'
+    )
+    file = models.FileField(_("文件"), upload_to='recipe_bundles/')
+    digest = models.CharField(_("SHA-256"), max_length=64)
+    format = models.CharField(_("格式"), max_length=20)
+    size = models.PositiveIntegerField(_("大小(字节)"))
+    recipe_ids = models.JSONField(_("包含的菜谱ID"), default=list)
+    # 已处理到的 RecipeChange ID，增量生成时只检查此后的变更
+    cursor = models.BigIntegerField(_("变更游标"), default=0)
+    generated_at = models.DateTimeField(_("生成时间"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("菜谱包")
+        verbose_name_plural = _("菜谱包")
+
+    def __str__(self):
+        return f'{self.device_model.model_identifier} ({self.digest[:12]})'
@@ -0,0 +1,6 @@
+from .models import Recipe
+
+
+def recipe_list_queryset():
+    """菜谱列表通用查询集：作者走 JOIN，兼容型号预取"""
+    return Recipe.objects.select_related('author').prefetch_related('compatible_models')
@@ -0,0 +1,77 @@
+from rest_framework import serializers
+
+from recipe_server.images import ProcessedImageField, variant_map
+from recipe_server.timing import TimedSerializerMixin
+from .labels import split_labels
+from .models import DeviceModel, Recipe
+from .workflow import MAX_TRANSITION_BATCH
+
+
+class DeviceModelBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeviceModel
+        fields = ['id', 'model_identifier', 'name']
+
+
+class RecipeListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """菜谱列表序列化器"""
+    author = serializers.CharField(source='author.username', read_only=True, default=None)
+    tags = serializers.SerializerMethodField()
+    work_modes = serializers.SerializerMethodField()
+    image = ProcessedImageField('image_variants', read_only=True)
+    image_variants = serializers.SerializerMethodField()
+    compatible_models = DeviceModelBriefSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'id', 'title', 'description', 'image', 'image_variants', 'score', 'collection_count', 'page_view',
+            'difficulty', 'suitable_person', 'tags', 'work_modes',
+            'prep_time_hours', 'prep_time_minutes', 'cook_time_hours', 'cook_time_minutes', 'total_minutes',
+            'author', 'compatible_models', 'status', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_tags(self, obj):
+        # 直接拆分字符串字段，保持录入顺序，不需要查询关联表
+        return split_labels(obj.tags)
+
+    def get_work_modes(self, obj):
+        return split_labels(obj.work_modes)
+
+    def get_image_variants(self, obj):
+        return variant_map(obj.image_variants, self.context.get('request'))
+
+
+class RecipeSerializer(RecipeListSerializer):
+    """菜谱详情序列化器"""
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + [
+            'tips', 'temperature_value', 'temperature_unit', 'servings',
+            'staple_food', 'ingredients', 'steps', 'order', 'comal_position',
+        ]
+        read_only_fields = fields
+
+
+class CookWithQuerySerializer(serializers.Serializer):
+    """用现有食材找菜谱的查询参数"""
+    have = serializers.CharField(max_length=1000)
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class RecipeSyncQuerySerializer(serializers.Serializer):
+    """增量同步的查询参数"""
+    model = serializers.CharField(max_length=100)
+    since = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
+class RecipeTransitionSerializer(serializers.Serializer):
+    """批量转换菜谱状态请求序列化器"""
+    status = serializers.ChoiceField(choices=Recipe.STATUS_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_TRANSITION_BATCH
+    )
+    review_comment = serializers.CharField(required=False, allow_blank=True)
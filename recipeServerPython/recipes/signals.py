@@ -0,0 +1,64 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from recipe_server.images import register_image_field
+
+from .ingredients import index_recipe, merge_into, normalize_name
+from .labels import sync_labels
+from .models import Ingredient, IngredientSynonym, Recipe
+from .sync import UNSYNCED_FIELDS, record_changes
+
+
+@receiver(post_save, sender=Recipe)
+def sync_recipe_labels(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    sync_labels(instance, created=created)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_ingredients(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    index_recipe(instance, created=created)
+
+
+@receiver(pre_save, sender=Ingredient)
+@receiver(pre_save, sender=IngredientSynonym)
+def normalize_ingredient_name(sender, instance, **kwargs):
+    instance.name = normalize_name(instance.name)
+
+
+@receiver(post_save, sender=IngredientSynonym)
+def merge_synonym(sender, instance, raw=False, **kwargs):
+    if not raw:
+        merge_into(instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def record_recipe_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and UNSYNCED_FIELDS.issuperset(update_fields)):
+        return
+    record_changes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.compatible_models.through)
+def record_compatibility_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record_changes([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # 从型号一侧修改时 pk_set 是菜谱ID
+        record_changes(pk_set)
+    elif action == 'pre_clear':
+        # clear 之后就查不到原来兼容的菜谱了，在 clear 之前记录（同一事务）
+        record_changes(instance.recipes.values_list('pk', flat=True))
+
+
+def _record_image_change(instance):
+    # 后台任务去掉元数据后原图地址和尺寸版本都变了，通知同步客户端
+    record_changes([instance.pk])
+
+
+register_image_field(Recipe, 'image', 'image_variants', on_saved=_record_image_change)
@@ -0,0 +1,136 @@
+"""
+设备和 App 的菜谱增量同步。
+
+菜谱新建、修改、上下线、删除以及兼容型号变化时，在同一事务内向 RecipeChange 写一条
+记录（见 recipes.signals 和 recipes.workflow）。客户端带着上次拿到的游标请求，服务端
+取出游标之后的变更记录，按菜谱当前的状态分成两类返回：仍然发布且兼容该型号的菜谱在
+updated 中下发完整内容，其余（下线、删除、不再兼容）的ID放在 deleted 中。
+
+游标对客户端是不透明的字符串：
+- "<变更ID>"：增量同步到的位置
+- "<变更ID>:<菜谱ID>"：全量快照进行到的位置，快照完成后变为 "<变更ID>"
+
+没有游标，或游标之前的变更记录已被清理时返回全量快照（reset 为 true，客户端应先清空
+本地数据）。快照开始时先取定变更位置，快照期间的修改之后会再以增量下发一次，
+重复下发是幂等的。
+
+变更ID在插入时分配、按提交顺序可见，长事务中较小的ID可能晚于较大的ID提交。
+同步只读取 RECIPE_SYNC_SETTLE_SECONDS 秒之前的记录，避免游标越过尚未提交的变更。
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import RecipeChange
+from .queries import recipe_list_queryset
+
+logger = logging.getLogger(__name__)
+
+# 只更新这些统计字段时不需要通知客户端
+UNSYNCED_FIELDS = frozenset({'page_view', 'collection_count', 'score'})
+
+
+def record_changes(recipe_ids):
+    """记录一批菜谱发生了变化；在修改菜谱的同一事务中调用"""
+    recipe_ids = sorted(set(recipe_ids))
+    if recipe_ids:
+        RecipeChange.objects.bulk_create([RecipeChange(recipe_id=pk) for pk in recipe_ids])
+
+
+def prune_changes(days=None, batch_size=1000):
+    """分批删除超过保留期的变更记录，最新的一条始终保留，返回删除条数"""
+    if days is None:
+        days = settings.RECIPE_SYNC_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    # 保留最新一条，用来判断客户端游标之前的记录是否已被清理
+    latest = RecipeChange.objects.order_by('-id').values_list('id', flat=True).first()
+    total = 0
+    while latest is not None:
+        ids = list(
+            RecipeChange.objects.filter(created_at__lt=cutoff, id__lt=latest)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        total += RecipeChange.objects.filter(id__in=ids).delete()[0]
+    if total:
+        logger.info(f"已清理 {total} 条菜谱变更记录")
+    return total
+
+
+def parse_cursor(value):
+    """解析游标，返回 (变更ID, 快照进行到的菜谱ID)；增量游标的后者为 None，格式错误抛出 ValueError"""
+    head, sep, after = value.partition(':')
+    if not head.isdigit() or (sep and not after.isdigit()):
+        raise ValueError(f'无效的同步游标: {value}')
+    return int(head), int(after) if sep else None
+
+
+def settled_changes():
+    """可以读取的变更记录：早于 RECIPE_SYNC_SETTLE_SECONDS 秒写入的"""
+    return RecipeChange.objects.filter(
+        created_at__lte=timezone.now() - timedelta(seconds=settings.RECIPE_SYNC_SETTLE_SECONDS)
+    )
+
+
+def settled_head():
+    """可以读取的最新变更ID，没有记录时为 0"""
+    return settled_changes().order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def is_pruned(since):
+    """since 之后的变更记录是否有一部分已被清理"""
+    oldest = RecipeChange.objects.order_by('id').values_list('id', flat=True).first()
+    return oldest is not None and since < oldest - 1
+
+
+@dataclass
+class SyncPage:
+    cursor: str
+    has_more: bool = False
+    reset: bool = False
+    recipes: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+
+
+def _compatible(device_model):
+    return recipe_list_queryset().filter(status='published', compatible_models=device_model)
+
+
+def _snapshot(device_model, head, after, page_size):
+    recipes = list(_compatible(device_model).filter(pk__gt=after).order_by('pk')[:page_size + 1])
+    has_more = len(recipes) > page_size
+    recipes = recipes[:page_size]
+    cursor = f'{head}:{recipes[-1].pk}' if has_more else str(head)
+    return SyncPage(cursor, has_more=has_more, reset=not after, recipes=recipes)
+
+
+def sync_page(device_model, cursor=None, page_size=None):
+    """返回某个型号从 cursor 开始的一页同步数据（SyncPage），cursor 无效时抛出 ValueError"""
+    page_size = page_size or settings.RECIPE_SYNC_PAGE_SIZE
+    if not cursor:
+        return _snapshot(device_model, settled_head(), 0, page_size)
+
+    since, after = parse_cursor(cursor)
+    if after is not None:
+        return _snapshot(device_model, since, after, page_size)
+
+    if is_pruned(since):
+        logger.info(f"同步游标 {since} 之后的变更记录已被清理，改为全量同步")
+        return _snapshot(device_model, settled_head(), 0, page_size)
+
+    changes = list(
+        settled_changes().filter(id__gt=since).order_by('id').values_list('id', 'recipe_id')[:page_size + 1]
+    )
+    has_more = len(changes) > page_size
+    changes = changes[:page_size]
+    if not changes:
+        return SyncPage(str(since))
+
+    recipe_ids = {recipe_id for _, recipe_id in changes}
+    recipes = list(_compatible(device_model).filter(pk__in=recipe_ids).order_by('pk'))
+    deleted = sorted(recipe_ids - {recipe.pk for recipe in recipes})
+    return SyncPage(str(changes[-1][0]), has_more=has_more, recipes=recipes, deleted=deleted)
@@ -1,6 +1,26 @@
-from django.test import TestCase
+import importlib
+import shutil
+import tempfile
+
+from django.apps import apps as django_apps
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from .models import Recipe, DeviceModel
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .bundles import BUNDLE_FIELDS, build_bundles, decode
+from .facets import reset_facet_index
+from .ingredients import normalize_name
+from .labels import split_labels
+from .models import (
+    DeviceModel, Ingredient, IngredientSynonym, Recipe, RecipeBundle, RecipeChange, RecipeIngredient
+)
+from .sync import prune_changes, record_changes
+from .workflow import bulk_transition
 
 # Create your tests here.
 
@@ -16,7 +36,7 @@ class RecipeModelTests(TestCase):
         """ Test creating a recipe instance """
         recipe = Recipe.objects.create(
             title="Test Recipe",
-            instructions="Test instructions.",
+            steps=[{'stepNo': 1, 'stepDescription': 'Test step.'}],
             author=self.user
         )
         self.assertEqual(recipe.title, "Test Recipe")
@@ -25,7 +45,7 @@ class RecipeModelTests(TestCase):
 
     def test_recipe_device_model_relation(self):
         """ Test ManyToMany relationship between Recipe and DeviceModel """
-        recipe = Recipe.objects.create(title="Relation Test", instructions="...")
+        recipe = Recipe.objects.create(title="Relation Test", steps=[])
         recipe.compatible_models.add(self.model1, self.model2)
 
         self.assertEqual(recipe.compatible_models.count(), 2)
@@ -50,3 +70,470 @@ class DeviceModelTests(TestCase):
         self.assertIsNotNone(model.created_at)
 
     # Add more tests for constraints, default values etc.
+
+
+class RecipeLabelTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='cook', password='password')
+        cls.model_x = DeviceModel.objects.create(model_identifier='ModelX', name='Test Model X')
+
+        def make(title, tags, work_modes='', status='published'):
+            return Recipe.objects.create(title=title, tags=tags, work_modes=work_modes, author=cls.author, status=status)
+
+        cls.porridge = make('皮蛋瘦肉粥', '早餐, 粥', '煮粥')
+        cls.soup = make('排骨汤', '粥汤,午餐', '炖汤，微波')
+        cls.breakfast = make('烤面包', '早餐', '烧烤、微波')
+        cls.draft = make('草稿', '早餐', status='draft')
+        cls.breakfast.compatible_models.add(cls.model_x)
+        cls.url = reverse('api_v1:recipe-list')
+
+    def _titles(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {r['title'] for r in response.data['results']}
+
+    def test_labels_normalized_on_save(self):
+        self.assertEqual(split_labels('早餐, 粥，早餐、 '), ['早餐', '粥'])
+        self.assertEqual(set(self.soup.tag_set.values_list('name', flat=True)), {'粥汤', '午餐'})
+        self.assertEqual(set(self.soup.work_mode_set.values_list('name', flat=True)), {'炖汤', '微波'})
+
+        recipe = Recipe.objects.get(pk=self.soup.pk)
+        recipe.title = '排骨汤2'
+        with self.assertNumQueries(2):
+            recipe.save()  # 标签未变化，不再同步关联（UPDATE + 同步变更记录）
+        recipe.tags = '晚餐'
+        recipe.save()
+        self.assertEqual(list(recipe.tag_set.values_list('name', flat=True)), ['晚餐'])
+
+    def test_exact_any_and_all_matching(self):
+        # "粥" 不再匹配 "粥汤"
+        self.assertEqual(self._titles(tags_any='粥'), {'皮蛋瘦肉粥'})
+        self.assertEqual(self._titles(tags_any='粥,午餐'), {'皮蛋瘦肉粥', '排骨汤'})
+        self.assertEqual(self._titles(tags_all='早餐,粥'), {'皮蛋瘦肉粥'})
+        self.assertEqual(self._titles(tags_all='早餐,不存在'), set())
+        self.assertEqual(self._titles(work_modes_all='微波,烧烤'), {'烤面包'})
+        self.assertEqual(self._titles(tags_any='早餐', work_modes_any='微波'), {'烤面包'})
+        self.assertEqual(self._titles(tags_any='早餐', model='ModelX'), {'烤面包'})
+
+    def test_detail_returns_label_lists(self):
+        response = self.client.get(reverse('api_v1:recipe-detail', kwargs={'pk': self.soup.pk}))
+        self.assertEqual(response.data['tags'], ['粥汤', '午餐'])
+        self.assertEqual(response.data['work_modes'], ['炖汤', '微波'])
+        response = self.client.get(reverse('api_v1:recipe-detail', kwargs={'pk': self.draft.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_existing_strings_split_by_migration(self):
+        migration = importlib.import_module('recipes.migrations.0005_recipetag_workmode_recipe_tag_set_and_more')
+        Recipe.tag_set.through.objects.all().delete()
+        Recipe.work_mode_set.through.objects.all().delete()
+        migration.split_existing_labels(django_apps, None)
+        self.assertEqual(self._titles(tags_all='粥汤,午餐'), {'排骨汤'})
+        self.assertEqual(self._titles(work_modes_any='烧烤'), {'烤面包'})
+
+
+class IngredientIndexTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='cook', password='password')
+
+        def make(title, staple, ingredients, status='published'):
+            return Recipe.objects.create(
+                title=title, author=cls.author, status=status,
+                staple_food=[{'name': n, 'value': 1, 'unit': 'g'} for n in staple],
+                ingredients=[{'name': n, 'value': 1, 'unit': 'g'} for n in ingredients],
+            )
+
+        cls.porridge = make('瘦肉粥', ['猪瘦肉', '大米'], ['姜', '盐'])
+        cls.rice = make('白米饭', ['大米'], [])
+        cls.stew = make('红烧肉', ['五花肉'], ['姜（切片）', '冰糖', '生抽'])
+        cls.draft = make('草稿', ['大米'], [], status='draft')
+        cls.url = reverse('api_v1:recipe-cook-with')
+
+    def test_postings_maintained_on_save(self):
+        self.assertEqual(normalize_name(' 姜 （切片）'), '姜')
+        ginger = Ingredient.objects.get(name='姜')
+        self.assertEqual(
+            set(RecipeIngredient.objects.filter(ingredient=ginger).values_list('recipe_id', flat=True)),
+            {self.porridge.pk, self.stew.pk}
+        )
+        recipe = Recipe.objects.get(pk=self.rice.pk)
+        recipe.page_view = 10
+        with self.assertNumQueries(2):
+            recipe.save()  # 食材未变化，不重建索引（UPDATE + 同步变更记录）
+        recipe.ingredients = [{'name': '葱', 'value': 1, 'unit': '根'}]
+        recipe.save()
+        self.assertEqual(
+            sorted(recipe.ingredient_postings.values_list('ingredient__name', 'is_staple')),
+            [('大米', True), ('葱', False)]
+        )
+
+    def test_ranked_by_coverage(self):
+        response = self.client.get(self.url, {'have': '大米,猪瘦肉,姜,盐'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['title'] for r in results], ['瘦肉粥', '白米饭', '红烧肉'])
+        self.assertEqual(results[0]['match']['score'], 1.0)
+        self.assertEqual(results[2]['match']['matched'], ['姜'])
+        self.assertEqual(sorted(results[2]['match']['missing']), ['五花肉', '冰糖', '生抽'])
+
+        response = self.client.get(self.url, {'have': '大米,姜', 'max_missing': 1})
+        self.assertEqual([r['title'] for r in response.data['results']], ['白米饭'])
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_synonyms_resolve_and_merge(self):
+        pork = Ingredient.objects.get(name='猪瘦肉')
+        rice = Ingredient.objects.get(name='大米')
+        IngredientSynonym.objects.create(name='瘦肉', ingredient=pork)
+        response = self.client.get(self.url, {'have': '瘦肉, 米饭'})
+        self.assertEqual(response.data['unknown_ingredients'], ['米饭'])
+        self.assertEqual([r['title'] for r in response.data['results']], ['瘦肉粥'])
+
+        # 以别名为名建立过的食材在新增别名后并入目标食材
+        Recipe.objects.create(title='米饭', status='published', staple_food=[{'name': '米', 'value': 1, 'unit': 'g'}])
+        IngredientSynonym.objects.create(name='米', ingredient=rice)
+        self.assertFalse(Ingredient.objects.filter(name='米').exists())
+        response = self.client.get(self.url, {'have': '大米'})
+        self.assertIn('米饭', [r['title'] for r in response.data['results']])
+
+
+@override_settings(RECIPE_FACET_CHECK_SECONDS=0, RECIPE_SYNC_SETTLE_SECONDS=0)
+class FacetSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.model_x = DeviceModel.objects.create(model_identifier='ModelX', name='Test Model X')
+        cls.model_y = DeviceModel.objects.create(model_identifier='ModelY', name='Test Model Y')
+
+        def make(title, difficulty, minutes, tags, models, status='published'):
+            recipe = Recipe.objects.create(
+                title=title, difficulty=difficulty, cook_time_minutes=minutes, tags=tags, status=status
+            )
+            recipe.compatible_models.set(models)
+            return recipe
+
+        make('粥', 1, 10, '早餐,粥汤', [cls.model_x])
+        make('汤', 2, 45, '粥汤', [cls.model_x, cls.model_y])
+        make('饼', 1, 25, '早餐', [cls.model_y])
+        make('草稿', 1, 5, '早餐', [cls.model_x], status='draft')
+        cls.url = reverse('api_v1:recipe-search')
+
+    def setUp(self):
+        reset_facet_index()
+
+    def _counts(self, facets, name):
+        return {o['value']: o['count'] for o in facets[name]}
+
+    def test_unfiltered_counts(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 3)
+        facets = response.data['facets']
+        self.assertEqual(self._counts(facets, 'difficulty'), {'1': 2, '2': 1, '3': 0})
+        self.assertEqual(self._counts(facets, 'time'), {'0-15': 1, '15-30': 1, '30-60': 1, '60-120': 0, '120+': 0})
+        self.assertEqual(self._counts(facets, 'model'), {'ModelX': 2, 'ModelY': 2})
+        self.assertEqual(facets['tag'][0], {'value': '早餐', 'label': '早餐', 'count': 2, 'selected': False})
+
+    def test_filters_and_disjunctive_counts(self):
+        response = self.client.get(self.url, {'difficulty': '1', 'model': 'ModelX'})
+        self.assertEqual([r['title'] for r in response.data['results']], ['粥'])
+        facets = response.data['facets']
+        # 难度分面的数量不受难度本身的筛选限制，只受型号限制
+        self.assertEqual(self._counts(facets, 'difficulty'), {'1': 1, '2': 1, '3': 0})
+        self.assertEqual(self._counts(facets, 'model'), {'ModelX': 1, 'ModelY': 1})
+        self.assertEqual(self._counts(facets, 'tag'), {'早餐': 1, '粥汤': 1})
+
+        response = self.client.get(self.url, {'time': '0-15,30-60'})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_index_rebuilt_after_change(self):
+        self.client.get(self.url)
+        Recipe.objects.filter(title='饼').first().compatible_models.add(self.model_x)
+        with self.assertNumQueries(9):  # 检查版本 2 条 + 重建索引 5 条 + 当前页菜谱 2 条
+            response = self.client.get(self.url, {'model': 'ModelX'})
+        self.assertEqual(response.data['count'], 3)
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {'model': 'ModelX'})
+
+    def test_version_not_shared_through_cache(self):
+        """其他进程的修改只写数据库，清空本进程缓存后仍能发现版本变化"""
+        self.client.get(self.url)
+        Recipe.objects.filter(title='草稿').update(status='published')
+        record_changes(Recipe.objects.filter(title='草稿').values_list('pk', flat=True))
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).data['count'], 4)
+        # 型号改名不写变更日志，按型号的最后修改时间发现
+        self.model_x.name = '新名称'
+        self.model_x.save()
+        labels = {o['value']: o['label'] for o in self.client.get(self.url).data['facets']['model']}
+        self.assertEqual(labels['ModelX'], '新名称')
+
+
+class TotalMinutesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        def make(title, **times):
+            return Recipe.objects.create(title=title, status='published', **times)
+
+        cls.quick = make('快手菜', cook_time_minutes=10)
+        cls.medium = make('家常菜', prep_time_minutes=10, cook_time_minutes=20)
+        cls.slow = make('炖菜', prep_time_minutes=15, cook_time_hours=2)
+        cls.url = reverse('api_v1:recipe-list')
+
+    def test_total_minutes_maintained_on_save(self):
+        self.assertEqual(self.slow.total_minutes, 135)
+        recipe = Recipe.objects.get(pk=self.quick.pk)
+        recipe.prep_time_hours = 1
+        recipe.save(update_fields=['prep_time_hours'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.total_minutes, 70)
+
+    def test_filter_and_order(self):
+        response = self.client.get(self.url, {'max_total_minutes': 30, 'order': 'total_minutes'})
+        self.assertEqual([r['title'] for r in response.data['results']], ['快手菜', '家常菜'])
+        response = self.client.get(self.url, {'order': '-total_minutes'})
+        self.assertEqual([r['total_minutes'] for r in response.data['results']], [135, 30, 10])
+        response = self.client.get(self.url, {'order': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+    def test_backfill_migration(self):
+        migration = importlib.import_module('recipes.migrations.0007_recipe_total_minutes')
+        Recipe.objects.update(total_minutes=0)
+        migration.backfill_total_minutes(django_apps, None)
+        self.assertEqual(
+            dict(Recipe.objects.values_list('title', 'total_minutes')),
+            {'快手菜': 10, '家常菜': 30, '炖菜': 135}
+        )
+
+
+class RecipeStateMachineTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        cls.user = User.objects.create_user(username='cook', password='password')
+        cls.url = reverse('api_v1:recipe-transition')
+
+    def test_save_validates_without_refetch(self):
+        recipe = Recipe.objects.create(title='菜')
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.transition_to('pending')
+        # UPDATE 和同步变更记录，不重新查询原状态
+        with self.assertNumQueries(2):
+            recipe.save()
+        self.assertTrue(recipe.can_transition('published'))
+        recipe.status = 'draft'
+        with self.assertRaises(ValidationError):
+            recipe.save()
+
+    def test_unloaded_status_not_validated(self):
+        """ status 没有加载的实例保存时不校验，也不为读取状态回表 """
+        recipe = Recipe.objects.create(title='菜', status='published')
+        partial = Recipe.objects.only('id', 'title').get(pk=recipe.pk)
+        partial.title = '新菜'
+        with CaptureQueriesContext(connection) as ctx:
+            partial.save(update_fields=['title'])
+        self.assertFalse([q for q in ctx.captured_queries if '"status"' in q['sql']])
+
+    def test_bulk_transition_reports_rejected(self):
+        pending = [Recipe.objects.create(title=f'待审核 {i}', status='pending') for i in range(3)]
+        draft = Recipe.objects.create(title='草稿')
+        published = Recipe.objects.create(title='已发布', status='published')
+        ids = [r.pk for r in pending] + [draft.pk, published.pk, 99999]
+
+        result = bulk_transition(ids, 'published', review_comment='通过', chunk_size=2)
+        self.assertEqual(result.updated, 3)
+        self.assertEqual(result.rejected, {draft.pk: 'draft', published.pk: 'published'})
+        self.assertEqual(result.missing, [99999])
+        self.assertEqual(Recipe.objects.filter(status='published', review_comment='通过').count(), 3)
+
+    def test_transition_endpoint_admin_only(self):
+        recipe = Recipe.objects.create(title='草稿')
+        payload = {'status': 'pending', 'ids': [recipe.pk]}
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post(self.url, payload, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        response = self.client.post(self.url, {'status': 'draft', 'ids': [recipe.pk]}, format='json')
+        self.assertEqual(response.data['rejected'], [{'id': recipe.pk, 'status': 'pending'}])
+        response = self.client.post(self.url, {'status': 'archived', 'ids': [recipe.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(RECIPE_SYNC_SETTLE_SECONDS=0, RECIPE_SYNC_PAGE_SIZE=2)
+class RecipeSyncTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        cls.cooker = DeviceModel.objects.create(model_identifier='cooker', name='料理机')
+        cls.oven = DeviceModel.objects.create(model_identifier='oven', name='烤箱')
+        cls.url = reverse('api_v1:recipe-sync')
+
+    def _sync(self, since=None, model='cooker'):
+        params = {'model': model}
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def _drain(self, since=None):
+        """一直请求到 has_more 为 false，返回 (最后的游标, 下发的菜谱ID, 删除的菜谱ID, 是否 reset)"""
+        updated, deleted, reset = [], [], False
+        while True:
+            data = self._sync(since)
+            updated += [item['id'] for item in data['updated']]
+            deleted += data['deleted']
+            reset = reset or data['reset']
+            since = data['cursor']
+            if not data['has_more']:
+                return since, updated, deleted, reset
+
+    def _recipe(self, title, status='published', models=()):
+        recipe = Recipe.objects.create(title=title, status=status)
+        recipe.compatible_models.set(models or [self.cooker])
+        return recipe
+
+    def test_snapshot_then_incremental(self):
+        recipes = [self._recipe(f'菜 {i}') for i in range(3)]
+        self._recipe('草稿', status='draft')
+        self._recipe('烤箱菜', models=[self.oven])
+
+        cursor, updated, deleted, reset = self._drain()
+        self.assertTrue(reset)
+        self.assertEqual(updated, [r.pk for r in recipes])
+        self.assertEqual(self._sync(cursor)['updated'], [])
+
+        # 修改、下线、删除、不再兼容、新建
+        recipes[0].title = '改名'
+        recipes[0].save()
+        recipes[1].status = 'rejected'
+        recipes[1].save()
+        # 从型号一侧解除兼容
+        self.cooker.recipes.remove(recipes[2])
+        created = self._recipe('新菜')
+
+        cursor, updated, deleted, reset = self._drain(cursor)
+        self.assertFalse(reset)
+        self.assertEqual(sorted(set(updated)), [recipes[0].pk, created.pk])
+        self.assertEqual(sorted(set(deleted)), [recipes[1].pk, recipes[2].pk])
+
+        pk = recipes[0].pk
+        recipes[0].delete()
+        created.page_view = 6
+        created.save(update_fields=['page_view'])
+        data = self._sync(cursor)
+        self.assertEqual((data['updated'], data['deleted']), ([], [pk]))
+
+    def test_bulk_transition_is_logged(self):
+        recipe = self._recipe('待审核', status='pending')
+        cursor = self._sync()['cursor']
+        bulk_transition([recipe.pk], 'published')
+        self.assertEqual([item['id'] for item in self._sync(cursor)['updated']], [recipe.pk])
+
+    def test_pruned_cursor_resets(self):
+        self._recipe('菜')
+        cursor = self._drain()[0]
+        for i in range(3):
+            self._recipe(f'新菜 {i}')
+        # 最新的一条始终保留
+        total = RecipeChange.objects.count()
+        self.assertEqual(prune_changes(days=-1), total - 1)
+
+        cursor, updated, deleted, reset = self._drain(cursor)
+        self.assertTrue(reset)
+        self.assertEqual(len(updated), 4)
+        self.assertEqual(self._sync(cursor)['reset'], False)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'model': 'cooker', 'since': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], '查询参数无效')
+        self.assertEqual(self.client.get(self.url, {'model': 'unknown'}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(RECIPE_SYNC_SETTLE_SECONDS=0)
+class RecipeBundleTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.cooker = DeviceModel.objects.create(model_identifier='cooker', name='料理机')
+        self.oven = DeviceModel.objects.create(model_identifier='oven', name='烤箱')
+        self.url = reverse('api_v1:recipe-bundle')
+
+    def _recipe(self, title, models, status='published', **fields):
+        recipe = Recipe.objects.create(title=title, status=status, **fields)
+        recipe.compatible_models.set(models)
+        return recipe
+
+    def _contents(self, device_model):
+        bundle = RecipeBundle.objects.get(device_model=device_model)
+        with bundle.file.open('rb') as f:
+            payload = decode(f.read(), bundle.format)
+        return {row[0]: dict(zip(payload['fields'], row)) for row in payload['recipes']}
+
+    def test_bundle_contents(self):
+        steps = [{'stepNo': 1, 'stepDescription': '加热'}]
+        recipe = self._recipe('烤鸡翅', [self.cooker, self.oven], steps=steps, order='A1',
+                              comal_position=2, temperature_value=200)
+        self._recipe('草稿', [self.cooker], status='draft')
+        self._recipe('料理机专用', [self.cooker])
+
+        self.assertEqual(sorted(build_bundles()), ['cooker', 'oven'])
+        oven = self._contents(self.oven)
+        self.assertEqual(list(oven), [recipe.pk])
+        self.assertEqual(set(oven[recipe.pk]), set(BUNDLE_FIELDS))
+        self.assertEqual(oven[recipe.pk]['steps'], steps)
+        self.assertEqual((oven[recipe.pk]['order'], oven[recipe.pk]['comal_position']), ('A1', 2))
+        self.assertEqual(len(self._contents(self.cooker)), 2)
+
+    def test_incremental_rebuild(self):
+        shared = self._recipe('通用', [self.cooker, self.oven])
+        only_cooker = self._recipe('料理机专用', [self.cooker])
+        build_bundles()
+        digest = RecipeBundle.objects.get(device_model=self.oven).digest
+        self.assertEqual(build_bundles(), [])
+
+        only_cooker.title = '改名'
+        only_cooker.save()
+        self.assertEqual(build_bundles(), ['cooker'])
+
+        # 不再兼容：旧包中有这个菜谱，需要重新生成；料理机的包也包含它，重新检查后内容不变
+        cooker_digest = RecipeBundle.objects.get(device_model=self.cooker).digest
+        self.oven.recipes.remove(shared)
+        self.assertEqual(sorted(build_bundles()), ['cooker', 'oven'])
+        self.assertEqual(self._contents(self.oven), {})
+        self.assertEqual(RecipeBundle.objects.get(device_model=self.cooker).digest, cooker_digest)
+
+        # 内容相同时得到同一个文件
+        self.oven.recipes.add(shared)
+        build_bundles()
+        self.assertEqual(RecipeBundle.objects.get(device_model=self.oven).digest, digest)
+
+    def test_manifest_etag(self):
+        self.assertEqual(self.client.get(self.url, {'model': 'cooker'}).status_code, status.HTTP_404_NOT_FOUND)
+        self._recipe('菜', [self.cooker])
+        build_bundles()
+        bundle = RecipeBundle.objects.get(device_model=self.cooker)
+
+        response = self.client.get(self.url, {'model': 'cooker'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], f'"{bundle.digest}"')
+        self.assertEqual(response.data['recipe_count'], 1)
+        self.assertIn(bundle.digest, response.data['url'])
+
+        response = self.client.get(self.url, {'model': 'cooker'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
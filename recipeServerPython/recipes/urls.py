@@ -0,0 +1,8 @@
+from rest_framework.routers import SimpleRouter
+
+from .views import RecipeViewSet
+
+router = SimpleRouter()
+router.register(r'recipes', RecipeViewSet, basename='recipe')
+
+urlpatterns = router.urls
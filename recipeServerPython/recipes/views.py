@@ -1,3 +1,289 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
-# Create your views here.
+from recipe_server.schema import extend_schema, OpenApiParameter, OpenApiTypes
+from .facets import get_facet_index, parse_facet_filters
+from .ingredients import ingredient_names, rank_by_coverage
+from .labels import filter_by_labels, split_labels
+from .models import DeviceModel, RecipeBundle
+from .queries import recipe_list_queryset
+from .serializers import (
+    CookWithQuerySerializer, RecipeListSerializer, RecipeSerializer, RecipeSyncQuerySerializer,
+    RecipeTransitionSerializer
+)
+from .sync import sync_page
+from .workflow import bulk_transition
+
+# 查询参数 -> (字符串字段, 是否要求全部匹配)
+LABEL_FILTERS = {
+    'tags_any': ('tags', False),
+    'tags_all': ('tags', True),
+    'work_modes_any': ('work_modes', False),
+    'work_modes_all': ('work_modes', True),
+}
+
+# order 参数 -> 排序字段；总时长相同时新菜谱在前
+ORDERINGS = {
+    'total_minutes': ('total_minutes', '-created_at', '-pk'),
+    '-total_minutes': ('-total_minutes', '-created_at', '-pk'),
+}
+
+
+class RecipeViewSet(viewsets.ReadOnlyModelViewSet):
+    """菜谱浏览：提供 `list` 和 `retrieve` 动作"""
+    permission_classes = [permissions.AllowAny]
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return RecipeListSerializer
+        return RecipeSerializer
+
+    def get_queryset(self):
+        queryset = recipe_list_queryset()
+        params = self.request.query_params
+        user = self.request.user
+
+        # 作者可以看到自己的全部菜谱，管理员可以看到所有菜谱，其他情况只显示已发布的
+        if user.is_authenticated and params.get('author') == 'me':
+            queryset = queryset.filter(author=user)
+        elif not (user.is_authenticated and user.is_staff):
+            queryset = queryset.filter(status='published')
+
+        model = params.get('model')
+        if model:
+            queryset = queryset.filter(compatible_models__model_identifier=model)
+
+        for param, (field, match_all) in LABEL_FILTERS.items():
+            if params.get(param):
+                queryset = filter_by_labels(queryset, field, params[param], match_all=match_all)
+
+        max_total_minutes = params.get('max_total_minutes')
+        if max_total_minutes:
+            if not max_total_minutes.isdigit():
+                raise ValidationError({'error': '查询参数无效', 'details': 'max_total_minutes 必须是非负整数'})
+            queryset = queryset.filter(total_minutes__lte=int(max_total_minutes))
+
+        order = params.get('order')
+        if order:
+            if order not in ORDERINGS:
+                raise ValidationError({'error': '查询参数无效', 'details': f'order 只能是 {", ".join(ORDERINGS)}'})
+            queryset = queryset.order_by(*ORDERINGS[order])
+
+        return queryset
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='list_recipes',
+        summary='获取菜谱列表',
+        description='获取已发布的菜谱列表，支持按设备型号、标签、工作模式和总时长筛选，可按总时长排序；'
+                    '多个标签用逗号分隔，_any 为包含任一即可，_all 为必须全部包含，可以组合使用',
+        parameters=[
+            OpenApiParameter(name='model', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='按兼容的设备型号标识筛选，如 smartcooker-pro'),
+            OpenApiParameter(name='tags_any', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='包含任一标签，如 早餐,粥汤'),
+            OpenApiParameter(name='tags_all', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='包含全部标签'),
+            OpenApiParameter(name='work_modes_any', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='支持任一工作模式，如 微波,烧烤'),
+            OpenApiParameter(name='work_modes_all', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='支持全部工作模式'),
+            OpenApiParameter(name='max_total_minutes', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                             description='总时长（准备 + 烹饪）不超过的分钟数'),
+            OpenApiParameter(name='order', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='排序：total_minutes 按总时长从短到长，-total_minutes 从长到短；默认最新在前'),
+            OpenApiParameter(name='author', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='使用"me"查看自己的全部菜谱（含草稿）'),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='retrieve_recipe',
+        summary='获取菜谱详情',
+        description='获取单个菜谱的完整信息，包括主料、辅料、步骤和设备指令码'
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='cook_with_ingredients',
+        summary='用现有食材找菜谱',
+        description='传入手头的食材，返回用到这些食材的菜谱，按食材覆盖率从高到低排序（主料权重更高）；'
+                    '每条结果附带 match.score（0~1）、已有的食材 matched 和还缺的食材 missing。'
+                    '同样支持列表接口的 model、tags_any 等筛选参数',
+        parameters=[
+            OpenApiParameter(name='have', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=True,
+                             description='现有食材，逗号分隔，如 猪瘦肉,大米,姜'),
+            OpenApiParameter(name='max_missing', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                             description='最多还缺几种食材'),
+        ]
+    )
+    @action(detail=False, methods=['get'], url_path='cook-with')
+    def cook_with(self, request):
+        query = CookWithQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({'error': '查询参数无效', 'details': query.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches, unknown = rank_by_coverage(
+            split_labels(query.validated_data['have']),
+            recipe_ids=self.get_queryset().values('pk'),
+            max_missing=query.validated_data.get('max_missing'),
+        )
+        page = self.paginate_queryset(matches)
+        recipes = recipe_list_queryset().in_bulk([m.recipe_id for m in page])
+        names = ingredient_names({i for m in page for i in m.matched + m.missing})
+
+        results = RecipeListSerializer(
+            [recipes[m.recipe_id] for m in page], many=True, context=self.get_serializer_context()
+        ).data
+        for item, match in zip(results, page):
+            item['match'] = {
+                'score': match.score,
+                'matched': [names[i] for i in match.matched],
+                'missing': [names[i] for i in match.missing],
+            }
+        response = self.get_paginated_response(results)
+        response.data['unknown_ingredients'] = unknown
+        return response
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='search_recipes_faceted',
+        summary='分面浏览菜谱',
+        description='按难度、适合人群、总时长区间、兼容型号和标签筛选已发布的菜谱，'
+                    '同时返回每个分面各选项在当前筛选条件下的数量（facets）。'
+                    '同一分面内多个值为"或"，不同分面之间为"且"；某分面的数量不受该分面自身选中值的限制',
+        parameters=[
+            OpenApiParameter(name='difficulty', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='难度：1 简单，2 适中，3 困难，可多选如 1,2'),
+            OpenApiParameter(name='suitable_person', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='适合人群：1 老人，2 成人，3 儿童，4 婴幼儿'),
+            OpenApiParameter(name='time', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='总时长区间（分钟）：0-15, 15-30, 30-60, 60-120, 120+'),
+            OpenApiParameter(name='model', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='兼容的设备型号标识'),
+            OpenApiParameter(name='tag', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='标签'),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        result = get_facet_index().search(parse_facet_filters(request.query_params))
+        page = [int(pk) for pk in self.paginate_queryset(result.ids)]
+        recipes = recipe_list_queryset().in_bulk(page)
+        # 索引建好后被删除或下线的菜谱跳过，最多滞后 RECIPE_FACET_CHECK_SECONDS 秒
+        serializer = RecipeListSerializer(
+            [recipes[pk] for pk in page if pk in recipes and recipes[pk].status == 'published'],
+            many=True, context=self.get_serializer_context()
+        )
+        response = self.get_paginated_response(serializer.data)
+        response.data['facets'] = result.facets
+        return response
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='transition_recipes',
+        summary='批量转换菜谱状态',
+        description='管理员批量审核菜谱：草稿 -> 待审核 -> 已发布/已拒绝，已发布 -> 已拒绝，已拒绝 -> 待审核。'
+                    '不符合状态转换规则的菜谱不会被修改，在 rejected 中返回其当前状态',
+        request=RecipeTransitionSerializer
+    )
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def transition(self, request):
+        serializer = RecipeTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': '状态转换请求无效', 'details': serializer.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        result = bulk_transition(
+            serializer.validated_data['ids'],
+            serializer.validated_data['status'],
+            review_comment=serializer.validated_data.get('review_comment'),
+        )
+        return Response({
+            'status': result.target,
+            'updated': result.updated,
+            'rejected': [{'id': pk, 'status': current} for pk, current in sorted(result.rejected.items())],
+            'missing': result.missing,
+        })
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='sync_recipes',
+        summary='增量同步菜谱',
+        description='设备或 App 按型号同步兼容的已发布菜谱。首次请求不带 since，返回全量快照；之后带上次响应中的 '
+                    'cursor，只返回此后新增或修改的菜谱（updated）和下线、删除或不再兼容的菜谱ID（deleted）。'
+                    'has_more 为 true 时用新的 cursor 继续请求；reset 为 true 时客户端应先清空本地菜谱',
+        parameters=[
+            OpenApiParameter(name='model', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=True,
+                             description='设备型号标识'),
+            OpenApiParameter(name='since', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='上次同步返回的 cursor，原样传回'),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        query = RecipeSyncQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({'error': '查询参数无效', 'details': query.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        device_model = get_object_or_404(DeviceModel, model_identifier=query.validated_data['model'])
+        try:
+            page = sync_page(device_model, query.validated_data.get('since'))
+        except ValueError as e:
+            return Response({'error': '查询参数无效', 'details': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'cursor': page.cursor,
+            'has_more': page.has_more,
+            'reset': page.reset,
+            'updated': RecipeSerializer(page.recipes, many=True, context=self.get_serializer_context()).data,
+            'deleted': page.deleted,
+        })
+
+    @extend_schema(
+        tags=['菜谱'],
+        operation_id='recipe_bundle_manifest',
+        summary='获取型号的离线菜谱包',
+        description='返回某个型号离线菜谱包的下载地址和内容哈希。菜谱包是该型号全部兼容的已发布菜谱，'
+                    '格式见 format（如 msgpack+zstd、json+gzip），下载地址按内容命名、可永久缓存。'
+                    '响应的 ETag 即内容哈希，设备可带 If-None-Match 轮询，包没有变化时返回 304',
+        parameters=[
+            OpenApiParameter(name='model', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY, required=True,
+                             description='设备型号标识'),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def bundle(self, request):
+        identifier = request.query_params.get('model')
+        if not identifier:
+            return Response({'error': '查询参数无效', 'details': '缺少 model 参数'}, status=status.HTTP_400_BAD_REQUEST)
+        device_model = get_object_or_404(DeviceModel, model_identifier=identifier)
+        bundle = RecipeBundle.objects.filter(device_model=device_model).first()
+        if bundle is None:
+            return Response({'error': '菜谱包尚未生成', 'details': f'型号 {identifier} 的菜谱包尚未生成'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{bundle.digest}"'
+        if request.headers.get('If-None-Match') in (etag, 'W/' + etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({
+                'model': identifier,
+                'format': bundle.format,
+                'digest': bundle.digest,
+                'size': bundle.size,
+                'recipe_count': len(bundle.recipe_ids),
+                'url': request.build_absolute_uri(bundle.file.url),
+                'generated_at': bundle.generated_at,
+            })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
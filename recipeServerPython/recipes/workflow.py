@@ -0,0 +1,76 @@
+"""
+菜谱状态的批量转换。
+
+状态机定义在 Recipe.STATUS_TRANSITIONS。批量转换不逐条加载和保存：每批一条
+UPDATE ... WHERE id IN (...) AND status IN (允许的原状态)，由数据库在更新时
+完成校验，并发修改也不会产生非法转换。随后用同一事务内的一次查询找出没有被
+更新的记录及其当前状态，作为被拒绝的结果返回。
+
+UPDATE 不触发 post_save，需要的后续处理（同步变更记录等，分面索引也据此判断是否过期）在这里统一完成。
+"""
+import logging
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Recipe
+from .sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+# 单次请求允许提交的最大菜谱数量
+MAX_TRANSITION_BATCH = 5000
+TRANSITION_CHUNK_SIZE = 1000
+
+
+@dataclass
+class TransitionResult:
+    target: str
+    updated: int = 0
+    # 被拒绝的菜谱ID -> 当前状态
+    rejected: dict = field(default_factory=dict)
+    # 不存在的菜谱ID
+    missing: list = field(default_factory=list)
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def bulk_transition(ids, target, review_comment=None, chunk_size=TRANSITION_CHUNK_SIZE):
+    """把一批菜谱转换到 target 状态，返回 TransitionResult"""
+    if target not in Recipe.STATUS_TRANSITIONS:
+        raise ValueError(f'未知的菜谱状态: {target}')
+    sources = Recipe.allowed_sources(target)
+    ids = sorted(set(ids))
+    result = TransitionResult(target)
+
+    for chunk in _chunks(ids, chunk_size):
+        # 本批更新的行 updated_at 等于 stamp，用来和原本就处于目标状态的行区分开
+        stamp = timezone.now()
+        values = {'status': target, 'updated_at': stamp}
+        if review_comment is not None:
+            values['review_comment'] = review_comment
+        with transaction.atomic():
+            updated_ids = []
+            if Recipe.objects.filter(pk__in=chunk, status__in=sources).update(**values):
+                updated_ids = list(
+                    Recipe.objects.filter(pk__in=chunk, status=target, updated_at=stamp).values_list('pk', flat=True)
+                )
+                record_changes(updated_ids)
+            others = dict(
+                Recipe.objects.filter(pk__in=chunk)
+                .exclude(status=target, updated_at=stamp)
+                .values_list('pk', 'status')
+            )
+        result.updated += len(updated_ids)
+        result.rejected.update(others)
+        if len(updated_ids) + len(others) < len(chunk):
+            found = set(others) | set(updated_ids)
+            result.missing.extend(pk for pk in chunk if pk not in found)
+
+    if result.updated:
+        logger.info(f"批量转换菜谱状态 -> {target}: 更新 {result.updated} 个，拒绝 {len(result.rejected)} 个")
+    return result
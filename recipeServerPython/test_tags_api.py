@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 """
 测试API是否正确返回标签信息
+
+需要先启动开发服务器（python manage.py runserver），再用 python test_tags_api.py 手动运行；
+不属于 manage.py test 的测试用例。
 """
 
-import requests
 import json
+import unittest
+
+try:
+    import requests
+except ImportError:
+    # 测试发现会导入本文件，没有安装 requests 时跳过而不是报错
+    raise unittest.SkipTest('手动运行的接口检查脚本，需要安装 requests')
 
 def test_posts_api():
     """测试文章API返回的标签信息"""
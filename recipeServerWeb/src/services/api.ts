@@ -298,14 +298,21 @@ apiClient.interceptors.response.use(
           refresh: refreshToken,
         });
         
-        const { access } = response.data;
+        // refresh token 会轮换，旧的随即失效，需要保存新的
+        const { access, refresh } = response.data;
         safeStorage.setItem('access_token', access);
+        if (refresh) {
+          safeStorage.setItem('refresh_token', refresh);
+        }
         
         const userStr = safeStorage.getItem('user');
         if (userStr) {
           try {
             const userData = JSON.parse(userStr);
             userData.access = access;
+            if (refresh) {
+              userData.refresh = refresh;
+            }
             safeStorage.setItem('user', JSON.stringify(userData));
           } catch (error) {
             console.error('Error updating user data:', error);
@@ -536,7 +543,7 @@ const api = {
   },
 
   // 刷新令牌
-  refreshToken: async (refreshToken: string): Promise<{ access: string }> => {
+  refreshToken: async (refreshToken: string): Promise<{ access: string; refresh?: string }> => {
     const response = await apiClient.post('/auth/refresh/', { refresh: refreshToken });
     return response.data;
   },